@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator, List
+
+import ulid
+
+
+def make_product_rows(count: int, prefix: str = "bench") -> List[tuple]:
+    created_at = datetime(2024, 12, 23, 15, 57, 25, 496623)
+    return [
+        (
+            str(ulid.new()),
+            f"{prefix}-{index}",
+            "A product used by the benchmark suite",
+            Decimal("19.90"),
+            index,
+            True,
+            created_at,
+            None,
+        )
+        for index in range(count)
+    ]
+
+
+class FakeCursor:
+    def __init__(self, rows: List[tuple]):
+        self.rows = rows
+        self.rowcount = 0
+        self._position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql_query, params=None):
+        self.rowcount = len(self.rows)
+        self._position = 0
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchmany(self, size):
+        chunk = self.rows[self._position : self._position + size]
+        self._position += size
+        return chunk
+
+
+class FakeConnection:
+    def __init__(self, rows: List[tuple]):
+        self.rows = rows
+
+    def cursor(self, name=None):
+        return FakeCursor(self.rows)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+# in-memory stand-in for ConnectionPool: every query answers with the same
+# canned rows, so storage and HTTP overhead is measured without a database
+class FakeConnectionPool:
+    def __init__(self, rows: List[tuple]):
+        self.rows = rows
+
+    @contextmanager
+    def connection(self) -> Iterator[FakeConnection]:
+        yield FakeConnection(self.rows)
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"size": 0, "idle": 0, "in_use": 0, "waiting": 0}
@@ -0,0 +1,147 @@
+import itertools
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from models.product import Product
+
+RequestFactory = Callable[[int], Tuple[str, str, dict | list | None]]
+
+
+class BackgroundServer:
+    def __init__(self, app: FastAPI):
+        self.server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *args):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def load_route(
+    base_url: str,
+    make_request: RequestFactory,
+    requests: int,
+    concurrency: int,
+    on_response: Callable[[httpx.Response], None] | None = None,
+) -> dict:
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        local_latencies = []
+        local_errors = 0
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            while (index := next(counter)) < requests:
+                method, path, body = make_request(index)
+                start = time.perf_counter()
+                response = client.request(method, path, json=body)
+                local_latencies.append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    local_errors += 1
+                elif on_response is not None:
+                    on_response(response)
+
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(worker) for _ in range(concurrency)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1e3,
+        "p50_ms": percentiles[49] * 1e3,
+        "p95_ms": percentiles[94] * 1e3,
+        "p99_ms": percentiles[98] * 1e3,
+    }
+
+
+def run_macro_benchmarks(
+    base_url: str,
+    products: List[Product],
+    requests: int = 1000,
+    concurrency: int = 16,
+) -> Dict[str, dict]:
+    product_json = [product.model_dump(mode="json") for product in products]
+    created_ids: List[str] = []
+
+    def create_request(index: int):
+        body = dict(product_json[index % len(product_json)])
+        body.pop("id")
+        body["name"] = f"{body['name']}-load-{index}-{time.perf_counter_ns()}"
+        return "POST", "/products", body
+
+    routes: Dict[str, RequestFactory] = {
+        "GET /products?limit=100": lambda index: ("GET", "/products?limit=100", None),
+        "GET /products/stream": lambda index: ("GET", "/products/stream", None),
+        "GET /products/{id}": lambda index: (
+            "GET",
+            f"/products/{products[index % len(products)].id}",
+            None,
+        ),
+        "GET /products/name/{name}": lambda index: (
+            "GET",
+            f"/products/name/{products[index % len(products)].name}",
+            None,
+        ),
+        "POST /products:batchGet": lambda index: (
+            "POST",
+            "/products:batchGet",
+            {"ids": [product.id for product in products[:20]]},
+        ),
+        "PUT /products": lambda index: (
+            "PUT",
+            "/products",
+            product_json[index % len(product_json)],
+        ),
+    }
+
+    results = {
+        route: load_route(base_url, make_request, requests, concurrency)
+        for route, make_request in routes.items()
+    }
+
+    # rows created by the POST run are deleted by the DELETE run, so the
+    # catalog is left as it was found
+    results["POST /products"] = load_route(
+        base_url,
+        create_request,
+        requests,
+        concurrency,
+        on_response=lambda response: created_ids.append(response.json()["id"]),
+    )
+    results["DELETE /products/{id}"] = load_route(
+        base_url,
+        lambda index: ("DELETE", f"/products/{created_ids[index]}", None),
+        len(created_ids),
+        concurrency,
+    )
+    return results
@@ -0,0 +1,106 @@
+import statistics
+import time
+from typing import Callable, Dict, List
+
+from pydantic import TypeAdapter
+
+from models.product import Product
+from models.serializers import dump_json
+from storages.product_storage import ProductStorage
+
+
+def measure(func: Callable, repeat: int = 5, min_time: float = 0.2) -> dict:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat:
+            break
+        number *= 2
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+
+    median = statistics.median(timings)
+    return {
+        "iterations": number * repeat,
+        "min_us": min(timings) * 1e6,
+        "median_us": median * 1e6,
+        "ops_per_sec": 1 / median if median else 0.0,
+    }
+
+
+def run_micro_benchmarks(
+    storage: ProductStorage,
+    products: List[Product],
+    rows: List[tuple],
+    include_writes: bool = True,
+    repeat: int = 5,
+    min_time: float = 0.2,
+) -> Dict[str, dict]:
+    product = products[0]
+    payload = product.model_dump(mode="json")
+    list_adapter = TypeAdapter(List[Product])
+    page = products[:100]
+    dicts_page = [storage.map_product_row_to_dict(row) for row in rows[:100]]
+
+    cases: Dict[str, Callable] = {
+        "map_product_row_to_model": lambda: storage.map_product_row_to_model(rows[0]),
+        "map_product_rows_x100": lambda: [
+            storage.map_product_row_to_model(row) for row in rows[:100]
+        ],
+        "validate_product_rows_x100": lambda: [
+            Product(**storage.map_product_row_to_dict(row)) for row in rows[:100]
+        ],
+        "map_product_rows_to_dicts_x100": lambda: [
+            storage.map_product_row_to_dict(row) for row in rows[:100]
+        ],
+        "product_validate": lambda: Product.model_validate(payload),
+        "product_model_dump_json": product.model_dump_json,
+        "product_list_dump_json_x100": lambda: list_adapter.dump_json(page),
+        "product_list_response_x100": lambda: list_adapter.dump_json(
+            list_adapter.validate_python(page)
+        ),
+        "product_dicts_to_json_x100": lambda: dump_json(dicts_page),
+        "storage.get_all_products_limit_100": lambda: storage.get_all_products(
+            limit=100
+        ),
+        "storage.get_all_product_dicts_limit_100": (
+            lambda: storage.get_all_product_dicts(limit=100)
+        ),
+        "storage.get_product_by_id": lambda: storage.get_product_by_id(product.id),
+        "storage.get_product_by_name": lambda: storage.get_product_by_name(
+            product.name
+        ),
+        "storage.get_products_by_ids_x20": lambda: storage.get_products_by_ids(
+            [item.id for item in products[:20]]
+        ),
+    }
+
+    if include_writes:
+        cases["storage.update_product"] = lambda: storage.update_product(product)
+        cases["storage.create_and_delete_product"] = lambda: _create_and_delete(
+            storage, product
+        )
+
+    return {
+        name: measure(func, repeat=repeat, min_time=min_time)
+        for name, func in cases.items()
+    }
+
+
+def _create_and_delete(storage: ProductStorage, template: Product) -> None:
+    product = Product(
+        name=f"{template.name}-tmp-{time.perf_counter_ns()}",
+        description=template.description,
+        price=template.price,
+        quantity=template.quantity,
+    )
+    storage.create_product(product)
+    storage.delete_product_by_id(product.id)
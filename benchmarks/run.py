@@ -0,0 +1,176 @@
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from fastapi import FastAPI
+
+from benchmarks.fakes import FakeConnectionPool, make_product_rows
+from benchmarks.macro import BackgroundServer, run_macro_benchmarks
+from benchmarks.micro import run_micro_benchmarks
+from configs.cache_conf import get_product_cache
+from configs.db_conn import get_database_pool
+from routes.product_router import router
+from services.product_service import ProductService
+from storages.product_storage import ProductStorage
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# relative slowdown above which `compare` reports a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Product service benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark suite")
+    run_parser.add_argument(
+        "--target",
+        choices=("memory", "postgres"),
+        default="memory",
+        help="In-memory stand-in or the Postgres configured by DATABASE_*",
+    )
+    run_parser.add_argument("--suite", choices=("all", "micro", "macro"), default="all")
+    run_parser.add_argument("--products", type=int, default=1000)
+    run_parser.add_argument("--requests", type=int, default=1000)
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument(
+        "--base-url",
+        help="Load an already running server instead of starting one in-process",
+    )
+    run_parser.add_argument(
+        "--output", help="Results file, defaults to benchmarks/results/<commit>.json"
+    )
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    return parser.parse_args(argv)
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def create_benchmark_app(storage: ProductStorage) -> FastAPI:
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        yield {"product_service": ProductService(storage, cache=get_product_cache())}
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+    return app
+
+
+def run(args: argparse.Namespace) -> dict:
+    rows = make_product_rows(args.products, prefix=f"bench-{get_commit()}")
+
+    if args.target == "memory":
+        db_pool = FakeConnectionPool(rows)
+        storage = ProductStorage(db_pool)
+        products = [storage.map_product_row_to_model(row) for row in rows]
+    else:
+        db_pool = get_database_pool()
+        storage = ProductStorage(db_pool)
+        products = [storage.map_product_row_to_model(row) for row in rows]
+        storage.create_products(products)
+
+    results = {
+        "commit": get_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "target": args.target,
+        "python": platform.python_version(),
+        "products": args.products,
+        "micro": {},
+        "macro": {},
+    }
+    try:
+        if args.suite in ("all", "micro"):
+            logger.info("Running micro benchmarks")
+            results["micro"] = run_micro_benchmarks(storage, products, rows)
+
+        if args.suite in ("all", "macro"):
+            logger.info("Running macro benchmarks")
+            if args.base_url:
+                results["macro"] = run_macro_benchmarks(
+                    args.base_url, products, args.requests, args.concurrency
+                )
+            else:
+                with BackgroundServer(create_benchmark_app(storage)) as base_url:
+                    results["macro"] = run_macro_benchmarks(
+                        base_url, products, args.requests, args.concurrency
+                    )
+    finally:
+        if args.target == "postgres":
+            storage.delete_products_by_ids([product.id for product in products])
+        db_pool.close()
+
+    return results
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list[str]:
+    regressions = []
+    metrics = [("micro", "median_us"), ("macro", "p50_ms"), ("macro", "p99_ms")]
+
+    for suite, metric in metrics:
+        for name, result in candidate.get(suite, {}).items():
+            previous = baseline.get(suite, {}).get(name)
+            if previous is None or not previous[metric]:
+                continue
+
+            change = result[metric] / previous[metric] - 1
+            line = (
+                f"{suite:5} {name:40} {metric:9} "
+                f"{previous[metric]:12.2f} -> {result[metric]:12.2f} ({change:+.1%})"
+            )
+            print(line)
+            if change > threshold:
+                regressions.append(line)
+
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    args = parse_args(argv)
+
+    if args.command == "compare":
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        candidate = json.loads(Path(args.candidate).read_text(encoding="utf-8"))
+        regressions = compare(baseline, candidate, args.threshold)
+        if regressions:
+            logger.error(f"{len(regressions)} benchmarks regressed above threshold")
+            return 1
+        return 0
+
+    results = run(args)
+    output = Path(args.output or RESULTS_DIR / f"{results['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    logger.info(f"Benchmark results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import threading
+from collections import OrderedDict
+
+
+class CompressedResponseCache:
+    def __init__(self, max_size: int = 256):
+        if max_size < 1:
+            raise ValueError(f"Invalid compressed cache max_size={max_size}")
+
+        self.max_size = max_size
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, etag: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            # the ETag pins the exact body, a changed page never reuses old bytes
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, etag: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List
+
+from models.product import Product
+from models.serializers import dump_json
+
+MISSING = object()
+
+
+class ProductCache:
+    def __init__(
+        self,
+        max_size: int = 10_000,
+        ttl: float = 60.0,
+        negative_ttl: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError(f"Invalid cache max_size={max_size}")
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._name_by_id: dict = {}
+        self._json_by_id: dict = {}
+        # every write or invalidation gets a generation, a fill loaded before
+        # the last one of its product is dropped instead of undoing it
+        self._generation = 0
+        self._written_at: OrderedDict = OrderedDict()
+        self._forgotten = 0
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+
+    def get(self, field: str, key: str) -> Product | None | object:
+        return self._get((field, key))
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, product: Product, generation: int | None = None) -> None:
+        # without a generation the product is a write, with one it is a fill
+        # loaded since that generation
+        with self._lock:
+            if generation is None:
+                self._bump(product.id)
+            elif self._written_since(product.id, generation):
+                return
+
+            previous_name = self._name_by_id.get(product.id)
+            if previous_name is not None and previous_name != product.name:
+                self._entries.pop(("name", previous_name), None)
+
+            self._name_by_id[product.id] = product.name
+            self._set(("id", product.id), product, self.ttl)
+            self._set(("name", product.name), product, self.ttl)
+
+    def put_missing(self, field: str, key: str, generation: int | None = None) -> None:
+        with self._lock:
+            # a lookup by name cannot tell which product it missed, any write
+            # since the load started may have created it
+            if generation is not None and self._generation != generation:
+                return
+            self._set((field, key), None, self.negative_ttl)
+
+    def get_many(self, field: str, keys: List[str]) -> dict:
+        cached = {}
+        for key in keys:
+            product = self._get((field, key))
+            if product is not MISSING:
+                cached[key] = product
+        return cached
+
+    def put_many(
+        self,
+        field: str,
+        keys: List[str],
+        products: List[Product],
+        generation: int | None = None,
+    ) -> None:
+        for product in products:
+            self.put(product, generation)
+
+        loaded = {getattr(product, field) for product in products}
+        with self._lock:
+            if generation is not None and self._generation != generation:
+                return
+            for key in keys:
+                if key not in loaded:
+                    self._set((field, key), None, self.negative_ttl)
+
+    def get_json(self, product: Product) -> bytes:
+        with self._lock:
+            cached = self._json_by_id.get(product.id)
+        if cached is not None and cached[0] is product:
+            return cached[1]
+
+        encoded = dump_json(product)
+        with self._lock:
+            # keep the bytes only while this exact object is the cached one,
+            # any put() or invalidate() in between makes them stale
+            entry = self._entries.get(("id", product.id))
+            if entry is not None and entry[1] is product:
+                self._json_by_id[product.id] = (product, encoded)
+        return encoded
+
+    def invalidate(self, id: str) -> None:
+        with self._lock:
+            self._bump(id)
+            self._entries.pop(("id", id), None)
+            self._json_by_id.pop(id, None)
+            name = self._name_by_id.pop(id, None)
+            if name is not None:
+                self._entries.pop(("name", name), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._name_by_id.clear()
+            self._json_by_id.clear()
+            # fills still loading predate the clear, drop them all
+            self._generation += 1
+            self._written_at.clear()
+            self._forgotten = self._generation
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _get(self, key: tuple) -> Product | None | object:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            if entry[1] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry[1]
+
+    def _bump(self, id: str) -> None:
+        self._generation += 1
+        self._written_at[id] = self._generation
+        self._written_at.move_to_end(id)
+
+        # only recent writes are remembered, a fill older than a forgotten one
+        # is dropped rather than trusted
+        while len(self._written_at) > self.max_size:
+            _, self._forgotten = self._written_at.popitem(last=False)
+
+    def _written_since(self, id: str, generation: int) -> bool:
+        return self._written_at.get(id, self._forgotten) > generation
+
+    def _set(self, key: tuple, product: Product | None, ttl: float) -> None:
+        self._entries[key] = (self.clock() + ttl, product)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        self._drop(next(iter(self._entries)))
+        self.evictions += 1
+
+    def _drop(self, key: tuple) -> None:
+        _, product = self._entries.pop(key)
+
+        # forget the id -> name link once neither alias is cached anymore
+        if key[0] == "id":
+            name = self._name_by_id.get(key[1])
+            if name is not None and ("name", name) not in self._entries:
+                del self._name_by_id[key[1]]
+            self._json_by_id.pop(key[1], None)
+        elif product is not None and ("id", product.id) not in self._entries:
+            self._name_by_id.pop(product.id, None)
@@ -0,0 +1,438 @@
+import asyncio
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Tuple
+
+import orjson
+from redis.exceptions import RedisError, WatchError
+
+from caches.product_cache import MISSING
+from metrics.instruments import (
+    SHARED_CACHE_INVALIDATIONS,
+    SHARED_CACHE_LOOKUPS,
+    SHARED_CACHE_REFRESHES,
+)
+from models.product import Product
+from models.serializers import dump_json
+
+INVALIDATION_CHANNEL = "product-invalidations"
+
+
+class BaseSharedProductCache:
+    def __init__(
+        self,
+        client: Any,
+        ttl: float = 60.0,
+        stale_ttl: float = 30.0,
+        refresh_ahead: float = 10.0,
+        negative_ttl: float = 5.0,
+        tombstone_ttl: float = 30.0,
+        lock_ttl: float = 5.0,
+        prefix: str = "product",
+        clock: Callable[[], float] = time.time,
+    ):
+        if not 0 <= refresh_ahead < ttl:
+            raise ValueError(f"Invalid shared cache refresh_ahead={refresh_ahead}")
+
+        self.logger = logging.getLogger(__name__)
+        self.client = client
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = refresh_ahead
+        self.negative_ttl = negative_ttl
+        # must outlast the replica lag, so a row read from a replica that has not
+        # replayed a delete yet cannot be cached again
+        self.tombstone_ttl = tombstone_ttl
+        self.lock_ttl = lock_ttl
+        self.prefix = prefix
+        # wall time, every worker and host compares the same expiry stamps
+        self.clock = clock
+        # tells the invalidations of this worker apart from the others'
+        self.origin = uuid.uuid4().hex
+
+    def key(self, field: str, value: str) -> str:
+        return f"{self.prefix}:{field}:{value}"
+
+    def lock_key(self, field: str, value: str) -> str:
+        return f"{self.prefix}:refresh:{field}:{value}"
+
+    def version(self, product: Product) -> float:
+        return (product.updated_at or product.created_at).timestamp()
+
+    def encode(self, product: Product | None) -> Tuple[bytes, int]:
+        ttl = self.negative_ttl if product is None else self.ttl
+        # a miss is as new as the moment it was seen, older rows cannot fill it
+        version = self.clock() if product is None else self.version(product)
+        entry = dump_json(
+            {"fresh_until": self.clock() + ttl, "version": version, "product": product}
+        )
+        # found products outlive their freshness by the stale window, so hot keys
+        # are served while one worker reloads them
+        expire = ttl if product is None else ttl + self.stale_ttl
+        return entry, int(expire * 1000)
+
+    def encode_tombstone(self) -> Tuple[bytes, int]:
+        # an invalidated key reads as a miss, not as a missing product, but no
+        # row read before the invalidation may fill it
+        now = self.clock()
+        entry = dump_json(
+            {
+                "fresh_until": now + self.tombstone_ttl,
+                "version": now,
+                "product": None,
+                "invalidated": True,
+            }
+        )
+        return entry, int(self.tombstone_ttl * 1000)
+
+    def decode(
+        self, field: str, value: str, entry: bytes | None
+    ) -> Tuple[Product | None | object, bool]:
+        if entry is None:
+            SHARED_CACHE_LOOKUPS.labels("miss").inc()
+            return MISSING, False
+
+        decoded = orjson.loads(entry)
+        if decoded.get("invalidated"):
+            SHARED_CACHE_LOOKUPS.labels("miss").inc()
+            return MISSING, False
+        if decoded["product"] is None:
+            SHARED_CACHE_LOOKUPS.labels("negative_hit").inc()
+            return None, False
+
+        product = Product.model_validate(decoded["product"])
+        # the key of a renamed product lingers until its next write or expiry
+        if getattr(product, field) != value:
+            SHARED_CACHE_LOOKUPS.labels("miss").inc()
+            return MISSING, False
+
+        # only keys still being read near the end of their freshness are
+        # reloaded ahead of time, cold ones just expire
+        remaining = decoded["fresh_until"] - self.clock()
+        if remaining <= 0:
+            SHARED_CACHE_LOOKUPS.labels("stale").inc()
+        elif remaining <= self.refresh_ahead:
+            SHARED_CACHE_LOOKUPS.labels("refresh_ahead").inc()
+        else:
+            SHARED_CACHE_LOOKUPS.labels("hit").inc()
+        return product, remaining <= self.refresh_ahead
+
+    def supersedes(self, entry: bytes | None, product: Product) -> bool:
+        # entries written before versions were stored never hold a fill back
+        version = None if entry is None else orjson.loads(entry).get("version")
+        return version is not None and version > self.version(product)
+
+    def previous_name(self, entry: bytes | None) -> str | None:
+        if entry is None:
+            return None
+        product = orjson.loads(entry)["product"]
+        return None if product is None else product["name"]
+
+    def message(self, id: str) -> str:
+        return f"{self.origin} {id}"
+
+    def handle_message(self, message: dict, callback: Callable[[str], None]) -> None:
+        origin, _, id = message["data"].decode().partition(" ")
+        if origin != self.origin:
+            SHARED_CACHE_INVALIDATIONS.labels("received").inc()
+            callback(id)
+
+    def log_listener_error(self, ex: Exception) -> None:
+        # the listener reconnects and resubscribes on its next read
+        self.logger.warning(f"Shared cache invalidation listener failed: {ex}")
+
+
+class SharedProductCache(BaseSharedProductCache):
+    def __init__(self, *args, refresh_workers: int = 2, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.executor = ThreadPoolExecutor(
+            max_workers=refresh_workers, thread_name_prefix="shared-cache-refresh"
+        )
+        self._pubsub = None
+        self._listener = None
+
+    def get(
+        self, field: str, value: str, loader: Callable[[str], Product]
+    ) -> Product | None | object:
+        try:
+            entry = self.client.get(self.key(field, value))
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache read failed: {ex}")
+            SHARED_CACHE_LOOKUPS.labels("error").inc()
+            return MISSING
+
+        product, refresh_due = self.decode(field, value, entry)
+        if refresh_due and self.claim_refresh(field, value):
+            self.executor.submit(self.refresh, field, value, loader)
+        return product
+
+    def claim_refresh(self, field: str, value: str) -> bool:
+        # one worker in the fleet reloads a key, the lock expires on its own
+        try:
+            return bool(
+                self.client.set(
+                    self.lock_key(field, value),
+                    self.origin,
+                    nx=True,
+                    px=int(self.lock_ttl * 1000),
+                )
+            )
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache refresh lock failed: {ex}")
+            return False
+
+    def refresh(self, field: str, value: str, loader: Callable[[str], Product]):
+        try:
+            product = loader(value)
+        except ValueError:
+            self.put_missing(field, value)
+            SHARED_CACHE_REFRESHES.labels("missing").inc()
+        except Exception as ex:  # runs off the request, failures are only logged
+            self.logger.error(
+                f"Failed to refresh shared cache key {field}={value}: {ex}"
+            )
+            SHARED_CACHE_REFRESHES.labels("failed").inc()
+        else:
+            self.put(product)
+            SHARED_CACHE_REFRESHES.labels("loaded").inc()
+
+    def put(self, product: Product, broadcast: bool = False) -> None:
+        if not broadcast:
+            self.fill(product)
+            return
+
+        entry, expire = self.encode(product)
+        try:
+            with self.client.pipeline(transaction=False) as pipe:
+                previous_name = self.previous_name(
+                    self.client.get(self.key("id", product.id))
+                )
+                if previous_name not in (None, product.name):
+                    pipe.delete(self.key("name", previous_name))
+                pipe.set(self.key("id", product.id), entry, px=expire)
+                pipe.set(self.key("name", product.name), entry, px=expire)
+                pipe.publish(INVALIDATION_CHANNEL, self.message(product.id))
+                pipe.execute()
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache write failed: {ex}")
+            return
+
+        SHARED_CACHE_INVALIDATIONS.labels("sent").inc()
+
+    def fill(self, product: Product) -> None:
+        # a row read before a write must not replace the written one, the id
+        # key holds the version for both keys
+        entry, expire = self.encode(product)
+        id_key = self.key("id", product.id)
+        try:
+            with self.client.pipeline() as pipe:
+                pipe.watch(id_key)
+                if self.supersedes(pipe.get(id_key), product):
+                    return
+                pipe.multi()
+                pipe.set(id_key, entry, px=expire)
+                pipe.set(self.key("name", product.name), entry, px=expire)
+                pipe.execute()
+        except WatchError:
+            # the key changed since it was read, the other write wins
+            return
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache write failed: {ex}")
+
+    def put_missing(self, field: str, value: str) -> None:
+        entry, expire = self.encode(None)
+        try:
+            self.client.set(self.key(field, value), entry, px=expire)
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache write failed: {ex}")
+
+    def invalidate(self, id: str) -> None:
+        tombstone, expire = self.encode_tombstone()
+        try:
+            previous_name = self.previous_name(self.client.get(self.key("id", id)))
+            with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(self.key("id", id), tombstone, px=expire)
+                if previous_name is not None:
+                    pipe.delete(self.key("name", previous_name))
+                pipe.publish(INVALIDATION_CHANNEL, self.message(id))
+                pipe.execute()
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache invalidation failed: {ex}")
+            return
+
+        SHARED_CACHE_INVALIDATIONS.labels("sent").inc()
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(
+            **{
+                INVALIDATION_CHANNEL: lambda message: self.handle_message(
+                    message, callback
+                )
+            }
+        )
+        self._listener = self._pubsub.run_in_thread(
+            sleep_time=1.0, daemon=True, exception_handler=self.on_listener_error
+        )
+
+    def on_listener_error(self, ex: Exception, *_) -> None:
+        self.log_listener_error(ex)
+        time.sleep(1.0)
+
+    def close(self) -> None:
+        if self._listener is not None:
+            # the listener closes its pubsub connection once it stops
+            self._listener.stop()
+            self._listener.join(timeout=2.0)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
+
+
+class AsyncSharedProductCache(BaseSharedProductCache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._refreshes: set = set()
+        self._pubsub = None
+        self._listener: asyncio.Task | None = None
+
+    async def get(
+        self, field: str, value: str, loader: Callable[[str], Awaitable[Product]]
+    ) -> Product | None | object:
+        try:
+            entry = await self.client.get(self.key(field, value))
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache read failed: {ex}")
+            SHARED_CACHE_LOOKUPS.labels("error").inc()
+            return MISSING
+
+        product, refresh_due = self.decode(field, value, entry)
+        if refresh_due and await self.claim_refresh(field, value):
+            task = asyncio.get_running_loop().create_task(
+                self.refresh(field, value, loader)
+            )
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+        return product
+
+    async def claim_refresh(self, field: str, value: str) -> bool:
+        try:
+            return bool(
+                await self.client.set(
+                    self.lock_key(field, value),
+                    self.origin,
+                    nx=True,
+                    px=int(self.lock_ttl * 1000),
+                )
+            )
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache refresh lock failed: {ex}")
+            return False
+
+    async def refresh(
+        self, field: str, value: str, loader: Callable[[str], Awaitable[Product]]
+    ):
+        try:
+            product = await loader(value)
+        except ValueError:
+            await self.put_missing(field, value)
+            SHARED_CACHE_REFRESHES.labels("missing").inc()
+        except Exception as ex:  # runs off the request, failures are only logged
+            self.logger.error(
+                f"Failed to refresh shared cache key {field}={value}: {ex}"
+            )
+            SHARED_CACHE_REFRESHES.labels("failed").inc()
+        else:
+            await self.put(product)
+            SHARED_CACHE_REFRESHES.labels("loaded").inc()
+
+    async def put(self, product: Product, broadcast: bool = False) -> None:
+        if not broadcast:
+            await self.fill(product)
+            return
+
+        entry, expire = self.encode(product)
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                previous_name = self.previous_name(
+                    await self.client.get(self.key("id", product.id))
+                )
+                if previous_name not in (None, product.name):
+                    pipe.delete(self.key("name", previous_name))
+                pipe.set(self.key("id", product.id), entry, px=expire)
+                pipe.set(self.key("name", product.name), entry, px=expire)
+                pipe.publish(INVALIDATION_CHANNEL, self.message(product.id))
+                await pipe.execute()
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache write failed: {ex}")
+            return
+
+        SHARED_CACHE_INVALIDATIONS.labels("sent").inc()
+
+    async def fill(self, product: Product) -> None:
+        entry, expire = self.encode(product)
+        id_key = self.key("id", product.id)
+        try:
+            async with self.client.pipeline() as pipe:
+                await pipe.watch(id_key)
+                if self.supersedes(await pipe.get(id_key), product):
+                    return
+                pipe.multi()
+                pipe.set(id_key, entry, px=expire)
+                pipe.set(self.key("name", product.name), entry, px=expire)
+                await pipe.execute()
+        except WatchError:
+            return
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache write failed: {ex}")
+
+    async def put_missing(self, field: str, value: str) -> None:
+        entry, expire = self.encode(None)
+        try:
+            await self.client.set(self.key(field, value), entry, px=expire)
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache write failed: {ex}")
+
+    async def invalidate(self, id: str) -> None:
+        tombstone, expire = self.encode_tombstone()
+        try:
+            previous_name = self.previous_name(
+                await self.client.get(self.key("id", id))
+            )
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.set(self.key("id", id), tombstone, px=expire)
+                if previous_name is not None:
+                    pipe.delete(self.key("name", previous_name))
+                pipe.publish(INVALIDATION_CHANNEL, self.message(id))
+                await pipe.execute()
+        except RedisError as ex:
+            self.logger.warning(f"Shared cache invalidation failed: {ex}")
+            return
+
+        SHARED_CACHE_INVALIDATIONS.labels("sent").inc()
+
+    async def subscribe(self, callback: Callable[[str], None]) -> None:
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(
+            **{
+                INVALIDATION_CHANNEL: lambda message: self.handle_message(
+                    message, callback
+                )
+            }
+        )
+        self._listener = asyncio.get_running_loop().create_task(
+            self._pubsub.run(exception_handler=self.on_listener_error)
+        )
+
+    async def on_listener_error(self, ex: Exception, *_) -> None:
+        self.log_listener_error(ex)
+        await asyncio.sleep(1.0)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await self._pubsub.aclose()
+        for task in list(self._refreshes):
+            task.cancel()
+        await self.client.aclose()
@@ -0,0 +1,95 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from configs.replica_pool import get_required_lsn
+from metrics.instruments import SINGLE_FLIGHT_CALLS
+
+
+def flight_key(operation: str, key: Hashable) -> tuple:
+    # a read that needs a newer WAL position must not join a call started for
+    # an older one
+    return (operation, key, get_required_lsn())
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[tuple, Flight] = {}
+
+    def do(
+        self, operation: str, key: Hashable, fn: Callable[..., Any], *args, **kwargs
+    ) -> Any:
+        flight_id = flight_key(operation, key)
+        with self._lock:
+            flight = self._flights.get(flight_id)
+            leader = flight is None
+            if leader:
+                flight = self._flights[flight_id] = Flight()
+
+        if not leader:
+            SINGLE_FLIGHT_CALLS.labels(operation, "coalesced").inc()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        SINGLE_FLIGHT_CALLS.labels(operation, "executed").inc()
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as ex:
+            flight.error = ex
+            raise
+        finally:
+            # callers arriving from now on start a new call and see newer data
+            with self._lock:
+                del self._flights[flight_id]
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        self._flights: Dict[tuple, asyncio.Task] = {}
+
+    async def do(
+        self,
+        operation: str,
+        key: Hashable,
+        fn: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs,
+    ) -> Any:
+        flight_id = flight_key(operation, key)
+        task = self._flights.get(flight_id)
+        if task is None:
+            SINGLE_FLIGHT_CALLS.labels(operation, "executed").inc()
+            # a task of its own, so a caller that goes away does not cancel the
+            # query for the others
+            task = asyncio.get_running_loop().create_task(fn(*args, **kwargs))
+            self._flights[flight_id] = task
+            task.add_done_callback(lambda _: self._land(flight_id, task))
+        else:
+            SINGLE_FLIGHT_CALLS.labels(operation, "coalesced").inc()
+        return await asyncio.shield(task)
+
+    def _land(self, flight_id: tuple, task: asyncio.Task) -> None:
+        if self._flights.get(flight_id) is task:
+            del self._flights[flight_id]
+        # every caller may have gone away, the error is theirs to see, not the loop's
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
@@ -0,0 +1,95 @@
+import argparse
+import logging
+import sys
+
+from dotenv import load_dotenv
+from psycopg2 import DatabaseError
+
+from configs.db_conn import get_database_connection
+from storages.product_copy_storage import ProductCopyStorage
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Bulk import and export of the products table using COPY"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export products")
+    export_parser.add_argument("--format", choices=("csv", "binary"), default="csv")
+    export_parser.add_argument(
+        "--output", default="-", help="Output file, defaults to stdout"
+    )
+
+    import_parser = subparsers.add_parser("import", help="Import products")
+    import_parser.add_argument("--format", choices=("csv", "binary"), default="csv")
+    import_parser.add_argument(
+        "--input", default="-", help="Input file, defaults to stdin"
+    )
+    import_parser.add_argument(
+        "--on-conflict",
+        choices=("error", "skip", "id", "name"),
+        default="error",
+        help="Fail, skip, or upsert rows that conflict on id or name",
+    )
+    import_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=10_000,
+        help="Number of CSV rows validated and copied per chunk",
+    )
+    import_parser.add_argument(
+        "--skip-invalid",
+        action="store_true",
+        help="Log and skip CSV rows that fail validation instead of aborting",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    args = parse_args(argv)
+
+    db_connection = get_database_connection()
+    storage = ProductCopyStorage(db_connection)
+    try:
+        if args.command == "export":
+            if args.output == "-":
+                count = storage.export_products(sys.stdout.buffer, args.format)
+            else:
+                with open(args.output, "wb") as output:
+                    count = storage.export_products(output, args.format)
+            logger.info(f"Exported {count} products")
+        else:
+            if args.input == "-":
+                count = storage.import_products(
+                    sys.stdin.buffer,
+                    args.format,
+                    args.on_conflict,
+                    args.chunk_size,
+                    args.skip_invalid,
+                )
+            else:
+                with open(args.input, "rb") as input:
+                    count = storage.import_products(
+                        input,
+                        args.format,
+                        args.on_conflict,
+                        args.chunk_size,
+                        args.skip_invalid,
+                    )
+            logger.info(f"Imported {count} products")
+    except (DatabaseError, ValueError):
+        return 1
+    finally:
+        db_connection.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import logging
+import os
+
+import redis
+import redis.asyncio
+
+from caches.product_cache import ProductCache
+from caches.shared_cache import AsyncSharedProductCache, SharedProductCache
+from configs.server_conf import get_worker_count
+
+logger = logging.getLogger(__name__)
+
+
+def get_product_cache() -> ProductCache | None:
+    max_size = int(os.getenv("PRODUCT_CACHE_MAX_SIZE", "10000"))
+    if max_size <= 0:
+        return None
+
+    # only the shared cache tells the other workers to drop their local copy,
+    # without it a write on one worker stays unseen by the rest until the TTL
+    workers = get_worker_count()
+    if workers > 1 and not os.getenv("PRODUCT_SHARED_CACHE_URL", ""):
+        logger.warning(
+            f"Local product cache disabled: {workers} workers and no "
+            f"PRODUCT_SHARED_CACHE_URL to invalidate it across them"
+        )
+        return None
+
+    product_cache = ProductCache(
+        max_size=max_size,
+        ttl=float(os.getenv("PRODUCT_CACHE_TTL", "60")),
+        negative_ttl=float(os.getenv("PRODUCT_CACHE_NEGATIVE_TTL", "5")),
+    )
+    return product_cache
+
+
+def get_shared_cache_options() -> dict:
+    return {
+        "ttl": float(os.getenv("PRODUCT_SHARED_CACHE_TTL", "60")),
+        "stale_ttl": float(os.getenv("PRODUCT_SHARED_CACHE_STALE_TTL", "30")),
+        "refresh_ahead": float(os.getenv("PRODUCT_SHARED_CACHE_REFRESH_AHEAD", "10")),
+        "negative_ttl": float(os.getenv("PRODUCT_SHARED_CACHE_NEGATIVE_TTL", "5")),
+        "tombstone_ttl": float(os.getenv("PRODUCT_SHARED_CACHE_TOMBSTONE_TTL", "30")),
+    }
+
+
+def get_shared_client_options() -> dict:
+    # a slow cache must not hold requests longer than the database would
+    timeout = float(os.getenv("PRODUCT_SHARED_CACHE_TIMEOUT", "0.25"))
+    return {"socket_timeout": timeout, "socket_connect_timeout": timeout}
+
+
+def get_shared_product_cache() -> SharedProductCache | None:
+    url = os.getenv("PRODUCT_SHARED_CACHE_URL", "")
+    if not url:
+        return None
+
+    client = redis.Redis.from_url(url, **get_shared_client_options())
+    return SharedProductCache(client, **get_shared_cache_options())
+
+
+def get_async_shared_product_cache() -> AsyncSharedProductCache | None:
+    url = os.getenv("PRODUCT_SHARED_CACHE_URL", "")
+    if not url:
+        return None
+
+    client = redis.asyncio.Redis.from_url(url, **get_shared_client_options())
+    return AsyncSharedProductCache(client, **get_shared_cache_options())
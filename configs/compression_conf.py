@@ -0,0 +1,18 @@
+import os
+
+from caches.compressed_cache import CompressedResponseCache
+
+
+def get_compression_options() -> dict:
+    cache_max_size = int(os.getenv("COMPRESSION_CACHE_MAX_SIZE", "256"))
+    compressed_cache = (
+        CompressedResponseCache(max_size=cache_max_size) if cache_max_size > 0 else None
+    )
+
+    return {
+        "minimum_size": int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024")),
+        "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+        "zstd_level": int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")),
+        "cache": compressed_cache,
+    }
@@ -1,17 +1,134 @@
 import os
+from typing import Dict
 
 import psycopg2
-from dotenv import load_dotenv
+from psycopg_pool import AsyncConnectionPool
 
-load_dotenv()
+from configs.db_pool import ConnectionPool, TimedAsyncConnectionPool
+from configs.replica_pool import AsyncReplicaPool, ReplicaPool
 
 
-def get_database_connection():
-    db_connection = psycopg2.connect(
-        database=os.getenv("DATABASE_NAME"),
-        host=os.getenv("DATABASE_HOST"),
-        user=os.getenv("DATABASE_USER"),
-        password=os.getenv("DATABASE_PASSWORD"),
-        port=os.getenv("DATABASE_PORT"),
-    )
+def get_database_driver() -> str:
+    return os.getenv("DATABASE_DRIVER", "sync")
+
+
+# server-side prepared statements do not survive poolers in transaction mode
+# (e.g. pgbouncer), turn them off when running behind one
+def get_prepare_statements() -> bool:
+    return os.getenv("DATABASE_PREPARE_STATEMENTS", "true").lower() == "true"
+
+
+def get_batch_options() -> dict:
+    # point lookups arriving within the window share one query, 0 turns it off
+    return {
+        "batch_window": float(os.getenv("DATABASE_BATCH_WINDOW_MS", "1")) / 1000,
+        "max_batch_size": int(os.getenv("DATABASE_BATCH_MAX_SIZE", "100")),
+    }
+
+
+def get_database_params() -> dict:
+    return {
+        "dbname": os.getenv("DATABASE_NAME"),
+        "host": os.getenv("DATABASE_HOST"),
+        "user": os.getenv("DATABASE_USER"),
+        "password": os.getenv("DATABASE_PASSWORD"),
+        "port": os.getenv("DATABASE_PORT"),
+    }
+
+
+def get_replica_timeout() -> int:
+    return int(os.getenv("DATABASE_REPLICA_CONNECT_TIMEOUT", "2"))
+
+
+def get_replica_params() -> Dict[str, dict]:
+    # DATABASE_REPLICA_HOSTS=host[:port],... shares name and credentials with the
+    # primary
+    replicas = {}
+    for address in os.getenv("DATABASE_REPLICA_HOSTS", "").split(","):
+        if not address.strip():
+            continue
+        host, _, port = address.strip().partition(":")
+        replicas[address.strip()] = {
+            **get_database_params(),
+            "host": host,
+            "port": port or os.getenv("DATABASE_PORT"),
+            "connect_timeout": get_replica_timeout(),
+        }
+    return replicas
+
+
+def get_database_connection(params: dict | None = None):
+    db_connection = psycopg2.connect(**(params or get_database_params()))
     return db_connection
+
+
+def get_database_pool(
+    params: dict | None = None,
+    min_size: int | None = None,
+    timeout: float | None = None,
+) -> ConnectionPool:
+    if min_size is None:
+        min_size = int(os.getenv("DATABASE_POOL_MIN_SIZE", "1"))
+    if timeout is None:
+        timeout = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+
+    db_pool = ConnectionPool(
+        connection_factory=lambda: get_database_connection(params),
+        min_size=min_size,
+        max_size=int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+        timeout=timeout,
+        check_interval=float(os.getenv("DATABASE_POOL_CHECK_INTERVAL", "0")),
+    )
+    return db_pool
+
+
+def get_async_database_pool(
+    params: dict | None = None, timeout: float | None = None
+) -> TimedAsyncConnectionPool:
+    if timeout is None:
+        timeout = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+
+    db_pool = TimedAsyncConnectionPool(
+        kwargs=params or get_database_params(),
+        min_size=int(os.getenv("DATABASE_POOL_MIN_SIZE", "1")),
+        max_size=int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+        timeout=timeout,
+        check=AsyncConnectionPool.check_connection,
+        open=False,
+    )
+    return db_pool
+
+
+def get_replica_options() -> dict:
+    return {
+        "max_lag_bytes": int(os.getenv("DATABASE_REPLICA_MAX_LAG_BYTES", "16777216")),
+        "check_interval": float(os.getenv("DATABASE_REPLICA_CHECK_INTERVAL", "5")),
+    }
+
+
+def get_replica_pool(primary: ConnectionPool) -> ReplicaPool | None:
+    replica_params = get_replica_params()
+    if not replica_params:
+        return None
+
+    # replica pools start empty, a replica that is down must not block startup,
+    # and give up quickly so reads spill over to the primary
+    replicas = {
+        name: get_database_pool(params, min_size=0, timeout=get_replica_timeout())
+        for name, params in replica_params.items()
+    }
+    return ReplicaPool(primary, replicas, **get_replica_options())
+
+
+def get_async_replica_pool(
+    primary: TimedAsyncConnectionPool,
+) -> AsyncReplicaPool | None:
+    replica_params = get_replica_params()
+    if not replica_params:
+        return None
+
+    replicas = {
+        name: get_async_database_pool(params, timeout=get_replica_timeout())
+        for name, params in replica_params.items()
+    }
+    return AsyncReplicaPool(primary, replicas, **get_replica_options())
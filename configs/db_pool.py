@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import psycopg2
+from psycopg2.extensions import connection as PgConnection
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+from psycopg2.pool import PoolError
+from psycopg_pool import AsyncConnectionPool
+
+from metrics.instruments import DB_POOL_CHECKOUT_DURATION
+
+
+class PoolTimeoutError(PoolError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        connection_factory: Callable[[], PgConnection],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30.0,
+        check_interval: float = 0.0,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                f"Invalid pool size min_size={min_size} max_size={max_size}"
+            )
+
+        self.logger = logging.getLogger(__name__)
+        self.connection_factory = connection_factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_interval = check_interval
+
+        self._condition = threading.Condition()
+        self._idle: deque = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        for _ in range(min_size):
+            self._idle.append((self.connection_factory(), time.monotonic()))
+            self._size += 1
+
+    @contextmanager
+    def connection(self) -> Iterator[PgConnection]:
+        db_connection = self.getconn()
+        try:
+            yield db_connection
+        finally:
+            self.putconn(db_connection)
+
+    def getconn(self) -> PgConnection:
+        start = time.monotonic()
+        try:
+            return self._checkout(start + self.timeout)
+        finally:
+            DB_POOL_CHECKOUT_DURATION.observe(time.monotonic() - start)
+
+    def _checkout(self, deadline: float) -> PgConnection:
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolError("Connection pool is closed")
+
+                if self._idle:
+                    db_connection, returned_at = self._idle.pop()
+                    break
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    db_connection, returned_at = None, None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a connection"
+                    )
+
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        if db_connection is not None and self._is_healthy(db_connection, returned_at):
+            return db_connection
+
+        if db_connection is not None:
+            self.logger.warning("Discarding broken connection, reconnecting")
+            self._close_quietly(db_connection)
+
+        try:
+            return self.connection_factory()
+        except Exception:
+            self._release_slot()
+            raise
+
+    def putconn(self, db_connection: PgConnection) -> None:
+        if not self._reset(db_connection):
+            self._close_quietly(db_connection)
+            self._release_slot()
+            return
+
+        with self._condition:
+            if self._closed:
+                self._size -= 1
+                self._close_quietly(db_connection)
+                return
+
+            self._idle.append((db_connection, time.monotonic()))
+            self._condition.notify()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                db_connection, _ = self._idle.popleft()
+                self._size -= 1
+                self._close_quietly(db_connection)
+            self._condition.notify_all()
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+            }
+
+    def _is_healthy(self, db_connection: PgConnection, returned_at: float) -> bool:
+        if db_connection.closed:
+            return False
+
+        if time.monotonic() - returned_at < self.check_interval:
+            return True
+
+        try:
+            # autocommit keeps the ping to a single round trip without leaving
+            # the connection inside a transaction
+            db_connection.autocommit = True
+            with db_connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            db_connection.autocommit = False
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _reset(self, db_connection: PgConnection) -> bool:
+        if db_connection.closed:
+            return False
+
+        status = db_connection.info.transaction_status
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+
+        if status != TRANSACTION_STATUS_IDLE:
+            try:
+                db_connection.rollback()
+            except psycopg2.Error:
+                return False
+
+        return True
+
+    def _release_slot(self) -> None:
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _close_quietly(self, db_connection: PgConnection) -> None:
+        try:
+            db_connection.close()
+        except psycopg2.Error:
+            pass
+
+
+class TimedAsyncConnectionPool(AsyncConnectionPool):
+    async def getconn(self, timeout: float | None = None):
+        start = time.monotonic()
+        try:
+            return await super().getconn(timeout)
+        finally:
+            DB_POOL_CHECKOUT_DURATION.observe(time.monotonic() - start)
+
+    def stats(self) -> dict:
+        stats = self.get_stats()
+        return {
+            "size": stats["pool_size"],
+            "idle": stats["pool_available"],
+            "in_use": stats["pool_size"] - stats["pool_available"],
+            "waiting": stats["requests_waiting"],
+        }
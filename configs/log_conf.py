@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import queue
+import random
+import weakref
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import TextIO
+
+from pydantic import BaseModel
+
+# attributes every LogRecord carries, anything else was passed through `extra`
+RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None))
+) | {"message", "asctime", "taskName"}
+
+
+class LogPayload:
+    max_length = int(os.getenv("LOG_PAYLOAD_MAX_LENGTH", "1024"))
+
+    def __init__(self, value: BaseModel):
+        self.value = value
+
+    def __str__(self) -> str:
+        text = self.value.model_dump_json()
+        if len(text) <= self.max_length:
+            return text
+        return f"{text[:self.max_length]}...({len(text) - self.max_length} more chars)"
+
+
+class PayloadSamplingFilter(logging.Filter):
+    def __init__(self, sample_rate: float | None = None):
+        super().__init__()
+        if sample_rate is None:
+            sample_rate = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sample_rate >= 1 or not isinstance(record.args, tuple):
+            return True
+        if not any(isinstance(arg, LogPayload) for arg in record.args):
+            return True
+        return random.random() < self.sample_rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in RESERVED_ATTRS
+        )
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def make_formatter(format: str | None = None) -> logging.Formatter:
+    if os.getenv("LOG_FORMAT", "text") == "json":
+        return JsonFormatter()
+    return logging.Formatter(format)
+
+
+QUEUE_HANDLERS: weakref.WeakSet = weakref.WeakSet()
+
+
+class QueueStreamHandler(QueueHandler):
+    def __init__(self, stream: TextIO | None = None):
+        super().__init__(queue.SimpleQueue())
+        self.handler = logging.StreamHandler(stream)
+        self.listener = QueueListener(self.queue, self.handler)
+        self.listener.start()
+        QUEUE_HANDLERS.add(self)
+
+    def restart_listener(self) -> None:
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, self.handler)
+        self.listener.start()
+
+    def setFormatter(self, fmt: logging.Formatter | None) -> None:
+        super().setFormatter(fmt)
+        self.handler.setFormatter(fmt)
+
+    # the stock prepare() renders the message in the calling thread so the
+    # record can be pickled; this queue never leaves the process, so leave
+    # formatting to the listener thread
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def close(self) -> None:
+        QUEUE_HANDLERS.discard(self)
+        self.listener.stop()
+        self.handler.close()
+        super().close()
+
+
+def restart_queue_listeners() -> None:
+    for handler in list(QUEUE_HANDLERS):
+        handler.restart_listener()
+
+
+# preloaded workers are forked with the handlers but without their listener
+# threads, each child starts its own
+os.register_at_fork(after_in_child=restart_queue_listeners)
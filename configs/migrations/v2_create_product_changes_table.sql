@@ -0,0 +1,45 @@
+CREATE TABLE IF NOT EXISTS product_changes (
+    seq BIGSERIAL PRIMARY KEY,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    product_id CHAR(26) NOT NULL,
+    operation VARCHAR(6) NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT LOCALTIMESTAMP
+);
+
+-- the feed pages through (txid, seq), readers only see transactions older
+-- than their snapshot xmin so a late commit can never be skipped
+CREATE INDEX IF NOT EXISTS product_changes_txid_seq_idx
+    ON product_changes (txid, seq);
+
+-- statement level triggers with transition tables keep bulk writes (batch
+-- endpoints, COPY import) to one extra INSERT per statement
+CREATE OR REPLACE FUNCTION record_product_changes() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO product_changes (product_id, operation)
+        SELECT id, 'delete' FROM old_products;
+    ELSE
+        INSERT INTO product_changes (product_id, operation)
+        SELECT id, lower(TG_OP) FROM new_products;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS products_insert_changes ON products;
+CREATE TRIGGER products_insert_changes
+    AFTER INSERT ON products
+    REFERENCING NEW TABLE AS new_products
+    FOR EACH STATEMENT EXECUTE FUNCTION record_product_changes();
+
+DROP TRIGGER IF EXISTS products_update_changes ON products;
+CREATE TRIGGER products_update_changes
+    AFTER UPDATE ON products
+    REFERENCING NEW TABLE AS new_products
+    FOR EACH STATEMENT EXECUTE FUNCTION record_product_changes();
+
+DROP TRIGGER IF EXISTS products_delete_changes ON products;
+CREATE TRIGGER products_delete_changes
+    AFTER DELETE ON products
+    REFERENCING OLD TABLE AS old_products
+    FOR EACH STATEMENT EXECUTE FUNCTION record_product_changes();
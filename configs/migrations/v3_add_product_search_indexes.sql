@@ -0,0 +1,16 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 'simple' keeps words as typed so prefix queries behave the same for any
+-- language; the name weighs more than the description when ranking
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', name), 'A')
+        || setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS products_search_vector_idx
+    ON products USING GIN (search_vector);
+
+-- backs typo tolerant (similarity) and prefix (ILIKE 'abc%') matches on name
+CREATE INDEX IF NOT EXISTS products_name_trgm_idx
+    ON products USING GIN (name gin_trgm_ops);
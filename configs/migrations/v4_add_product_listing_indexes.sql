@@ -0,0 +1,18 @@
+-- listings only read active products, so every index is partial on active and
+-- ends with id to serve the (sort key, id) keyset order of GET /products
+CREATE INDEX IF NOT EXISTS products_active_id_idx
+    ON products (id) WHERE active;
+
+CREATE INDEX IF NOT EXISTS products_active_in_stock_id_idx
+    ON products (id) WHERE active AND quantity > 0;
+
+CREATE INDEX IF NOT EXISTS products_active_price_idx
+    ON products (price, id) WHERE active;
+
+CREATE INDEX IF NOT EXISTS products_active_created_at_idx
+    ON products (created_at, id) WHERE active;
+
+-- never updated products count as modified when created, matches the
+-- updated_at sort and filters
+CREATE INDEX IF NOT EXISTS products_active_modified_idx
+    ON products ((coalesce(updated_at, created_at)), id) WHERE active;
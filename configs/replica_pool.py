@@ -0,0 +1,271 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+from psycopg import Error as PsycopgError
+from psycopg2 import DatabaseError as Psycopg2DatabaseError
+from psycopg2.pool import PoolError
+from psycopg_pool import PoolTimeout
+
+from metrics.instruments import DB_REPLICA_EJECTIONS, DB_REPLICA_LAG, DB_REPLICA_READS
+
+# both values are WAL positions as byte offsets, like pg_wal_lsn_diff(lsn, '0/0')
+SELECT_CURRENT_LSN = "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), '0/0')::bigint"
+SELECT_REPLAY_LSN = "SELECT pg_wal_lsn_diff(pg_last_wal_replay_lsn(), '0/0')::bigint"
+
+CONNECTION_ERRORS = (Psycopg2DatabaseError, PoolError, PsycopgError, PoolTimeout)
+
+
+@dataclass
+class ConsistencySession:
+    # oldest WAL position a read must see, from the client's consistency token
+    required_lsn: int = 0
+    # position after the last commit of the request, sent back as a token
+    written_lsn: int | None = None
+
+
+CONSISTENCY_SESSION: ContextVar[ConsistencySession | None] = ContextVar(
+    "consistency_session", default=None
+)
+
+
+def parse_lsn(token: str) -> int:
+    high, separator, low = token.partition("/")
+    if not separator:
+        raise ValueError(f"Invalid consistency token {token!r}")
+    return (int(high, 16) << 32) | int(low, 16)
+
+
+def format_lsn(lsn: int) -> str:
+    return f"{lsn >> 32:X}/{lsn & 0xFFFFFFFF:X}"
+
+
+def get_required_lsn() -> int:
+    session = CONSISTENCY_SESSION.get()
+    return 0 if session is None else session.required_lsn
+
+
+def record_written_lsn(lsn: int) -> None:
+    session = CONSISTENCY_SESSION.get()
+    if session is not None:
+        session.written_lsn = max(session.written_lsn or 0, lsn)
+
+
+@dataclass
+class Replica:
+    name: str
+    pool: Any
+    healthy: bool = False
+    replay_lsn: int = 0
+
+
+class BaseReplicaPool:
+    def __init__(
+        self,
+        primary: Any,
+        replicas: Dict[str, Any],
+        max_lag_bytes: int = 16 * 1024 * 1024,
+        check_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.primary = primary
+        self.replicas = [Replica(name, pool) for name, pool in replicas.items()]
+        self.max_lag_bytes = max_lag_bytes
+        self.check_interval = check_interval
+        self.clock = clock
+
+        self._counter = itertools.count()
+        self._checking = False
+        # replicas start ejected until the first check has measured their lag
+        self._checked_at = float("-inf")
+
+    def choose_replica(self) -> Replica | None:
+        required_lsn = get_required_lsn()
+        candidates = [
+            replica
+            for replica in self.replicas
+            if replica.healthy and replica.replay_lsn >= required_lsn
+        ]
+        if not candidates:
+            return None
+        return candidates[next(self._counter) % len(candidates)]
+
+    def is_check_due(self) -> bool:
+        # checks run in the background, one at a time, while reads keep using
+        # the last known state
+        if self._checking or self.clock() - self._checked_at < self.check_interval:
+            return False
+        self._checking = True
+        return True
+
+    def update_replica(
+        self, replica: Replica, primary_lsn: int | None, replay_lsn: int | None
+    ) -> None:
+        if primary_lsn is None or replay_lsn is None:
+            self.eject(replica, "not replaying WAL")
+            return
+
+        lag = max(primary_lsn - replay_lsn, 0)
+        DB_REPLICA_LAG.labels(replica.name).set(lag)
+        replica.replay_lsn = replay_lsn
+        if lag > self.max_lag_bytes:
+            self.eject(replica, f"lagging {lag} bytes behind the primary")
+        elif not replica.healthy:
+            self.logger.info(f"Replica {replica.name} is back in rotation")
+            replica.healthy = True
+
+    def eject(self, replica: Replica, reason: str) -> None:
+        if replica.healthy:
+            self.logger.warning(f"Ejecting replica {replica.name}: {reason}")
+            DB_REPLICA_EJECTIONS.labels(replica.name).inc()
+        replica.healthy = False
+
+    def finish_check(self) -> None:
+        self._checked_at = self.clock()
+        self._checking = False
+
+
+class ReplicaPool(BaseReplicaPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+
+    def is_check_due(self) -> bool:
+        with self._lock:
+            return super().is_check_due()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        if self.is_check_due():
+            threading.Thread(target=self.check_replicas, daemon=True).start()
+
+        with ExitStack() as stack:
+            db_connection = None
+            replica = self.choose_replica()
+            if replica is not None:
+                try:
+                    db_connection = stack.enter_context(replica.pool.connection())
+                    DB_REPLICA_READS.labels(replica.name).inc()
+                except CONNECTION_ERRORS as ex:
+                    self.eject(replica, f"connection failed: {ex}")
+
+            if db_connection is None:
+                db_connection = stack.enter_context(self.primary.connection())
+                DB_REPLICA_READS.labels("primary").inc()
+            yield db_connection
+
+    def check_replicas(self) -> None:
+        try:
+            primary_lsn = self.fetch_lsn(self.primary, SELECT_CURRENT_LSN)
+            for replica in self.replicas:
+                try:
+                    replay_lsn = self.fetch_lsn(replica.pool, SELECT_REPLAY_LSN)
+                except CONNECTION_ERRORS as ex:
+                    self.eject(replica, f"check failed: {ex}")
+                    continue
+                self.update_replica(replica, primary_lsn, replay_lsn)
+        except CONNECTION_ERRORS as ex:
+            self.logger.error(f"Failed to read the primary WAL position: {ex}")
+        finally:
+            self.finish_check()
+
+    def fetch_lsn(self, pool: Any, sql_query: str) -> int | None:
+        with pool.connection() as db, db.cursor() as cursor:
+            cursor.execute(sql_query)
+            lsn = cursor.fetchone()[0]
+            db.rollback()
+            return lsn
+
+    def record_write(self, db_connection) -> None:
+        # read after the commit, so a replica at this position has replayed it;
+        # the write already succeeded, a failure here only costs the token
+        try:
+            with db_connection.cursor() as cursor:
+                cursor.execute(SELECT_CURRENT_LSN)
+                record_written_lsn(cursor.fetchone()[0])
+            db_connection.rollback()
+        except CONNECTION_ERRORS as ex:
+            self.logger.warning(f"Failed to read the WAL position of a write: {ex}")
+
+    def close(self) -> None:
+        for replica in self.replicas:
+            replica.pool.close()
+
+
+class AsyncReplicaPool(BaseReplicaPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._check_task: asyncio.Task | None = None
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        if self.is_check_due():
+            self._check_task = asyncio.get_running_loop().create_task(
+                self.check_replicas()
+            )
+
+        async with AsyncExitStack() as stack:
+            db_connection = None
+            replica = self.choose_replica()
+            if replica is not None:
+                try:
+                    db_connection = await stack.enter_async_context(
+                        replica.pool.connection()
+                    )
+                    DB_REPLICA_READS.labels(replica.name).inc()
+                except CONNECTION_ERRORS as ex:
+                    self.eject(replica, f"connection failed: {ex}")
+
+            if db_connection is None:
+                db_connection = await stack.enter_async_context(
+                    self.primary.connection()
+                )
+                DB_REPLICA_READS.labels("primary").inc()
+            yield db_connection
+
+    async def check_replicas(self) -> None:
+        try:
+            primary_lsn = await self.fetch_lsn(self.primary, SELECT_CURRENT_LSN)
+            for replica in self.replicas:
+                try:
+                    replay_lsn = await self.fetch_lsn(replica.pool, SELECT_REPLAY_LSN)
+                except CONNECTION_ERRORS as ex:
+                    self.eject(replica, f"check failed: {ex}")
+                    continue
+                self.update_replica(replica, primary_lsn, replay_lsn)
+        except CONNECTION_ERRORS as ex:
+            self.logger.error(f"Failed to read the primary WAL position: {ex}")
+        finally:
+            self.finish_check()
+
+    async def fetch_lsn(self, pool: Any, sql_query: str) -> int | None:
+        async with pool.connection() as db:
+            cursor = await db.execute(sql_query)
+            lsn = (await cursor.fetchone())[0]
+            await db.rollback()
+            return lsn
+
+    async def record_write(self, db_connection) -> None:
+        try:
+            cursor = await db_connection.execute(SELECT_CURRENT_LSN)
+            record_written_lsn((await cursor.fetchone())[0])
+            await db_connection.rollback()
+        except CONNECTION_ERRORS as ex:
+            self.logger.warning(f"Failed to read the WAL position of a write: {ex}")
+
+    async def open(self) -> None:
+        for replica in self.replicas:
+            await replica.pool.open()
+
+    async def close(self) -> None:
+        if self._check_task is not None:
+            self._check_task.cancel()
+        for replica in self.replicas:
+            await replica.pool.close()
@@ -0,0 +1,4 @@
+#!/bin/bash
+# lets the replica container stream WAL from the primary with the service user
+set -e
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
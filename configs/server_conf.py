@@ -0,0 +1,40 @@
+import os
+from pathlib import Path
+
+import yaml
+
+LOG_CONFIG_PATH = Path(__file__).parent / "log_conf.yml"
+
+# left to the lifespan shutdown to close the pools after requests are drained
+POOL_CLOSE_TIMEOUT = 5
+
+
+def get_worker_count() -> int:
+    workers = int(os.getenv("SERVER_WORKERS", "0"))
+    if workers > 0:
+        return workers
+
+    # cores this process may run on, unlike cpu_count() it honors cpusets
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_drain_timeout() -> int:
+    return int(os.getenv("SERVER_DRAIN_TIMEOUT", "25"))
+
+
+def get_server_options() -> dict:
+    host = os.getenv("SERVER_HOST", "0.0.0.0")
+    port = os.getenv("SERVER_PORT", "8000")
+
+    return {
+        "bind": f"{host}:{port}",
+        "workers": get_worker_count(),
+        "worker_class": "server.ProductServiceWorker",
+        "preload_app": True,
+        "graceful_timeout": get_drain_timeout() + POOL_CLOSE_TIMEOUT,
+        "keepalive": int(os.getenv("SERVER_KEEPALIVE", "5")),
+        "logconfig_dict": yaml.safe_load(LOG_CONFIG_PATH.read_text()),
+    }
@@ -1,28 +1,136 @@
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+from prometheus_client import REGISTRY
+from psycopg_pool import PoolTimeout
 
-from configs.db_conn import get_database_connection
-from routes.product_router import router
+from configs.cache_conf import (
+    get_async_shared_product_cache,
+    get_product_cache,
+    get_shared_product_cache,
+)
+from configs.compression_conf import get_compression_options
+from configs.db_conn import (
+    get_async_database_pool,
+    get_async_replica_pool,
+    get_batch_options,
+    get_database_driver,
+    get_database_pool,
+    get_prepare_statements,
+    get_replica_pool,
+)
+from configs.db_pool import PoolTimeoutError
+from metrics.instruments import CacheCollector, PoolCollector
+from metrics.middleware import MetricsMiddleware
+from routes import async_product_router, metrics_router, product_router
+from routes.compression import CompressionMiddleware
+from routes.consistency import ConsistencyMiddleware
+from services.async_product_service import AsyncProductService
 from services.product_service import ProductService
+from storages.async_product_storage import AsyncProductStorage
 from storages.product_storage import ProductStorage
 
 logger = logging.getLogger(__name__)
 
+DATABASE_DRIVER = get_database_driver()
+
+
+def register_collectors(db_pool, cache) -> list:
+    collectors = [PoolCollector(db_pool.stats)]
+    if cache is not None:
+        collectors.append(CacheCollector(cache.stats))
+
+    for collector in collectors:
+        REGISTRY.register(collector)
+    return collectors
+
+
+def unregister_collectors(collectors: list) -> None:
+    for collector in collectors:
+        REGISTRY.unregister(collector)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    db_connection = get_database_connection()
-    product_storage = ProductStorage(db_connection=db_connection)
-    product_service = ProductService(product_storage)
+    # runs in every worker after the fork, pools are never shared across processes
+    product_cache = get_product_cache()
+    if DATABASE_DRIVER == "async":
+        async_db_pool = get_async_database_pool()
+        await async_db_pool.open()
+        replica_pool = get_async_replica_pool(async_db_pool)
+        if replica_pool is not None:
+            await replica_pool.open()
+        product_storage = AsyncProductStorage(
+            db_pool=async_db_pool,
+            prepare_statements=get_prepare_statements(),
+            replica_pool=replica_pool,
+            **get_batch_options(),
+        )
+        shared_cache = get_async_shared_product_cache()
+        if shared_cache is not None and product_cache is not None:
+            await shared_cache.subscribe(product_cache.invalidate)
+        product_service = AsyncProductService(
+            product_storage, cache=product_cache, shared_cache=shared_cache
+        )
+        collectors = register_collectors(async_db_pool, product_cache)
+
+        yield {"product_service": product_service}
+        logger.info("Shutdown application")
+        unregister_collectors(collectors)
+        if shared_cache is not None:
+            await shared_cache.close()
+        if replica_pool is not None:
+            await replica_pool.close()
+        await async_db_pool.close()
+    else:
+        db_pool = get_database_pool()
+        replica_pool = get_replica_pool(db_pool)
+        product_storage = ProductStorage(
+            db_pool=db_pool,
+            prepare_statements=get_prepare_statements(),
+            replica_pool=replica_pool,
+            **get_batch_options(),
+        )
+        shared_cache = get_shared_product_cache()
+        if shared_cache is not None and product_cache is not None:
+            shared_cache.subscribe(product_cache.invalidate)
+        product_service = ProductService(
+            product_storage, cache=product_cache, shared_cache=shared_cache
+        )
+        collectors = register_collectors(db_pool, product_cache)
 
-    yield {"product_service": product_service}
-    logger.info("Shutdown application")
+        yield {"product_service": product_service}
+        logger.info("Shutdown application")
+        unregister_collectors(collectors)
+        if shared_cache is not None:
+            shared_cache.close()
+        if replica_pool is not None:
+            replica_pool.close()
+        db_pool.close()
 
 
 app = FastAPI(
     lifespan=lifespan,
     title="Product Service",
 )
-app.include_router(router)
+# added first so it runs inside the metrics middleware, whose timing covers it
+app.add_middleware(ConsistencyMiddleware)
+app.add_middleware(CompressionMiddleware, **get_compression_options())
+app.add_middleware(MetricsMiddleware)
+app.include_router(metrics_router.router)
+if DATABASE_DRIVER == "async":
+    app.include_router(async_product_router.router)
+else:
+    app.include_router(product_router.router)
+
+
+@app.exception_handler(PoolTimeout)
+@app.exception_handler(PoolTimeoutError)
+def pool_timeout_handler(request: Request, exc: Exception):
+    logger.error(f"Database connection pool exhausted. Error: {exc}")
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database connection pool exhausted"},
+    )
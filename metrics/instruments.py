@@ -0,0 +1,214 @@
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the last body chunk is sent",
+    ["method", "route", "status"],
+)
+
+HTTP_COMPRESSED_RESPONSES = Counter(
+    "http_compressed_responses",
+    "Responses sent with a content coding, by whether the body was compressed "
+    "for the request, served from the precompressed cache or streamed",
+    ["encoding", "source"],
+)
+
+SHARED_CACHE_LOOKUPS = Counter(
+    "product_shared_cache_lookups",
+    "Shared cache reads, by whether the entry was fresh, due for a refresh ahead "
+    "of expiry, stale, negative, missing or the cache failed",
+    ["result"],
+)
+
+SHARED_CACHE_REFRESHES = Counter(
+    "product_shared_cache_refreshes",
+    "Background reloads of shared cache entries, by outcome",
+    ["result"],
+)
+
+SHARED_CACHE_INVALIDATIONS = Counter(
+    "product_shared_cache_invalidations",
+    "Invalidations broadcast to the other workers or received from them",
+    ["direction"],
+)
+
+SINGLE_FLIGHT_CALLS = Counter(
+    "product_single_flight_calls",
+    "Service reads by operation, by whether they ran a storage call or joined "
+    "an identical one already in flight",
+    ["operation", "result"],
+)
+
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "Time spent per storage query and phase (execute, fetch, map)",
+    ["query", "phase"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+DB_QUERY_ROWS = Counter(
+    "db_query_rows",
+    "Rows returned per storage query",
+    ["query"],
+)
+
+DB_PREPARED_STATEMENTS = Counter(
+    "db_prepared_statements",
+    "Prepared statement executions per storage query, by whether the statement "
+    "was prepared on that connection first or reused",
+    ["query", "result"],
+)
+
+DB_REPLICA_READS = Counter(
+    "db_replica_reads",
+    "Read connections handed out per replica, primary when no replica qualified",
+    ["target"],
+)
+
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_bytes",
+    "WAL bytes between the primary and the replica at the last check",
+    ["replica"],
+)
+
+DB_REPLICA_EJECTIONS = Counter(
+    "db_replica_ejections",
+    "Times a replica was taken out of read rotation",
+    ["replica"],
+)
+
+DB_BATCH_SIZE = Histogram(
+    "db_batch_lookup_keys",
+    "Point lookups answered per batched storage query",
+    ["loader"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "db_pool_checkout_duration_seconds",
+    "Time spent waiting to borrow a connection from the pool",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+
+class TimedCursor:
+    def __init__(self, cursor_context, query: str):
+        self.cursor_context = cursor_context
+        self.query = query
+        self.cursor: Any = None
+
+    def __enter__(self) -> "TimedCursor":
+        self.cursor = self.cursor_context.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.cursor_context.__exit__(*exc_info)
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount
+
+    @property
+    def connection(self):
+        return self.cursor.connection
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            DB_QUERY_DURATION.labels(self.query, phase).observe(
+                time.perf_counter() - start
+            )
+
+    def execute(self, *args, **kwargs):
+        with self.timer("execute"):
+            return self.cursor.execute(*args, **kwargs)
+
+    def fetchone(self):
+        with self.timer("fetch"):
+            row = self.cursor.fetchone()
+        DB_QUERY_ROWS.labels(self.query).inc(row is not None)
+        return row
+
+    def fetchall(self):
+        with self.timer("fetch"):
+            rows = self.cursor.fetchall()
+        DB_QUERY_ROWS.labels(self.query).inc(len(rows))
+        return rows
+
+    def fetchmany(self, size: int):
+        with self.timer("fetch"):
+            rows = self.cursor.fetchmany(size)
+        DB_QUERY_ROWS.labels(self.query).inc(len(rows))
+        return rows
+
+
+class AsyncTimedCursor(TimedCursor):
+    async def __aenter__(self) -> "AsyncTimedCursor":
+        self.cursor = await self.cursor_context.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self.cursor_context.__aexit__(*exc_info)
+
+    async def execute(self, *args, **kwargs):
+        with self.timer("execute"):
+            return await self.cursor.execute(*args, **kwargs)
+
+    async def fetchone(self):
+        with self.timer("fetch"):
+            row = await self.cursor.fetchone()
+        DB_QUERY_ROWS.labels(self.query).inc(row is not None)
+        return row
+
+    async def fetchall(self):
+        with self.timer("fetch"):
+            rows = await self.cursor.fetchall()
+        DB_QUERY_ROWS.labels(self.query).inc(len(rows))
+        return rows
+
+    async def fetchmany(self, size: int):
+        with self.timer("fetch"):
+            rows = await self.cursor.fetchmany(size)
+        DB_QUERY_ROWS.labels(self.query).inc(len(rows))
+        return rows
+
+
+class PoolCollector(Collector):
+    def __init__(self, stats: Callable[[], dict]):
+        self.stats = stats
+
+    def collect(self):
+        stats = self.stats()
+        for name, documentation in (
+            ("size", "Open connections in the pool"),
+            ("idle", "Connections waiting in the pool to be borrowed"),
+            ("in_use", "Connections currently borrowed from the pool"),
+            ("waiting", "Requests waiting for a pool connection"),
+        ):
+            yield GaugeMetricFamily(f"db_pool_{name}", documentation, value=stats[name])
+
+
+class CacheCollector(Collector):
+    def __init__(self, stats: Callable[[], dict]):
+        self.stats = stats
+
+    def collect(self):
+        stats = self.stats()
+        yield GaugeMetricFamily(
+            "product_cache_size", "Entries in the product cache", value=stats["size"]
+        )
+        for name in ("hits", "negative_hits", "misses", "evictions"):
+            yield CounterMetricFamily(
+                f"product_cache_{name}",
+                f"Product cache {name.replace('_', ' ')}",
+                value=stats[name],
+            )
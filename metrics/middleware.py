@@ -0,0 +1,36 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics.instruments import REQUEST_DURATION
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.labels(
+                scope["method"], self.get_route(scope), str(status_code)
+            ).observe(time.perf_counter() - start)
+
+    def get_route(self, scope: Scope) -> str:
+        # label by route template rather than raw path to keep cardinality bounded
+        route = scope.get("route")
+        return route.path if route is not None else "unmatched"
@@ -0,0 +1,46 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, Field, model_validator
+
+from models.product import Product
+
+MAX_BATCH_SIZE = 1000
+
+
+class BatchItemResult(BaseModel):
+    id: str = Field(description="Product ulid")
+    status: Literal["created", "updated", "deleted", "conflict", "not_found"] = Field(
+        description="Outcome of the operation for this item"
+    )
+
+
+class BatchResult(BaseModel):
+    results: List[BatchItemResult] = Field(
+        description="Per-item results, in request order"
+    )
+
+
+class BatchDeleteRequest(BaseModel):
+    ids: List[str] = Field(
+        max_length=MAX_BATCH_SIZE, description="Product ulids to delete"
+    )
+
+
+class BatchGetRequest(BaseModel):
+    ids: List[str] | None = Field(
+        default=None, max_length=MAX_BATCH_SIZE, description="Product ulids to fetch"
+    )
+    names: List[str] | None = Field(
+        default=None, max_length=MAX_BATCH_SIZE, description="Product names to fetch"
+    )
+
+    @model_validator(mode="after")
+    def check_single_key(self) -> "BatchGetRequest":
+        if (self.ids is None) == (self.names is None):
+            raise ValueError("Exactly one of ids or names must be provided")
+        return self
+
+
+class BatchGetResult(BaseModel):
+    products: List[Product] = Field(description="Products found, in request order")
+    missing: List[str] = Field(description="Requested keys with no product")
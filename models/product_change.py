@@ -0,0 +1,36 @@
+from typing import List, Literal, Tuple
+
+from pydantic import BaseModel, Field
+
+from models.product import Product
+
+ChangePosition = Tuple[int, int]
+
+# position before any change, used when a consumer starts without a token
+INITIAL_POSITION: ChangePosition = (0, 0)
+
+
+def encode_change_token(position: ChangePosition) -> str:
+    txid, seq = position
+    return f"{txid}-{seq}"
+
+
+def decode_change_token(token: str) -> ChangePosition:
+    txid, separator, seq = token.partition("-")
+    if not separator or not txid.isdigit() or not seq.isdigit():
+        raise ValueError(f"Invalid change token {token!r}")
+    return int(txid), int(seq)
+
+
+class ProductChange(BaseModel):
+    token: str = Field(description="Position of this change in the feed")
+    id: str = Field(description="Changed product ulid")
+    operation: Literal["insert", "update", "delete"]
+    product: Product | None = Field(
+        description="Current product state, null once the product is deleted"
+    )
+
+
+class ProductChangesPage(BaseModel):
+    changes: List[ProductChange]
+    next_token: str = Field(description="Token to resume the feed after this page")
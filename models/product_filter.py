@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import Any, Literal, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field
+
+ProductSort = Literal[
+    "id",
+    "-id",
+    "price",
+    "-price",
+    "created_at",
+    "-created_at",
+    "updated_at",
+    "-updated_at",
+]
+
+# id for the id sort, (sort value, id) for every other sort
+ListingPosition = str | Tuple[Any, str]
+
+
+class ProductFilter(BaseModel):
+    # hashable, so identical listings can share one in-flight query
+    model_config = ConfigDict(frozen=True)
+
+    min_price: float | None = Field(default=None, ge=0, description="Minimum price")
+    max_price: float | None = Field(default=None, ge=0, description="Maximum price")
+    in_stock: bool | None = Field(
+        default=None, description="Only products with (or without) quantity left"
+    )
+    created_after: datetime | None = Field(
+        default=None, description="Created at or after this timestamp"
+    )
+    created_before: datetime | None = Field(
+        default=None, description="Created before this timestamp"
+    )
+    updated_after: datetime | None = Field(
+        default=None,
+        description="Last modified at or after this timestamp, "
+        "products never updated count as modified when created",
+    )
+    updated_before: datetime | None = Field(
+        default=None, description="Last modified before this timestamp"
+    )
+    sort: ProductSort = Field(
+        default="id", description="Sort field, prefixed with - for descending order"
+    )
+
+
+def encode_listing_cursor(sort: ProductSort, product: dict) -> str:
+    field = sort.lstrip("-")
+    if field == "id":
+        return product["id"]
+    if field == "price":
+        return f"{product['price']!r}_{product['id']}"
+    value = product[field] or product["created_at"]
+    return f"{value.isoformat()}_{product['id']}"
+
+
+def decode_listing_cursor(sort: ProductSort, cursor: str) -> ListingPosition:
+    field = sort.lstrip("-")
+    if field == "id":
+        return cursor
+
+    value, separator, id = cursor.rpartition("_")
+    if not separator or not id.isalnum():
+        raise ValueError(f"Invalid listing cursor {cursor!r}")
+    if field == "price":
+        return float(value), id
+    return datetime.fromisoformat(value), id
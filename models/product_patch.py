@@ -0,0 +1,30 @@
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+
+class VersionMismatchError(Exception):
+    def __init__(self, id: str):
+        super().__init__(f"Product {id} was modified since the given version")
+        self.id = id
+
+
+class ProductPatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    name: str | None = Field(default=None, description="Product name")
+    description: str | None = Field(default=None, description="Product description")
+    price: float | None = Field(
+        default=None, gt=0, description="The price must be greater than zero"
+    )
+    quantity: int | None = Field(default=None, description="Product quantity")
+    active: bool | None = Field(default=None, description="Product active status")
+
+    @model_validator(mode="after")
+    def check_fields(self) -> "ProductPatch":
+        if not self.model_fields_set:
+            raise ValueError("At least one field must be provided")
+        nulls = sorted(
+            field for field in self.model_fields_set if getattr(self, field) is None
+        )
+        if nulls:
+            raise ValueError(f"Fields cannot be null: {', '.join(nulls)}")
+        return self
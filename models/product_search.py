@@ -0,0 +1,15 @@
+from typing import Tuple
+
+SearchPosition = Tuple[float, str]
+
+
+def encode_search_cursor(position: SearchPosition) -> str:
+    score, id = position
+    return f"{score!r}_{id}"
+
+
+def decode_search_cursor(cursor: str) -> SearchPosition:
+    score, separator, id = cursor.partition("_")
+    if not separator or not id.isalnum():
+        raise ValueError(f"Invalid search cursor {cursor!r}")
+    return float(score), id
@@ -0,0 +1,14 @@
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+
+
+def default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dump_json(value: Any) -> bytes:
+    return orjson.dumps(value, default=default)
@@ -0,0 +1,46 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, Field
+
+from models.batch import MAX_BATCH_SIZE
+
+
+class InsufficientStockError(Exception):
+    def __init__(self, id: str, available: int):
+        super().__init__(f"Insufficient stock for product {id}, {available} available")
+        self.id = id
+        self.available = available
+
+
+class StockAdjustment(BaseModel):
+    delta: int = Field(
+        description="Quantity added to the stock, negative to take from it"
+    )
+
+
+class StockAdjustmentLine(StockAdjustment):
+    id: str = Field(description="Product ulid")
+
+
+class BatchStockAdjustmentRequest(BaseModel):
+    lines: List[StockAdjustmentLine] = Field(
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description="Adjustments to apply, lines for the same product are summed",
+    )
+
+
+class StockAdjustmentResult(BaseModel):
+    id: str = Field(description="Product ulid")
+    status: Literal["adjusted", "insufficient_stock", "not_found"] = Field(
+        description="Outcome of the adjustment for this line"
+    )
+    quantity: int | None = Field(
+        description="Stock after the adjustment, or the stock left when rejected"
+    )
+
+
+class BatchStockAdjustmentResult(BaseModel):
+    results: List[StockAdjustmentResult] = Field(
+        description="Per-line results, in request order"
+    )
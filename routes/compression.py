@@ -0,0 +1,215 @@
+import zlib
+from typing import Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from caches.compressed_cache import CompressedResponseCache
+from metrics.instruments import HTTP_COMPRESSED_RESPONSES
+
+try:
+    import brotli
+except ImportError:  # br is only offered when the package is installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstd is only offered when the package is installed
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def process(self, data: bytes, more: bool) -> bytes:
+        flush_mode = zlib.Z_SYNC_FLUSH if more else zlib.Z_FINISH
+        return self.compressor.compress(data) + self.compressor.flush(flush_mode)
+
+
+class BrotliEncoder:
+    def __init__(self, quality: int):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def process(self, data: bytes, more: bool) -> bytes:
+        compressed = self.compressor.process(data)
+        if more:
+            return compressed + self.compressor.flush()
+        return compressed + self.compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def process(self, data: bytes, more: bool) -> bytes:
+        flush_mode = (
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            if more
+            else zstandard.COMPRESSOBJ_FLUSH_FINISH
+        )
+        return self.compressor.compress(data) + self.compressor.flush(flush_mode)
+
+
+def available_encodings() -> Tuple[str, ...]:
+    # best ratio first, used to break ties between equally weighted codings
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return tuple(encodings)
+
+
+def choose_encoding(accept_encoding: str, encodings: Tuple[str, ...]) -> str | None:
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    chosen, chosen_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > chosen_weight:
+            chosen, chosen_weight = encoding, weight
+    return chosen
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        cache: CompressedResponseCache | None = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.zstd_level = zstd_level
+        self.cache = cache
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        start_message: Message | None = None
+        encoder = None
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, encoder, status_code
+            if message["type"] == "http.response.start":
+                # held back until the first body chunk tells the response size
+                start_message = message
+                status_code = message["status"]
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is None:
+                if encoder is not None:
+                    message = {
+                        "type": "http.response.body",
+                        "body": encoder.process(body, more_body),
+                        "more_body": more_body,
+                    }
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+            if not self.is_compressible(start["status"], headers, body, more_body):
+                await send(start)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is None:
+                await send(start)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            if more_body:
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                encoder = self.get_encoder(encoding)
+                body = encoder.process(body, more_body)
+                HTTP_COMPRESSED_RESPONSES.labels(encoding, "streamed").inc()
+            else:
+                body = self.compress_body(scope, encoding, headers.get("etag"), body)
+                headers["Content-Length"] = str(len(body))
+
+            await send(start)
+            await send(
+                {"type": "http.response.body", "body": body, "more_body": more_body}
+            )
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if (
+                self.cache is not None
+                and scope["method"] in WRITE_METHODS
+                and status_code < 400
+            ):
+                self.cache.clear()
+
+    def is_compressible(
+        self, status_code: int, headers: MutableHeaders, body: bytes, more_body: bool
+    ) -> bool:
+        if status_code != 200 or "content-encoding" in headers:
+            return False
+        if not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+            return False
+        # a streamed body has no known size, only small single chunks are skipped
+        return more_body or len(body) >= self.minimum_size
+
+    def compress_body(
+        self, scope: Scope, encoding: str, etag: str | None, body: bytes
+    ) -> bytes:
+        cacheable = self.cache is not None and scope["method"] == "GET" and etag
+        if cacheable:
+            key = (scope["path"], scope["query_string"], encoding)
+            compressed = self.cache.get(key, etag)
+            if compressed is not None:
+                HTTP_COMPRESSED_RESPONSES.labels(encoding, "cached").inc()
+                return compressed
+
+        compressed = self.get_encoder(encoding).process(body, more=False)
+        HTTP_COMPRESSED_RESPONSES.labels(encoding, "compressed").inc()
+        if cacheable:
+            self.cache.put(key, etag, compressed)
+        return compressed
+
+    def get_encoder(self, encoding: str):
+        if encoding == "zstd":
+            return ZstdEncoder(self.zstd_level)
+        if encoding == "br":
+            return BrotliEncoder(self.brotli_quality)
+        return GzipEncoder(self.gzip_level)
@@ -0,0 +1,54 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from configs.replica_pool import (
+    CONSISTENCY_SESSION,
+    ConsistencySession,
+    format_lsn,
+    parse_lsn,
+)
+
+CONSISTENCY_HEADER = "X-Consistency-Token"
+
+
+class ConsistencyMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = Headers(scope=scope).get(CONSISTENCY_HEADER)
+        try:
+            required_lsn = 0 if token is None else parse_lsn(token)
+        except ValueError:
+            response = JSONResponse(
+                status_code=400,
+                content={"detail": f"Invalid consistency token {token}"},
+            )
+            await response(scope, receive, send)
+            return
+
+        # a mutable session, so writes made in threadpool copies of the
+        # context still reach the response headers
+        session = ConsistencySession(required_lsn=required_lsn)
+        context_token = CONSISTENCY_SESSION.set(session)
+
+        async def send_wrapper(message: Message):
+            if (
+                message["type"] == "http.response.start"
+                and session.written_lsn is not None
+            ):
+                headers = MutableHeaders(scope=message)
+                headers[CONSISTENCY_HEADER] = format_lsn(
+                    max(session.written_lsn, required_lsn)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            CONSISTENCY_SESSION.reset(context_token)
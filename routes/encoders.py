@@ -0,0 +1,35 @@
+from typing import AsyncIterator, Iterable, Iterator, List
+
+from models.serializers import dump_json
+
+
+def iter_ndjson_batches(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(dump_json(item) + b"\n" for item in batch)
+
+
+def iter_json_array_batches(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    separator = b"["
+    for batch in batches:
+        if batch:
+            yield separator + dump_json(batch)[1:-1]
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+async def aiter_ndjson_batches(
+    batches: AsyncIterator[List[dict]],
+) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield b"".join(dump_json(item) + b"\n" for item in batch)
+
+
+async def aiter_json_array_batches(
+    batches: AsyncIterator[List[dict]],
+) -> AsyncIterator[bytes]:
+    separator = b"["
+    async for batch in batches:
+        if batch:
+            yield separator + dump_json(batch)[1:-1]
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
@@ -0,0 +1,81 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List
+
+from models.product import Product
+
+
+def product_version(product: Product) -> datetime:
+    return product.updated_at or product.created_at
+
+
+def version_etag(version: datetime) -> str:
+    return f'"{version.isoformat()}"'
+
+
+def product_etag(product: Product) -> str:
+    return version_etag(product_version(product))
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def http_date(version: datetime) -> str:
+    # versions are naive local timestamps, like datetime.now() in the services
+    return format_datetime(version.astimezone(timezone.utc), usegmt=True)
+
+
+def version_headers(version: datetime) -> dict:
+    return {"ETag": version_etag(version), "Last-Modified": http_date(version)}
+
+
+def parse_if_match(value: str | None) -> List[datetime] | None:
+    if value is None or value.strip() == "*":
+        return None
+
+    # weak or malformed tags can never match, an empty list fails the check
+    versions = []
+    for tag in value.split(","):
+        tag = tag.strip()
+        if not tag.startswith('"') or not tag.endswith('"'):
+            continue
+        try:
+            versions.append(datetime.fromisoformat(tag[1:-1]))
+        except ValueError:
+            continue
+    return versions
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, W/ prefixes are ignored
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def is_not_modified(
+    etag: str,
+    last_modified: datetime | None,
+    if_none_match: str | None,
+    if_modified_since: str | None,
+) -> bool:
+    # If-Modified-Since is ignored when If-None-Match is sent (RFC 9110 13.2.2)
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+
+    # HTTP dates have one second precision
+    modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+    return modified <= since
@@ -1,15 +1,69 @@
 import logging
-from typing import Annotated, List
+from typing import Annotated, List, Literal
+from urllib.parse import quote, urlencode
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from psycopg2 import IntegrityError
 
+from configs.log_conf import LogPayload
+from models.batch import (
+    MAX_BATCH_SIZE,
+    BatchDeleteRequest,
+    BatchGetRequest,
+    BatchGetResult,
+    BatchResult,
+)
 from models.product import Product
+from models.product_change import (
+    INITIAL_POSITION,
+    ProductChangesPage,
+    decode_change_token,
+)
+from models.product_filter import (
+    ProductFilter,
+    decode_listing_cursor,
+    encode_listing_cursor,
+)
+from models.product_patch import ProductPatch, VersionMismatchError
+from models.product_search import decode_search_cursor, encode_search_cursor
+from models.stock import (
+    BatchStockAdjustmentRequest,
+    BatchStockAdjustmentResult,
+    InsufficientStockError,
+    StockAdjustment,
+)
+from routes.encoders import iter_json_array_batches, iter_ndjson_batches
+from routes.etags import (
+    body_etag,
+    etag_matches,
+    is_not_modified,
+    parse_if_match,
+    product_etag,
+    product_version,
+    version_etag,
+    version_headers,
+)
+from routes.responses import ORJSONResponse
 from services.product_service import ProductService
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
 
 def get_product_service(request: Request):
     return request.state.product_service
@@ -18,23 +72,162 @@ def get_product_service(request: Request):
 ServiceDep = Annotated[ProductService, Depends(get_product_service)]
 
 
-@router.get("/products", response_model=List[Product])
-def get_all_products(service: ServiceDep):
-    logger.info("Started GetAllProducts")
-    products_list: List[Product] = service.get_all_products()
+@router.get("/products", response_model=List[Product], response_class=ORJSONResponse)
+def get_all_products(
+    service: ServiceDep,
+    filters: Annotated[ProductFilter, Depends()],
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    logger.info(
+        "Started GetAllProducts with limit=%s after=%s filters=%s",
+        limit,
+        after,
+        filters,
+    )
+    try:
+        position = None if after is None else decode_listing_cursor(filters.sort, after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid listing cursor {after}",
+        ) from e
+
+    # rows are serialized straight to JSON, no Product models in between
+    products_list = service.get_all_product_dicts(
+        limit=limit, after=position, filters=filters
+    )
+    response = ORJSONResponse(products_list)
+    headers = {"ETag": body_etag(response.body)}
+
+    if len(products_list) == limit:
+        next_cursor = encode_listing_cursor(filters.sort, products_list[-1])
+        query = urlencode(
+            {
+                "limit": limit,
+                **filters.model_dump(mode="json", exclude_defaults=True),
+                "after": next_cursor,
+            }
+        )
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'</products?{query}>; rel="next"'
+
+    if if_none_match is not None and etag_matches(if_none_match, headers["ETag"]):
+        logger.info("GetAllProducts request finished not modified")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    logger.info("GetAllProducts request finished with %s products", len(products_list))
+    return response
+
+
+@router.get("/products/stream")
+def stream_all_products(
+    service: ServiceDep,
+    after: str | None = None,
+    format: Literal["ndjson", "json"] = "ndjson",
+):
+    logger.info("Started StreamAllProducts with format=%s after=%s", format, after)
+    batches = service.stream_all_product_dicts(after=after)
+
+    if format == "json":
+        return StreamingResponse(
+            iter_json_array_batches(batches), media_type="application/json"
+        )
+    return StreamingResponse(
+        iter_ndjson_batches(batches), media_type="application/x-ndjson"
+    )
+
+
+@router.get(
+    "/products/search", response_model=List[Product], response_class=ORJSONResponse
+)
+def search_products(
+    service: ServiceDep,
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    after: str | None = None,
+):
+    logger.info("Started SearchProducts with q=%s limit=%s after=%s", q, limit, after)
+    try:
+        position = None if after is None else decode_search_cursor(after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid search cursor {after}",
+        ) from e
+
+    results = service.search_products(q, limit, position)
+    response = ORJSONResponse([product for product, _ in results])
+
+    if len(results) == limit:
+        last_product, last_score = results[-1]
+        next_cursor = encode_search_cursor((last_score, last_product.id))
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = (
+            f"</products/search?q={quote(q)}&limit={limit}&after={next_cursor}>;"
+            ' rel="next"'
+        )
 
-    logger.info(f"GetAllProducts request finished with response={products_list}")
-    return products_list
+    logger.info("SearchProducts request finished with %s products", len(results))
+    return response
 
 
-@router.get("/products/{id}", response_model=Product)
-def get_product_by_id(id: str, service: ServiceDep):
+@router.get(
+    "/products/changes",
+    response_model=ProductChangesPage,
+    response_class=ORJSONResponse,
+)
+def get_product_changes(
+    service: ServiceDep,
+    since: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+):
+    logger.info("Started GetProductChanges with since=%s limit=%s", since, limit)
     try:
-        logger.info(f"Started GetProduct with id={id}")
+        position = INITIAL_POSITION if since is None else decode_change_token(since)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid change token {since}",
+        ) from e
+
+    page = service.get_product_changes(position, limit)
+
+    logger.info("GetProductChanges request finished with %s changes", len(page.changes))
+    return ORJSONResponse(page)
+
+
+@router.get("/products/{id}", response_model=Product, response_class=ORJSONResponse)
+def get_product_by_id(
+    id: str,
+    service: ServiceDep,
+    if_none_match: Annotated[str | None, Header()] = None,
+    if_modified_since: Annotated[str | None, Header()] = None,
+):
+    try:
+        logger.info("Started GetProduct with id=%s", id)
+        if if_none_match is not None or if_modified_since is not None:
+            version = service.get_product_version_by_id(id)
+            if is_not_modified(
+                version_etag(version), version, if_none_match, if_modified_since
+            ):
+                logger.info("GetProduct request finished not modified")
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers=version_headers(version),
+                )
+
         product = service.get_product_by_id(id)
 
-        logger.info(f"GetProduct request finished with response={product.model_dump()}")
-        return product
+        logger.debug(
+            "GetProduct request finished with response=%s", LogPayload(product)
+        )
+        return ORJSONResponse(
+            service.encode_product(product),
+            headers=version_headers(product_version(product)),
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -42,16 +235,37 @@ def get_product_by_id(id: str, service: ServiceDep):
         ) from e
 
 
-@router.get("/products/name/{name}", response_model=Product)
-def get_product_by_name(name: str, service: ServiceDep):
+@router.get(
+    "/products/name/{name}", response_model=Product, response_class=ORJSONResponse
+)
+def get_product_by_name(
+    name: str,
+    service: ServiceDep,
+    if_none_match: Annotated[str | None, Header()] = None,
+    if_modified_since: Annotated[str | None, Header()] = None,
+):
     try:
-        logger.info(f"Started GetProductByName with name={name}")
+        logger.info("Started GetProductByName with name=%s", name)
+        if if_none_match is not None or if_modified_since is not None:
+            version = service.get_product_version_by_name(name)
+            if is_not_modified(
+                version_etag(version), version, if_none_match, if_modified_since
+            ):
+                logger.info("GetProductByName request finished not modified")
+                return Response(
+                    status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers=version_headers(version),
+                )
+
         product = service.get_product_by_name(name)
 
-        logger.info(
-            f"GetProductByName request finished with response={product.model_dump()}"
+        logger.debug(
+            "GetProductByName request finished with response=%s", LogPayload(product)
+        )
+        return ORJSONResponse(
+            service.encode_product(product),
+            headers=version_headers(product_version(product)),
         )
-        return product
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -61,21 +275,24 @@ def get_product_by_name(name: str, service: ServiceDep):
 
 @router.post("/products", status_code=status.HTTP_201_CREATED, response_model=Product)
 def create_product(product: Product, service: ServiceDep):
-    logger.info(f"Started CreateProduct with body={product.model_dump()}")
+    logger.info("Started CreateProduct with id=%s", product.id)
     product_created = service.create_product(product)
 
-    logger.info(f"CreateProduct request finished with response={product.model_dump()}")
+    logger.debug(
+        "CreateProduct request finished with response=%s", LogPayload(product_created)
+    )
     return product_created
 
 
 @router.put("/products", response_model=Product)
 def update_product(product: Product, service: ServiceDep):
     try:
-        logger.info(f"Started UpdateProduct with body={product.model_dump()}")
+        logger.info("Started UpdateProduct with id=%s", product.id)
         product_updated = service.update_product(product)
 
-        logger.info(
-            f"UpdateProduct request finished with response={product.model_dump()}"
+        logger.debug(
+            "UpdateProduct request finished with response=%s",
+            LogPayload(product_updated),
         )
         return product_updated
     except ValueError as e:
@@ -85,16 +302,157 @@ def update_product(product: Product, service: ServiceDep):
         ) from e
 
 
+@router.patch("/products/{id}", response_model=Product, response_class=ORJSONResponse)
+def patch_product(
+    id: str,
+    patch: ProductPatch,
+    service: ServiceDep,
+    if_match: Annotated[str | None, Header()] = None,
+):
+    try:
+        logger.info(
+            "Started PatchProduct with id=%s fields=%s",
+            id,
+            sorted(patch.model_fields_set),
+        )
+        product_patched = service.patch_product(id, patch, parse_if_match(if_match))
+
+        logger.debug(
+            "PatchProduct request finished with response=%s",
+            LogPayload(product_patched),
+        )
+        return ORJSONResponse(
+            service.encode_product(product_patched),
+            headers={"ETag": product_etag(product_patched)},
+        )
+    except VersionMismatchError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"Product {id} does not match the If-Match version",
+        ) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product not found with id {id}",
+        ) from e
+    except IntegrityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Product {id} conflicts with an existing product",
+        ) from e
+
+
 @router.delete("/products/{id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_product(id: str, service: ServiceDep):
     try:
-        logger.info(f"Started DeleteProduct with id={id}")
+        logger.info("Started DeleteProduct with id=%s", id)
         service.delete_product_by_id(id)
 
-        logger.info(f"DeleteProduct request finished for id={id}")
+        logger.info("DeleteProduct request finished for id=%s", id)
         return
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product not found with id {id}",
         ) from e
+
+
+@router.post("/products:batch", response_model=BatchResult)
+def create_products(
+    products: Annotated[List[Product], Body(max_length=MAX_BATCH_SIZE)],
+    service: ServiceDep,
+):
+    logger.info("Started CreateProducts with %s products", len(products))
+    results = service.create_products(products)
+
+    logger.info("CreateProducts request finished for %s products", len(results))
+    return BatchResult(results=results)
+
+
+@router.patch("/products:batch", response_model=BatchResult)
+def update_products(
+    products: Annotated[List[Product], Body(max_length=MAX_BATCH_SIZE)],
+    service: ServiceDep,
+):
+    try:
+        logger.info("Started UpdateProducts with %s products", len(products))
+        results = service.update_products(products)
+
+        logger.info("UpdateProducts request finished for %s products", len(results))
+        return BatchResult(results=results)
+    except IntegrityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Products batch conflicts with existing products",
+        ) from e
+
+
+@router.delete("/products:batch", response_model=BatchResult)
+def delete_products(request: BatchDeleteRequest, service: ServiceDep):
+    logger.info("Started DeleteProducts with %s ids", len(request.ids))
+    results = service.delete_products_by_ids(request.ids)
+
+    logger.info("DeleteProducts request finished for %s ids", len(results))
+    return BatchResult(results=results)
+
+
+@router.post(
+    "/products/{id}/stock:adjust",
+    response_model=Product,
+    response_class=ORJSONResponse,
+)
+def adjust_product_stock(id: str, adjustment: StockAdjustment, service: ServiceDep):
+    try:
+        logger.info(
+            "Started AdjustProductStock with id=%s delta=%s", id, adjustment.delta
+        )
+        product_adjusted = service.adjust_product_stock(id, adjustment.delta)
+
+        logger.info(
+            "AdjustProductStock request finished with quantity=%s",
+            product_adjusted.quantity,
+        )
+        return ORJSONResponse(service.encode_product(product_adjusted))
+    except InsufficientStockError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Insufficient stock for product {id}, {e.available} available",
+        ) from e
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product not found with id {id}",
+        ) from e
+
+
+@router.post("/products:batchAdjustStock", response_model=BatchStockAdjustmentResult)
+def adjust_products_stock(request: BatchStockAdjustmentRequest, service: ServiceDep):
+    logger.info("Started BatchAdjustProductStock with %s lines", len(request.lines))
+    results = service.adjust_products_stock(request.lines)
+
+    logger.info(
+        "BatchAdjustProductStock request finished with %s rejected lines",
+        sum(result.status != "adjusted" for result in results),
+    )
+    return BatchStockAdjustmentResult(results=results)
+
+
+@router.post(
+    "/products:batchGet",
+    response_model=BatchGetResult,
+    response_class=ORJSONResponse,
+)
+def get_products_batch(request: BatchGetRequest, service: ServiceDep):
+    if request.ids is not None:
+        logger.info("Started BatchGetProducts with %s ids", len(request.ids))
+        result = service.get_products_by_ids(request.ids)
+    else:
+        logger.info("Started BatchGetProducts with %s names", len(request.names))
+        result = service.get_products_by_names(request.names)
+
+    logger.info(
+        "BatchGetProducts request finished with %s products and %s missing",
+        len(result.products),
+        len(result.missing),
+    )
+    return ORJSONResponse(result)
@@ -0,0 +1,13 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from models.serializers import dump_json
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        # content already serialized upstream, e.g. cached product bytes
+        if isinstance(content, bytes):
+            return content
+        return dump_json(content)
@@ -0,0 +1,39 @@
+from dotenv import load_dotenv
+from gunicorn.app.base import BaseApplication
+from uvicorn_worker import UvicornWorker
+
+from configs.server_conf import get_drain_timeout, get_server_options
+
+
+class ProductServiceWorker(UvicornWorker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # in-flight requests are cancelled at the deadline so the lifespan
+        # shutdown still closes the pools before gunicorn kills the worker
+        self.config.timeout_graceful_shutdown = get_drain_timeout()
+
+
+class ProductServiceApplication(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # with preload_app this runs once in the master, workers are forked
+        # with the app imported and open their own pools in the lifespan
+        from main import app
+
+        return app
+
+
+def main() -> None:
+    load_dotenv()
+    ProductServiceApplication(get_server_options()).run()
+
+
+if __name__ == "__main__":
+    main()
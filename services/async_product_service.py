@@ -0,0 +1,378 @@
+import logging
+from datetime import datetime
+from typing import AsyncIterator, List, Tuple
+
+from caches.product_cache import MISSING, ProductCache
+from caches.single_flight import AsyncSingleFlight
+from caches.shared_cache import AsyncSharedProductCache
+from configs.replica_pool import get_required_lsn
+from models.batch import BatchGetResult, BatchItemResult
+from models.product import Product
+from models.product_change import (
+    ChangePosition,
+    ProductChangesPage,
+    encode_change_token,
+)
+from models.product_filter import ListingPosition, ProductFilter
+from models.product_patch import ProductPatch, VersionMismatchError
+from models.product_search import SearchPosition
+from models.serializers import dump_json
+from models.stock import (
+    InsufficientStockError,
+    StockAdjustmentLine,
+    StockAdjustmentResult,
+)
+from storages.async_product_storage import AsyncProductStorage
+
+
+class AsyncProductService:
+    def __init__(
+        self,
+        storage: AsyncProductStorage,
+        cache: ProductCache | None = None,
+        shared_cache: AsyncSharedProductCache | None = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.storage = storage
+        self.cache = cache
+        self.shared_cache = shared_cache
+        self.single_flight = AsyncSingleFlight()
+
+    async def get_all_products(
+        self,
+        limit: int | None = None,
+        after: ListingPosition | None = None,
+        filters: ProductFilter | None = None,
+    ) -> List[Product]:
+        self.logger.info("Getting all products...")
+        # concurrent identical listings share one query
+        return await self.single_flight.do(
+            "get_all_products",
+            (limit, after, filters),
+            self.storage.get_all_products,
+            limit=limit,
+            after=after,
+            filters=filters,
+        )
+
+    async def get_all_product_dicts(
+        self,
+        limit: int | None = None,
+        after: ListingPosition | None = None,
+        filters: ProductFilter | None = None,
+    ) -> List[dict]:
+        self.logger.info("Getting all products as dicts...")
+        # concurrent identical listings share one query
+        return await self.single_flight.do(
+            "get_all_product_dicts",
+            (limit, after, filters),
+            self.storage.get_all_product_dicts,
+            limit=limit,
+            after=after,
+            filters=filters,
+        )
+
+    def stream_all_products(self, after: str | None = None) -> AsyncIterator[Product]:
+        self.logger.info("Streaming all products...")
+        return self.storage.stream_all_products(after=after)
+
+    def stream_all_product_dicts(
+        self, after: str | None = None
+    ) -> AsyncIterator[List[dict]]:
+        self.logger.info("Streaming all products as dicts...")
+        return self.storage.stream_all_product_dicts(after=after)
+
+    async def search_products(
+        self, query: str, limit: int, after: SearchPosition | None = None
+    ) -> List[Tuple[Product, float]]:
+        self.logger.info("Searching products...")
+        return await self.storage.search_products(query, limit, after)
+
+    async def get_product_changes(
+        self, since: ChangePosition, limit: int
+    ) -> ProductChangesPage:
+        self.logger.info("Getting product changes...")
+        changes = await self.storage.get_product_changes(since, limit)
+
+        next_token = changes[-1].token if changes else encode_change_token(since)
+        return ProductChangesPage(changes=changes, next_token=next_token)
+
+    async def get_product_by_id(self, id: str) -> Product:
+        self.logger.info("Getting product by id...")
+        cached = await self._get_cached("id", id)
+        if cached is None:
+            raise ValueError(f"Product not found with id {id}")
+        if cached is not MISSING:
+            return cached
+
+        return await self.single_flight.do(
+            "get_product_by_id", id, self._load_product, "id", id
+        )
+
+    async def get_product_by_name(self, name: str) -> Product:
+        self.logger.info("Getting product by name...")
+        cached = await self._get_cached("name", name)
+        if cached is None:
+            raise ValueError(f"Product not found with name {name}")
+        if cached is not MISSING:
+            return cached
+
+        return await self.single_flight.do(
+            "get_product_by_name", name, self._load_product, "name", name
+        )
+
+    async def get_product_version_by_id(self, id: str) -> datetime:
+        # a cached product answers revalidation without touching the database
+        cached = await self._get_cached("id", id)
+        if cached is None:
+            raise ValueError(f"Product not found with id {id}")
+        if cached is not MISSING:
+            return cached.updated_at or cached.created_at
+        return await self.single_flight.do(
+            "get_product_version_by_id",
+            id,
+            self.storage.get_product_version_by_id,
+            id,
+        )
+
+    async def get_product_version_by_name(self, name: str) -> datetime:
+        cached = await self._get_cached("name", name)
+        if cached is None:
+            raise ValueError(f"Product not found with name {name}")
+        if cached is not MISSING:
+            return cached.updated_at or cached.created_at
+        return await self.single_flight.do(
+            "get_product_version_by_name",
+            name,
+            self.storage.get_product_version_by_name,
+            name,
+        )
+
+    async def _load_product(self, field: str, key: str) -> Product:
+        # runs once per key for all concurrent callers, the cache fill included
+        generation = self._cache_generation()
+        try:
+            if field == "id":
+                product = await self.storage.get_product_by_id(key)
+            else:
+                product = await self.storage.get_product_by_name(key)
+        except ValueError:
+            await self._put_missing(field, key, generation)
+            raise
+
+        await self._put_loaded(product, generation)
+        return product
+
+    async def _get_cached(self, field: str, key: str) -> Product | None | object:
+        # a read carrying a consistency token may follow a write made on another
+        # worker, only a caught up replica or the primary can answer it
+        if get_required_lsn() > 0:
+            return MISSING
+
+        cached = MISSING if self.cache is None else self.cache.get(field, key)
+        if cached is not MISSING or self.shared_cache is None:
+            return cached
+
+        if field == "id":
+            loader = self.storage.get_product_by_id
+        else:
+            loader = self.storage.get_product_by_name
+        generation = self._cache_generation()
+        cached = await self.shared_cache.get(field, key, loader)
+        if self.cache is not None:
+            if cached is None:
+                self.cache.put_missing(field, key, generation)
+            elif cached is not MISSING:
+                self.cache.put(cached, generation)
+        return cached
+
+    def _cache_generation(self) -> int:
+        # taken before a load, so writes landing meanwhile are not undone by it
+        return 0 if self.cache is None else self.cache.generation()
+
+    async def _put_missing(self, field: str, key: str, generation: int) -> None:
+        if self.cache is not None:
+            self.cache.put_missing(field, key, generation)
+        if self.shared_cache is not None:
+            await self.shared_cache.put_missing(field, key)
+
+    async def _put_loaded(self, product: Product, generation: int) -> None:
+        if self.cache is not None:
+            self.cache.put(product, generation)
+        if self.shared_cache is not None:
+            await self.shared_cache.put(product)
+
+    async def _put_written(self, product: Product) -> None:
+        # the other workers drop their local copy when the write is broadcast
+        if self.cache is not None:
+            self.cache.put(product)
+        if self.shared_cache is not None:
+            await self.shared_cache.put(product, broadcast=True)
+
+    async def _invalidate(self, id: str) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(id)
+        if self.shared_cache is not None:
+            await self.shared_cache.invalidate(id)
+
+    def encode_product(self, product: Product) -> bytes:
+        if self.cache is None:
+            return dump_json(product)
+        return self.cache.get_json(product)
+
+    async def get_products_by_ids(self, ids: List[str]) -> BatchGetResult:
+        self.logger.info(f"Getting {len(ids)} products by id...")
+        return await self._get_many("id", ids)
+
+    async def get_products_by_names(self, names: List[str]) -> BatchGetResult:
+        self.logger.info(f"Getting {len(names)} products by name...")
+        return await self._get_many("name", names)
+
+    async def _get_many(self, field: str, keys: List[str]) -> BatchGetResult:
+        keys = list(dict.fromkeys(keys))
+        found = (
+            self.cache.get_many(field, keys)
+            if self.cache is not None and get_required_lsn() == 0
+            else {}
+        )
+        pending = [key for key in keys if key not in found]
+
+        if pending:
+            generation = self._cache_generation()
+            if field == "id":
+                products = await self.storage.get_products_by_ids(pending)
+            else:
+                products = await self.storage.get_products_by_names(pending)
+
+            for product in products:
+                found[getattr(product, field)] = product
+            if self.cache is not None:
+                self.cache.put_many(field, pending, products, generation)
+
+        return BatchGetResult(
+            products=[found[key] for key in keys if found.get(key) is not None],
+            missing=[key for key in keys if found.get(key) is None],
+        )
+
+    async def create_product(self, product: Product) -> Product:
+        self.logger.info("Creating product...")
+        product_created = await self.storage.create_product(product)
+
+        await self._put_written(product_created)
+        return product_created
+
+    async def update_product(self, product: Product) -> Product:
+        self.logger.info(f"Updating product with ID {product.id}...")
+        product.updated_at = datetime.now()
+        try:
+            product_updated = await self.storage.update_product(product)
+        except ValueError:
+            await self._invalidate(product.id)
+            raise
+
+        await self._put_written(product_updated)
+        return product_updated
+
+    async def patch_product(
+        self, id: str, patch: ProductPatch, versions: List[datetime] | None = None
+    ) -> Product:
+        self.logger.info(f"Patching product with ID {id}...")
+        changes = patch.model_dump(exclude_unset=True)
+        changes["updated_at"] = datetime.now()
+        try:
+            product_patched = await self.storage.patch_product(id, changes, versions)
+        except (ValueError, VersionMismatchError):
+            await self._invalidate(id)
+            raise
+
+        await self._put_written(product_patched)
+        return product_patched
+
+    async def adjust_product_stock(self, id: str, delta: int) -> Product:
+        self.logger.info("Adjusting product stock...")
+        try:
+            product_adjusted = await self.storage.adjust_product_stock(
+                id, delta, datetime.now()
+            )
+        except (ValueError, InsufficientStockError):
+            await self._invalidate(id)
+            raise
+
+        await self._put_written(product_adjusted)
+        return product_adjusted
+
+    async def adjust_products_stock(
+        self, lines: List[StockAdjustmentLine]
+    ) -> List[StockAdjustmentResult]:
+        self.logger.info(f"Adjusting stock of {len(lines)} lines...")
+        try:
+            return await self.storage.adjust_products_stock(lines, datetime.now())
+        finally:
+            for line in lines:
+                await self._invalidate(line.id)
+
+    async def delete_product_by_id(self, id: str) -> None:
+        self.logger.info("Deleting product by id...")
+        try:
+            await self.storage.delete_product_by_id(id)
+        finally:
+            await self._invalidate(id)
+
+    async def create_products(self, products: List[Product]) -> List[BatchItemResult]:
+        self.logger.info(f"Creating {len(products)} products...")
+        created_ids = set(await self.storage.create_products(products))
+
+        results = []
+        for product in products:
+            if product.id in created_ids:
+                created_ids.discard(product.id)
+                results.append(BatchItemResult(id=product.id, status="created"))
+                await self._put_written(product)
+            else:
+                results.append(BatchItemResult(id=product.id, status="conflict"))
+        return results
+
+    async def update_products(self, products: List[Product]) -> List[BatchItemResult]:
+        self.logger.info(f"Updating {len(products)} products...")
+        updated_at = datetime.now()
+        for product in products:
+            product.updated_at = updated_at
+
+        # the last occurrence of a repeated id wins, earlier ones are reported
+        latest_products = {product.id: product for product in products}
+        products_updated = {
+            product.id: product
+            for product in await self.storage.update_products(
+                list(latest_products.values())
+            )
+        }
+
+        results = []
+        for product in products:
+            product_updated = products_updated.get(product.id)
+            if latest_products[product.id] is not product:
+                results.append(BatchItemResult(id=product.id, status="conflict"))
+            elif product_updated is not None:
+                results.append(BatchItemResult(id=product.id, status="updated"))
+                await self._put_written(product_updated)
+            else:
+                results.append(BatchItemResult(id=product.id, status="not_found"))
+                await self._invalidate(product.id)
+        return results
+
+    async def delete_products_by_ids(self, ids: List[str]) -> List[BatchItemResult]:
+        self.logger.info(f"Deleting {len(ids)} products...")
+        try:
+            deleted_ids = set(await self.storage.delete_products_by_ids(ids))
+        finally:
+            for id in ids:
+                await self._invalidate(id)
+
+        results = []
+        for id in ids:
+            if id in deleted_ids:
+                deleted_ids.discard(id)
+                results.append(BatchItemResult(id=id, status="deleted"))
+            else:
+                results.append(BatchItemResult(id=id, status="not_found"))
+        return results
@@ -0,0 +1,598 @@
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+
+from psycopg import AsyncConnection, DatabaseError
+from psycopg_pool import AsyncConnectionPool
+
+from configs.replica_pool import AsyncReplicaPool
+from metrics.instruments import AsyncTimedCursor
+from models.product import Product
+from models.product_change import ChangePosition, ProductChange
+from models.product_filter import ListingPosition, ProductFilter
+from models.product_patch import VersionMismatchError
+from models.product_search import SearchPosition
+from models.stock import (
+    InsufficientStockError,
+    StockAdjustmentLine,
+    StockAdjustmentResult,
+)
+from storages.batch_loader import AsyncBatchLoader
+from storages.prepared_statements import AsyncPreparedStatements
+from storages.product_storage import (
+    ADJUST_PRODUCTS_STOCK,
+    ADJUST_PRODUCT_STOCK,
+    DELETE_PRODUCTS_BY_IDS,
+    DELETE_PRODUCT_BY_ID,
+    INSERT_PRODUCT,
+    INSERT_PRODUCTS,
+    SEARCH_PRODUCTS,
+    SELECT_PRODUCTS_BY_IDS,
+    SELECT_PRODUCTS_BY_NAMES,
+    SELECT_PRODUCT_BY_ID,
+    SELECT_PRODUCT_BY_NAME,
+    SELECT_PRODUCT_CHANGES,
+    SELECT_PRODUCT_QUANTITY,
+    SELECT_PRODUCT_VERSION,
+    SELECT_PRODUCT_VERSION_BY_NAME,
+    STREAM_PRODUCTS,
+    UPDATE_PRODUCT,
+    UPDATE_PRODUCTS,
+    ProductStorage,
+    build_product_listing_query,
+    build_product_patch_query,
+    build_search_tsquery,
+    escape_like,
+)
+
+
+class AsyncProductStorage:
+    def __init__(
+        self,
+        db_pool: AsyncConnectionPool,
+        prepare_statements: bool = False,
+        replica_pool: AsyncReplicaPool | None = None,
+        batch_window: float = 0.0,
+        max_batch_size: int = 100,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.db_pool = db_pool
+        self.replica_pool = replica_pool
+        self.read_pool = replica_pool or db_pool
+        # concurrent point lookups within the window share one ANY() query
+        self.id_loader = self.name_loader = None
+        if batch_window > 0:
+            self.id_loader = AsyncBatchLoader(
+                "get_product_by_id",
+                self._load_products_by_ids,
+                batch_window,
+                max_batch_size,
+            )
+            self.name_loader = AsyncBatchLoader(
+                "get_product_by_name",
+                self._load_products_by_names,
+                batch_window,
+                max_batch_size,
+            )
+        self.prepared_statements = (
+            AsyncPreparedStatements() if prepare_statements else None
+        )
+
+    async def _execute(
+        self, cursor: AsyncTimedCursor, sql_query: str, params: tuple | list
+    ):
+        if self.prepared_statements is None:
+            return await cursor.execute(sql_query, params)
+        return await self.prepared_statements.execute(cursor, sql_query, params)
+
+    async def _commit(self, db: AsyncConnection) -> None:
+        await db.commit()
+        if self.replica_pool is not None:
+            await self.replica_pool.record_write(db)
+
+    async def get_all_products(
+        self,
+        limit: int | None = None,
+        after: ListingPosition | None = None,
+        filters: ProductFilter | None = None,
+    ) -> List[Product]:
+        self.logger.info("Getting all products in DB")
+        return await self._get_all_products(
+            limit, after, filters, self.map_product_row_to_model
+        )
+
+    async def get_all_product_dicts(
+        self,
+        limit: int | None = None,
+        after: ListingPosition | None = None,
+        filters: ProductFilter | None = None,
+    ) -> List[dict]:
+        self.logger.info("Getting all products in DB as dicts")
+        return await self._get_all_products(
+            limit, after, filters, self.map_product_row_to_dict
+        )
+
+    async def _get_all_products(
+        self,
+        limit: int | None,
+        after: ListingPosition | None,
+        filters: ProductFilter | None,
+        map_row: Callable,
+    ) -> list:
+        try:
+            async with self.read_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(), "get_all_products"
+            ) as cursor:
+                sql_query, params = build_product_listing_query(
+                    limit, after, filters or ProductFilter()
+                )
+                await self._execute(cursor, sql_query, params)
+                rows = await cursor.fetchall()
+
+                with cursor.timer("map"):
+                    return [map_row(row) for row in rows]
+        except DatabaseError as ex:
+            self.logger.error(f"Failed to get all products in DB. DatabaseError: {ex}")
+            raise
+
+    async def stream_all_products(
+        self, after: str | None = None, batch_size: int = 500
+    ) -> AsyncIterator[Product]:
+        self.logger.info("Streaming all products from DB")
+        async for rows in self._stream_product_rows(after, batch_size):
+            for row in rows:
+                yield self.map_product_row_to_model(row)
+
+    async def stream_all_product_dicts(
+        self, after: str | None = None, batch_size: int = 500
+    ) -> AsyncIterator[List[dict]]:
+        self.logger.info("Streaming all products from DB as dicts")
+        async for rows in self._stream_product_rows(after, batch_size):
+            yield [self.map_product_row_to_dict(row) for row in rows]
+
+    async def _stream_product_rows(
+        self, after: str | None, batch_size: int
+    ) -> AsyncIterator[List[tuple]]:
+        try:
+            async with self.db_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(name="products_stream"), "stream_all_products"
+            ) as cursor:
+                await cursor.execute(STREAM_PRODUCTS, (after or "",))
+
+                while rows := await cursor.fetchmany(batch_size):
+                    yield rows
+        except DatabaseError as ex:
+            self.logger.error(f"Failed to stream products from DB. DatabaseError: {ex}")
+            raise
+
+    async def get_product_by_id(self, id: str) -> Product:
+        self.logger.info("Getting product in DB")
+        if self.id_loader is not None:
+            product = await self.id_loader.load(id)
+            if product is None:
+                raise ValueError(f"Product not found with id {id}")
+            return product
+
+        try:
+            async with self.read_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(), "get_product_by_id"
+            ) as cursor:
+                await self._execute(cursor, SELECT_PRODUCT_BY_ID, (id,))
+                result = await cursor.fetchone()
+
+                if result is None:
+                    raise ValueError(f"Product not found with id {id}")
+
+                return self.map_product_row_to_model(result)
+        except DatabaseError as ex:
+            self.logger.error(
+                f"Failed to get product by id={id} in DB. DatabaseError: {ex}"
+            )
+            raise
+
+    async def get_product_by_name(self, name: str) -> Product:
+        self.logger.info("Getting product by name in DB")
+        if self.name_loader is not None:
+            product = await self.name_loader.load(name)
+            if product is None:
+                raise ValueError(f"Product not found with name {name}")
+            return product
+
+        try:
+            async with self.read_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(), "get_product_by_name"
+            ) as cursor:
+                await self._execute(cursor, SELECT_PRODUCT_BY_NAME, (name,))
+                result = await cursor.fetchone()
+
+                if result is None:
+                    raise ValueError(f"Product not found with name {name}")
+
+                return self.map_product_row_to_model(result)
+        except DatabaseError as ex:
+            self.logger.error(
+                f"Failed to get product by name={name} in DB. DatabaseError: {ex}"
+            )
+            raise
+
+    async def get_product_version_by_id(self, id: str) -> datetime:
+        self.logger.info("Getting product version in DB")
+        try:
+            async with self.read_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(), "get_product_version_by_id"
+            ) as cursor:
+                await self._execute(cursor, SELECT_PRODUCT_VERSION, (id,))
+                result = await cursor.fetchone()
+
+                if result is None:
+                    raise ValueError(f"Product not found with id {id}")
+
+                return result[0]
+        except DatabaseError as ex:
+            self.logger.error(
+                f"Failed to get product version by id={id} in DB. DatabaseError: {ex}"
+            )
+            raise
+
+    async def get_product_version_by_name(self, name: str) -> datetime:
+        self.logger.info("Getting product version by name in DB")
+        try:
+            async with self.read_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(), "get_product_version_by_name"
+            ) as cursor:
+                await self._execute(cursor, SELECT_PRODUCT_VERSION_BY_NAME, (name,))
+                result = await cursor.fetchone()
+
+                if result is None:
+                    raise ValueError(f"Product not found with name {name}")
+
+                return result[0]
+        except DatabaseError as ex:
+            self.logger.error(
+                f"Failed to get product version by name={name} in DB. "
+                f"DatabaseError: {ex}"
+            )
+            raise
+
+    async def _load_products_by_ids(self, ids: List[str]) -> Dict[str, Product]:
+        return {product.id: product for product in await self.get_products_by_ids(ids)}
+
+    async def _load_products_by_names(self, names: List[str]) -> Dict[str, Product]:
+        products = await self.get_products_by_names(names)
+        return {product.name: product for product in products}
+
+    async def get_products_by_ids(self, ids: List[str]) -> List[Product]:
+        self.logger.info(f"Getting {len(ids)} products by id in DB")
+        try:
+            async with self.read_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(), "get_products_by_ids"
+            ) as cursor:
+                await cursor.execute(SELECT_PRODUCTS_BY_IDS, (ids,))
+                rows = await cursor.fetchall()
+
+                with cursor.timer("map"):
+                    return [self.map_product_row_to_model(row) for row in rows]
+        except DatabaseError as ex:
+            self.logger.error(
+                f"Failed to get products by ids in DB. DatabaseError: {ex}"
+            )
+            raise
+
+    async def get_products_by_names(self, names: List[str]) -> List[Product]:
+        self.logger.info(f"Getting {len(names)} products by name in DB")
+        try:
+            async with self.read_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(), "get_products_by_names"
+            ) as cursor:
+                await cursor.execute(SELECT_PRODUCTS_BY_NAMES, (names,))
+                rows = await cursor.fetchall()
+
+                with cursor.timer("map"):
+                    return [self.map_product_row_to_model(row) for row in rows]
+        except DatabaseError as ex:
+            self.logger.error(
+                f"Failed to get products by names in DB. DatabaseError: {ex}"
+            )
+            raise
+
+    async def search_products(
+        self, query: str, limit: int, after: SearchPosition | None = None
+    ) -> List[Tuple[Product, float]]:
+        self.logger.info("Searching products in DB")
+        try:
+            async with self.db_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(), "search_products"
+            ) as cursor:
+                sql_query = SEARCH_PRODUCTS
+                tsquery = build_search_tsquery(query)
+                params: list = [
+                    tsquery,
+                    query,
+                    tsquery,
+                    query,
+                    escape_like(query) + "%",
+                ]
+
+                if after is not None:
+                    sql_query += (
+                        " WHERE score < %s::real OR (score = %s::real AND id > %s)"
+                    )
+                    params.extend([after[0], after[0], after[1]])
+
+                sql_query += " ORDER BY score DESC, id LIMIT %s"
+                params.append(limit)
+
+                await cursor.execute(sql_query, params)
+                rows = await cursor.fetchall()
+
+                with cursor.timer("map"):
+                    return [
+                        (self.map_product_row_to_model(row), row[8]) for row in rows
+                    ]
+        except DatabaseError as ex:
+            self.logger.error(f"Failed to search products in DB. DatabaseError: {ex}")
+            raise
+
+    async def get_product_changes(
+        self, since: ChangePosition, limit: int
+    ) -> List[ProductChange]:
+        self.logger.info("Getting product changes in DB")
+        try:
+            async with self.db_pool.connection() as db, AsyncTimedCursor(
+                db.cursor(), "get_product_changes"
+            ) as cursor:
+                await cursor.execute(
+                    SELECT_PRODUCT_CHANGES, (str(since[0]), since[1], limit)
+                )
+                rows = await cursor.fetchall()
+
+                with cursor.timer("map"):
+                    return [self.map_change_row_to_model(row) for row in rows]
+        except DatabaseError as ex:
+            self.logger.error(
+                f"Failed to get product changes in DB. DatabaseError: {ex}"
+            )
+            raise
+
+    async def create_product(self, product: Product) -> Product:
+        self.logger.info("Inserting product in DB")
+        async with self.db_pool.connection() as db:
+            try:
+                async with AsyncTimedCursor(db.cursor(), "create_product") as cursor:
+                    await self._execute(
+                        cursor,
+                        INSERT_PRODUCT,
+                        (
+                            product.id,
+                            product.name,
+                            product.description,
+                            product.price,
+                            product.quantity,
+                            product.active,
+                            product.created_at,
+                        ),
+                    )
+                    await self._commit(db)
+                    return product
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to insert product in DB. DatabaseError: {ex}"
+                )
+                await db.rollback()
+                raise
+
+    async def update_product(self, product: Product) -> Product:
+        self.logger.info(f"Updating product in DB with ID {product.id}")
+        async with self.db_pool.connection() as db:
+            try:
+                async with AsyncTimedCursor(db.cursor(), "update_product") as cursor:
+                    await self._execute(
+                        cursor,
+                        UPDATE_PRODUCT,
+                        (
+                            product.name,
+                            product.description,
+                            product.price,
+                            product.quantity,
+                            product.active,
+                            product.updated_at,
+                            product.id,
+                        ),
+                    )
+                    result = await cursor.fetchone()
+
+                    if result is None:
+                        raise ValueError(f"Product with ID {product.id} not found.")
+
+                await self._commit(db)
+                return self.map_product_row_to_model(result)
+            except DatabaseError as ex:
+                self.logger.error(f"Failed on update operation. Error: {ex}")
+                await db.rollback()
+                raise
+
+    async def patch_product(
+        self, id: str, changes: dict, versions: List[datetime] | None = None
+    ) -> Product:
+        self.logger.info(f"Patching product in DB with ID {id}")
+        async with self.db_pool.connection() as db:
+            try:
+                async with AsyncTimedCursor(db.cursor(), "patch_product") as cursor:
+                    sql_query, params = build_product_patch_query(id, changes, versions)
+                    await self._execute(cursor, sql_query, params)
+                    result = await cursor.fetchone()
+
+                    if result is None:
+                        await cursor.execute(SELECT_PRODUCT_VERSION, (id,))
+                        if await cursor.fetchone() is None:
+                            raise ValueError(f"Product with ID {id} not found.")
+                        raise VersionMismatchError(id)
+
+                await self._commit(db)
+                return self.map_product_row_to_model(result)
+            except DatabaseError as ex:
+                self.logger.error(f"Failed on patch operation. Error: {ex}")
+                await db.rollback()
+                raise
+
+    async def delete_product_by_id(self, id: str) -> None:
+        self.logger.info("Deleting product in DB")
+        async with self.db_pool.connection() as db:
+            try:
+                async with AsyncTimedCursor(
+                    db.cursor(), "delete_product_by_id"
+                ) as cursor:
+                    await self._execute(cursor, DELETE_PRODUCT_BY_ID, (id,))
+
+                    if cursor.rowcount == 0:
+                        raise ValueError(f"Product not found with id {id}")
+
+                    await self._commit(db)
+            except DatabaseError as ex:
+                await db.rollback()
+                self.logger.error(
+                    f"Failed to delete product by id={id} in DB. DatabaseError: {ex}"
+                )
+                raise
+
+    async def adjust_product_stock(
+        self, id: str, delta: int, updated_at: datetime
+    ) -> Product:
+        self.logger.info(f"Adjusting stock in DB for product {id} by {delta}")
+        async with self.db_pool.connection() as db:
+            try:
+                async with AsyncTimedCursor(
+                    db.cursor(), "adjust_product_stock"
+                ) as cursor:
+                    await self._execute(
+                        cursor, ADJUST_PRODUCT_STOCK, (delta, updated_at, id, -delta)
+                    )
+                    result = await cursor.fetchone()
+
+                    if result is None:
+                        await cursor.execute(SELECT_PRODUCT_QUANTITY, (id,))
+                        current = await cursor.fetchone()
+                        if current is None:
+                            raise ValueError(f"Product not found with id {id}")
+                        raise InsufficientStockError(id, current[0])
+
+                await self._commit(db)
+                return self.map_product_row_to_model(result)
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to adjust stock in DB for product {id}. "
+                    f"DatabaseError: {ex}"
+                )
+                await db.rollback()
+                raise
+
+    async def adjust_products_stock(
+        self, lines: List[StockAdjustmentLine], updated_at: datetime
+    ) -> List[StockAdjustmentResult]:
+        self.logger.info(f"Adjusting stock in DB for {len(lines)} lines")
+        async with self.db_pool.connection() as db:
+            try:
+                async with AsyncTimedCursor(
+                    db.cursor(), "adjust_products_stock"
+                ) as cursor:
+                    await cursor.execute(
+                        ADJUST_PRODUCTS_STOCK,
+                        (
+                            [line.id for line in lines],
+                            [line.delta for line in lines],
+                            updated_at,
+                        ),
+                    )
+                    rows = await cursor.fetchall()
+
+                await self._commit(db)
+                return [
+                    self.map_stock_row_to_result(line.id, row)
+                    for line, row in zip(lines, rows)
+                ]
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to adjust stock batch in DB. DatabaseError: {ex}"
+                )
+                await db.rollback()
+                raise
+
+    async def create_products(self, products: List[Product]) -> List[str]:
+        self.logger.info(f"Inserting {len(products)} products in DB")
+        async with self.db_pool.connection() as db:
+            try:
+                async with AsyncTimedCursor(db.cursor(), "create_products") as cursor:
+                    await cursor.execute(
+                        INSERT_PRODUCTS,
+                        (
+                            [product.id for product in products],
+                            [product.name for product in products],
+                            [product.description for product in products],
+                            [product.price for product in products],
+                            [product.quantity for product in products],
+                            [product.active for product in products],
+                            [product.created_at for product in products],
+                        ),
+                    )
+                    rows = await cursor.fetchall()
+
+                await self._commit(db)
+                return [row[0] for row in rows]
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to insert products batch in DB. DatabaseError: {ex}"
+                )
+                await db.rollback()
+                raise
+
+    async def update_products(self, products: List[Product]) -> List[Product]:
+        self.logger.info(f"Updating {len(products)} products in DB")
+        async with self.db_pool.connection() as db:
+            try:
+                async with AsyncTimedCursor(db.cursor(), "update_products") as cursor:
+                    await cursor.execute(
+                        UPDATE_PRODUCTS,
+                        (
+                            [product.id for product in products],
+                            [product.name for product in products],
+                            [product.description for product in products],
+                            [product.price for product in products],
+                            [product.quantity for product in products],
+                            [product.active for product in products],
+                            [product.updated_at for product in products],
+                        ),
+                    )
+                    rows = await cursor.fetchall()
+
+                await self._commit(db)
+                return [self.map_product_row_to_model(row) for row in rows]
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to update products batch in DB. DatabaseError: {ex}"
+                )
+                await db.rollback()
+                raise
+
+    async def delete_products_by_ids(self, ids: List[str]) -> List[str]:
+        self.logger.info(f"Deleting {len(ids)} products in DB")
+        async with self.db_pool.connection() as db:
+            try:
+                async with AsyncTimedCursor(
+                    db.cursor(), "delete_products_by_ids"
+                ) as cursor:
+                    await cursor.execute(DELETE_PRODUCTS_BY_IDS, (ids,))
+                    rows = await cursor.fetchall()
+
+                await self._commit(db)
+                return [row[0] for row in rows]
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to delete products batch in DB. DatabaseError: {ex}"
+                )
+                await db.rollback()
+                raise
+
+    map_product_row_to_model = ProductStorage.map_product_row_to_model
+    map_product_row_to_dict = ProductStorage.map_product_row_to_dict
+    map_change_row_to_model = ProductStorage.map_change_row_to_model
+    map_stock_row_to_result = ProductStorage.map_stock_row_to_result
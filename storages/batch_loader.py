@@ -0,0 +1,139 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from configs.replica_pool import get_required_lsn
+from metrics.instruments import DB_BATCH_SIZE
+
+
+class PendingBatch:
+    def __init__(self):
+        # a dict keeps arrival order and drops repeated keys
+        self.keys: Dict[Hashable, None] = {}
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: Dict[Hashable, Any] = {}
+        self.error: BaseException | None = None
+
+
+class BaseBatchLoader:
+    def __init__(self, name: str, window: float = 0.002, max_batch_size: int = 100):
+        if max_batch_size < 1:
+            raise ValueError(f"Invalid batch loader max_batch_size={max_batch_size}")
+
+        self.name = name
+        self.window = window
+        self.max_batch_size = max_batch_size
+        # reads that need a newer WAL position are batched apart, the batch
+        # query runs with the consistency session of the caller that opened it
+        self._batches: Dict[int, Any] = {}
+
+    def add_key(self, key: Hashable, new_batch: Callable[[], Any]) -> tuple:
+        group = get_required_lsn()
+        batch = self._batches.get(group)
+        opened = batch is None
+        if opened:
+            batch = self._batches[group] = new_batch()
+
+        batch.keys[key] = None
+        if len(batch.keys) >= self.max_batch_size:
+            self.close_batch(group, batch)
+        return group, batch, opened
+
+    def close_batch(self, group: int, batch: Any) -> None:
+        # later keys open a new batch instead of joining one that is leaving
+        if self._batches.get(group) is batch:
+            del self._batches[group]
+        batch.full.set()
+
+
+class BatchLoader(BaseBatchLoader):
+    def __init__(
+        self,
+        name: str,
+        load_many: Callable[[List[Hashable]], Dict[Hashable, Any]],
+        window: float = 0.002,
+        max_batch_size: int = 100,
+    ):
+        super().__init__(name, window, max_batch_size)
+        self.load_many = load_many
+        self._lock = threading.Lock()
+
+    def load(self, key: Hashable) -> Any | None:
+        with self._lock:
+            group, batch, opened = self.add_key(key, PendingBatch)
+
+        # the caller that opened the batch waits out the window and runs it
+        if opened:
+            batch.full.wait(self.window)
+            with self._lock:
+                self.close_batch(group, batch)
+            self.dispatch(batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results.get(key)
+
+    def dispatch(self, batch: PendingBatch) -> None:
+        DB_BATCH_SIZE.labels(self.name).observe(len(batch.keys))
+        try:
+            batch.results = self.load_many(list(batch.keys))
+        except BaseException as ex:
+            batch.error = ex
+        finally:
+            batch.done.set()
+
+
+class AsyncPendingBatch:
+    def __init__(self):
+        self.keys: Dict[Hashable, None] = {}
+        self.full = asyncio.Event()
+        self.future = asyncio.get_running_loop().create_future()
+        self.task: asyncio.Task | None = None
+
+
+class AsyncBatchLoader(BaseBatchLoader):
+    def __init__(
+        self,
+        name: str,
+        load_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+        window: float = 0.002,
+        max_batch_size: int = 100,
+    ):
+        super().__init__(name, window, max_batch_size)
+        self.load_many = load_many
+
+    async def load(self, key: Hashable) -> Any | None:
+        group, batch, opened = self.add_key(key, AsyncPendingBatch)
+        if opened:
+            # a task of its own, so a caller that goes away does not cancel the
+            # query for the rest of the batch
+            batch.task = asyncio.get_running_loop().create_task(
+                self.dispatch(group, batch)
+            )
+
+        results = await asyncio.shield(batch.future)
+        return results.get(key)
+
+    async def dispatch(self, group: int, batch: AsyncPendingBatch) -> None:
+        try:
+            try:
+                await asyncio.wait_for(batch.full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            self.close_batch(group, batch)
+
+            DB_BATCH_SIZE.labels(self.name).observe(len(batch.keys))
+            batch.future.set_result(await self.load_many(list(batch.keys)))
+        except Exception as ex:
+            batch.future.set_exception(ex)
+            # every caller may have gone away, the error is theirs to see
+            batch.future.exception()
+        finally:
+            # a cancelled dispatch must not leave its callers waiting, nor keep
+            # taking keys it will never load
+            self.close_batch(group, batch)
+            if not batch.future.done():
+                batch.future.cancel()
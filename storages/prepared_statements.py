@@ -0,0 +1,67 @@
+import hashlib
+import re
+import weakref
+
+from metrics.instruments import DB_PREPARED_STATEMENTS, AsyncTimedCursor, TimedCursor
+
+PLACEHOLDER = re.compile(r"%[s%]")
+
+
+def statement_name(query: str, sql_query: str) -> str:
+    # the SQL hash tells apart the shapes a dynamic query (listing filters) takes
+    return f"{query}_{hashlib.md5(sql_query.encode()).hexdigest()[:12]}"
+
+
+def to_positional(sql_query: str) -> str:
+    position = 0
+
+    def replace(match: re.Match) -> str:
+        nonlocal position
+        if match.group() == "%%":
+            return "%"
+        position += 1
+        return f"${position}"
+
+    return PLACEHOLDER.sub(replace, sql_query)
+
+
+class PreparedStatements:
+    def __init__(self):
+        # statements live as long as their session, so names are tracked per
+        # pooled connection and forgotten once the connection is discarded
+        self._prepared: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _is_prepared(self, cursor: TimedCursor, name: str) -> bool:
+        return name in self._prepared.get(cursor.connection, ())
+
+    def _record(self, cursor: TimedCursor, name: str, reused: bool) -> None:
+        self._prepared.setdefault(cursor.connection, set()).add(name)
+        DB_PREPARED_STATEMENTS.labels(
+            cursor.query, "reused" if reused else "prepared"
+        ).inc()
+
+    def execute(self, cursor: TimedCursor, sql_query: str, params: tuple | list):
+        name = statement_name(cursor.query, sql_query)
+        reused = self._is_prepared(cursor, name)
+        if not reused:
+            # PREPARE is not transactional, a later rollback keeps the statement
+            cursor.execute(f"PREPARE {name} AS {to_positional(sql_query)}")
+        self._record(cursor, name, reused)
+
+        if not params:
+            return cursor.execute(f"EXECUTE {name}")
+        placeholders = ", ".join(["%s"] * len(params))
+        return cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+
+
+class AsyncPreparedStatements(PreparedStatements):
+    async def execute(
+        self, cursor: AsyncTimedCursor, sql_query: str, params: tuple | list
+    ):
+        # psycopg keeps its own per connection cache of prepared statements,
+        # names are only tracked here to report reuse
+        name = statement_name(cursor.query, sql_query)
+        reused = self._is_prepared(cursor, name)
+        result = await cursor.execute(sql_query, params, prepare=True)
+        self._record(cursor, name, reused)
+        return result
@@ -0,0 +1,194 @@
+import csv
+import io
+import logging
+from itertools import islice
+from typing import BinaryIO, Iterator, List, Literal
+
+from psycopg2 import DatabaseError
+from psycopg2._psycopg import connection
+from pydantic import ValidationError
+
+from models.product import Product
+
+PRODUCT_COLUMNS = (
+    "id, name, description, price, quantity, active, created_at, updated_at"
+)
+
+CopyFormat = Literal["csv", "binary"]
+ConflictAction = Literal["error", "skip", "id", "name"]
+
+ON_CONFLICT_CLAUSES = {
+    "error": "",
+    "skip": "ON CONFLICT DO NOTHING",
+    "id": """
+        ON CONFLICT (id) DO UPDATE SET
+            name = EXCLUDED.name,
+            description = EXCLUDED.description,
+            price = EXCLUDED.price,
+            quantity = EXCLUDED.quantity,
+            active = EXCLUDED.active,
+            updated_at = COALESCE(EXCLUDED.updated_at, LOCALTIMESTAMP)
+    """,
+    "name": """
+        ON CONFLICT (name) DO UPDATE SET
+            description = EXCLUDED.description,
+            price = EXCLUDED.price,
+            quantity = EXCLUDED.quantity,
+            active = EXCLUDED.active,
+            updated_at = COALESCE(EXCLUDED.updated_at, LOCALTIMESTAMP)
+    """,
+}
+
+
+class ProductCopyStorage:
+    def __init__(self, db_connection: connection):
+        self.logger = logging.getLogger(__name__)
+        self.db = db_connection
+
+    def export_products(self, output: BinaryIO, format: CopyFormat = "csv") -> int:
+        self.logger.info(f"Exporting products from DB as {format}")
+        options = "FORMAT csv, HEADER" if format == "csv" else "FORMAT binary"
+        try:
+            with self.db.cursor() as cursor:
+                cursor.copy_expert(
+                    f"""
+                    COPY (SELECT {PRODUCT_COLUMNS} FROM products ORDER BY id)
+                    TO STDOUT WITH ({options})
+                    """,
+                    output,
+                )
+                exported = cursor.rowcount
+
+            self.db.rollback()
+            return exported
+        except DatabaseError as ex:
+            self.logger.error(f"Failed to export products from DB. DatabaseError: {ex}")
+            self.db.rollback()
+            raise
+
+    def import_products(
+        self,
+        input: BinaryIO,
+        format: CopyFormat = "csv",
+        on_conflict: ConflictAction = "error",
+        chunk_size: int = 10_000,
+        skip_invalid: bool = False,
+    ) -> int:
+        self.logger.info(f"Importing products into DB from {format}")
+        try:
+            with self.db.cursor() as cursor:
+                # mirrors the products table constraints and the Product model so
+                # rows that skip Python validation (binary) are still checked
+                cursor.execute(
+                    """
+                    CREATE TEMP TABLE products_import (
+                        seq BIGSERIAL,
+                        id CHAR(26) NOT NULL,
+                        name VARCHAR(200) NOT NULL,
+                        description TEXT NOT NULL,
+                        price NUMERIC(10, 2) NOT NULL CHECK (price > 0),
+                        quantity INTEGER NOT NULL,
+                        active BOOLEAN NOT NULL,
+                        created_at TIMESTAMP NOT NULL,
+                        updated_at TIMESTAMP NULL
+                    ) ON COMMIT DROP
+                    """
+                )
+
+                if format == "binary":
+                    cursor.copy_expert(
+                        f"""
+                        COPY products_import ({PRODUCT_COLUMNS})
+                        FROM STDIN WITH (FORMAT binary)
+                        """,
+                        input,
+                    )
+                    imported = self._merge_import(cursor, on_conflict)
+                else:
+                    imported = 0
+                    for chunk in self._read_csv_chunks(input, chunk_size, skip_invalid):
+                        cursor.copy_expert(
+                            f"""
+                            COPY products_import ({PRODUCT_COLUMNS})
+                            FROM STDIN WITH (FORMAT csv, FORCE_NULL (updated_at))
+                            """,
+                            self._write_csv_chunk(chunk),
+                        )
+                        imported += self._merge_import(cursor, on_conflict)
+
+            self.db.commit()
+            return imported
+        except (DatabaseError, ValueError) as ex:
+            self.logger.error(f"Failed to import products into DB. Error: {ex}")
+            self.db.rollback()
+            raise
+
+    def _merge_import(self, cursor, on_conflict: ConflictAction) -> int:
+        if on_conflict == "error":
+            source = f"SELECT {PRODUCT_COLUMNS} FROM products_import ORDER BY seq"
+        else:
+            # an upsert cannot touch the same row twice, the last duplicate wins
+            conflict_key = "name" if on_conflict == "name" else "id"
+            source = f"""
+                SELECT DISTINCT ON ({conflict_key}) {PRODUCT_COLUMNS}
+                FROM products_import
+                ORDER BY {conflict_key}, seq DESC
+            """
+
+        cursor.execute(
+            f"""
+            INSERT INTO products ({PRODUCT_COLUMNS})
+            {source}
+            {ON_CONFLICT_CLAUSES[on_conflict]}
+            """
+        )
+        merged = cursor.rowcount
+        cursor.execute("TRUNCATE products_import")
+        return merged
+
+    def _read_csv_chunks(
+        self, input: BinaryIO, chunk_size: int, skip_invalid: bool
+    ) -> Iterator[List[Product]]:
+        reader = csv.DictReader(io.TextIOWrapper(input, encoding="utf-8", newline=""))
+        products = self._validate_rows(reader, skip_invalid)
+
+        while chunk := list(islice(products, chunk_size)):
+            yield chunk
+
+    def _validate_rows(
+        self, reader: csv.DictReader, skip_invalid: bool
+    ) -> Iterator[Product]:
+        for row in reader:
+            try:
+                yield Product(
+                    **{
+                        column: value
+                        for column, value in row.items()
+                        if column is not None
+                        and (value != "" or column == "description")
+                    }
+                )
+            except ValidationError as ex:
+                message = f"Invalid product at line {reader.line_num}: {ex}"
+                if not skip_invalid:
+                    raise ValueError(message) from ex
+                self.logger.warning(f"Skipping row. {message}")
+
+    def _write_csv_chunk(self, products: List[Product]) -> io.StringIO:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+        for product in products:
+            writer.writerow(
+                (
+                    product.id,
+                    product.name,
+                    product.description,
+                    product.price,
+                    product.quantity,
+                    product.active,
+                    product.created_at,
+                    product.updated_at,
+                )
+            )
+        buffer.seek(0)
+        return buffer
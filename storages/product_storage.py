@@ -1,50 +1,445 @@
 import logging
-from typing import List
+import re
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
 
 from psycopg2 import DatabaseError
-from psycopg2._psycopg import connection
+from psycopg2.extensions import connection
 
+from configs.db_pool import ConnectionPool
+from configs.replica_pool import ReplicaPool
+from metrics.instruments import TimedCursor
 from models.product import Product
+from models.product_change import (
+    ChangePosition,
+    ProductChange,
+    encode_change_token,
+)
+from models.product_filter import ListingPosition, ProductFilter
+from models.product_patch import VersionMismatchError
+from models.product_search import SearchPosition
+from models.stock import (
+    InsufficientStockError,
+    StockAdjustmentLine,
+    StockAdjustmentResult,
+)
+from storages.batch_loader import BatchLoader
+from storages.prepared_statements import PreparedStatements
+
+PRODUCT_FIELDS = tuple(Product.model_fields)
+
+STREAM_PRODUCTS = """
+    SELECT id, name, description, price, quantity, active, created_at, updated_at
+    FROM products
+    WHERE active = True AND id > %s
+    ORDER BY id
+"""
+
+SELECT_PRODUCT_BY_ID = """
+    SELECT id, name, description, price, quantity, active, created_at, updated_at
+    FROM products
+    WHERE id = %s
+"""
+
+SELECT_PRODUCT_BY_NAME = """
+    SELECT id, name, description, price, quantity, active, created_at, updated_at
+    FROM products
+    WHERE name = %s
+"""
+
+SELECT_PRODUCTS_BY_IDS = """
+    SELECT id, name, description, price, quantity, active, created_at, updated_at
+    FROM products
+    WHERE id = ANY(%s::char(26)[])
+"""
+
+SELECT_PRODUCTS_BY_NAMES = """
+    SELECT id, name, description, price, quantity, active, created_at, updated_at
+    FROM products
+    WHERE name = ANY(%s::varchar[])
+"""
+
+SEARCH_PRODUCTS = """
+    SELECT id, name, description, price, quantity, active, created_at, updated_at, score
+    FROM (
+        SELECT id, name, description, price, quantity, active, created_at, updated_at,
+            coalesce(ts_rank(search_vector, to_tsquery('simple', %s)), 0)
+                + similarity(name, %s) AS score
+        FROM products
+        WHERE active = True
+            AND (
+                search_vector @@ to_tsquery('simple', %s)
+                OR name %% %s
+                OR name ILIKE %s
+            )
+    ) AS matches
+"""
+
+SELECT_PRODUCT_CHANGES = """
+    SELECT c.txid::text, c.seq, c.product_id, c.operation,
+        p.id, p.name, p.description, p.price, p.quantity, p.active,
+        p.created_at, p.updated_at
+    FROM product_changes AS c
+    LEFT JOIN products AS p ON p.id = c.product_id
+    WHERE (c.txid, c.seq) > (%s::xid8, %s)
+        AND c.txid < pg_snapshot_xmin(pg_current_snapshot())
+    ORDER BY c.txid, c.seq
+    LIMIT %s
+"""
+
+INSERT_PRODUCT = """
+    INSERT INTO products
+    (id, name, description, price, quantity, active, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+UPDATE_PRODUCT = """
+    UPDATE products
+    SET
+        name = %s,
+        description = %s,
+        price = %s,
+        quantity = %s,
+        active = %s,
+        updated_at = %s
+    WHERE id = %s
+    RETURNING id, name, description, price, quantity, active, created_at, updated_at
+"""
+
+DELETE_PRODUCT_BY_ID = """
+    DELETE FROM products
+    WHERE id = %s
+"""
+
+INSERT_PRODUCTS = """
+    INSERT INTO products
+    (id, name, description, price, quantity, active, created_at)
+    SELECT * FROM unnest(
+        %s::char(26)[], %s::varchar[], %s::text[], %s::numeric[],
+        %s::integer[], %s::boolean[], %s::timestamp[]
+    )
+    ON CONFLICT DO NOTHING
+    RETURNING id
+"""
+
+UPDATE_PRODUCTS = """
+    UPDATE products AS p
+    SET
+        name = v.name,
+        description = v.description,
+        price = v.price,
+        quantity = v.quantity,
+        active = v.active,
+        updated_at = v.updated_at
+    FROM unnest(
+        %s::char(26)[], %s::varchar[], %s::text[], %s::numeric[],
+        %s::integer[], %s::boolean[], %s::timestamp[]
+    ) AS v (id, name, description, price, quantity, active, updated_at)
+    WHERE p.id = v.id
+    RETURNING p.id, p.name, p.description, p.price, p.quantity, p.active, p.created_at, p.updated_at
+"""
+
+DELETE_PRODUCTS_BY_IDS = """
+    DELETE FROM products
+    WHERE id = ANY(%s::char(26)[])
+    RETURNING id
+"""
+
+ADJUST_PRODUCT_STOCK = """
+    UPDATE products
+    SET quantity = quantity + %s, updated_at = %s
+    WHERE id = %s AND quantity >= %s
+    RETURNING id, name, description, price, quantity, active, created_at, updated_at
+"""
+
+SELECT_PRODUCT_QUANTITY = """
+    SELECT quantity
+    FROM products
+    WHERE id = %s
+"""
+
+# rows are locked in id order so concurrent multi-line orders cannot deadlock,
+# lines for the same product are applied as their sum
+ADJUST_PRODUCTS_STOCK = """
+    WITH lines AS (
+        SELECT id, delta, position
+        FROM unnest(%s::char(26)[], %s::integer[])
+            WITH ORDINALITY AS l (id, delta, position)
+    ),
+    totals AS (
+        SELECT id, sum(delta) AS delta
+        FROM lines
+        GROUP BY id
+    ),
+    locked AS (
+        SELECT p.id, p.quantity
+        FROM products AS p
+        JOIN totals ON totals.id = p.id
+        ORDER BY p.id
+        FOR UPDATE OF p
+    ),
+    adjusted AS (
+        UPDATE products AS p
+        SET quantity = p.quantity + totals.delta, updated_at = %s
+        FROM totals
+        JOIN locked ON locked.id = totals.id
+        WHERE p.id = totals.id AND locked.quantity + totals.delta >= 0
+        RETURNING p.id, p.quantity
+    )
+    SELECT adjusted.id IS NOT NULL, locked.id IS NOT NULL,
+        coalesce(adjusted.quantity, locked.quantity)
+    FROM lines
+    LEFT JOIN locked ON locked.id = lines.id
+    LEFT JOIN adjusted ON adjusted.id = lines.id
+    ORDER BY lines.position
+"""
+
+SELECT_PRODUCT_VERSION = """
+    SELECT coalesce(updated_at, created_at)
+    FROM products
+    WHERE id = %s
+"""
+
+SELECT_PRODUCT_VERSION_BY_NAME = """
+    SELECT coalesce(updated_at, created_at)
+    FROM products
+    WHERE name = %s
+"""
+
+PATCHABLE_COLUMNS = ("name", "description", "price", "quantity", "active", "updated_at")
+
+
+def build_search_tsquery(text: str) -> str | None:
+    # only word characters reach to_tsquery, the last term is matched as a
+    # prefix since it is usually still being typed
+    terms = re.findall(r"\w+", text)
+    if not terms:
+        return None
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+
+def escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# never updated products sort and filter by their creation time, matching the
+# products_active_modified_idx expression index
+SORT_EXPRESSIONS = {
+    "id": "id",
+    "price": "price",
+    "created_at": "created_at",
+    "updated_at": "coalesce(updated_at, created_at)",
+}
+
+
+def build_product_listing_query(
+    limit: int | None, after: ListingPosition | None, filters: ProductFilter
+) -> Tuple[str, list]:
+    sql_query = """
+        SELECT id, name, description, price, quantity, active, created_at, updated_at
+        FROM products
+        WHERE active = True
+    """
+    params: list = []
+
+    # prices are cast so float parameters still compare as numeric and
+    # hit the price index
+    if filters.min_price is not None:
+        sql_query += " AND price >= %s::numeric"
+        params.append(filters.min_price)
+    if filters.max_price is not None:
+        sql_query += " AND price <= %s::numeric"
+        params.append(filters.max_price)
+    if filters.in_stock is not None:
+        sql_query += " AND quantity > 0" if filters.in_stock else " AND quantity <= 0"
+    if filters.created_after is not None:
+        sql_query += " AND created_at >= %s"
+        params.append(filters.created_after)
+    if filters.created_before is not None:
+        sql_query += " AND created_at < %s"
+        params.append(filters.created_before)
+    if filters.updated_after is not None:
+        sql_query += f" AND {SORT_EXPRESSIONS['updated_at']} >= %s"
+        params.append(filters.updated_after)
+    if filters.updated_before is not None:
+        sql_query += f" AND {SORT_EXPRESSIONS['updated_at']} < %s"
+        params.append(filters.updated_before)
+
+    field = filters.sort.lstrip("-")
+    descending = filters.sort.startswith("-")
+    sort_key = SORT_EXPRESSIONS[field]
+    operator = "<" if descending else ">"
+    direction = " DESC" if descending else ""
+
+    if field == "id":
+        if after is not None:
+            sql_query += f" AND id {operator} %s"
+            params.append(after)
+        sql_query += f" ORDER BY id{direction}"
+    else:
+        if after is not None:
+            value_cast = "::numeric" if field == "price" else ""
+            sql_query += f" AND ({sort_key}, id) {operator} (%s{value_cast}, %s)"
+            params.extend(after)
+        sql_query += f" ORDER BY {sort_key}{direction}, id{direction}"
+
+    if limit is not None:
+        sql_query += " LIMIT %s"
+        params.append(limit)
+
+    return sql_query, params
+
+
+def build_product_patch_query(
+    id: str, changes: dict, versions: List[datetime] | None
+) -> Tuple[str, list]:
+    # only whitelisted columns reach the SQL text, values are always parameters
+    columns = [column for column in PATCHABLE_COLUMNS if column in changes]
+    sql_query = f"""
+        UPDATE products
+        SET {", ".join(f"{column} = %s" for column in columns)}
+        WHERE id = %s
+    """
+    params = [changes[column] for column in columns] + [id]
+
+    if versions is not None:
+        sql_query += " AND coalesce(updated_at, created_at) = ANY(%s::timestamp[])"
+        params.append(versions)
+
+    sql_query += """
+        RETURNING id, name, description, price, quantity, active, created_at, updated_at
+    """
+    return sql_query, params
 
 
 class ProductStorage:
-    def __init__(self, db_connection: connection):
+    def __init__(
+        self,
+        db_pool: ConnectionPool,
+        prepare_statements: bool = False,
+        replica_pool: ReplicaPool | None = None,
+        batch_window: float = 0.0,
+        max_batch_size: int = 100,
+    ):
         self.logger = logging.getLogger(__name__)
-        self.db = db_connection
+        self.db_pool = db_pool
+        self.replica_pool = replica_pool
+        self.read_pool = replica_pool or db_pool
+        # concurrent point lookups within the window share one ANY() query
+        self.id_loader = self.name_loader = None
+        if batch_window > 0:
+            self.id_loader = BatchLoader(
+                "get_product_by_id",
+                self._load_products_by_ids,
+                batch_window,
+                max_batch_size,
+            )
+            self.name_loader = BatchLoader(
+                "get_product_by_name",
+                self._load_products_by_names,
+                batch_window,
+                max_batch_size,
+            )
+        self.prepared_statements = PreparedStatements() if prepare_statements else None
+
+    def _execute(self, cursor: TimedCursor, sql_query: str, params: tuple | list):
+        if self.prepared_statements is None:
+            return cursor.execute(sql_query, params)
+        return self.prepared_statements.execute(cursor, sql_query, params)
+
+    def _commit(self, db: connection) -> None:
+        db.commit()
+        if self.replica_pool is not None:
+            self.replica_pool.record_write(db)
 
-    def get_all_products(self) -> List[Product]:
+    def get_all_products(
+        self,
+        limit: int | None = None,
+        after: ListingPosition | None = None,
+        filters: ProductFilter | None = None,
+    ) -> List[Product]:
         self.logger.info("Getting all products in DB")
+        return self._get_all_products(
+            limit, after, filters, self.map_product_row_to_model
+        )
+
+    def get_all_product_dicts(
+        self,
+        limit: int | None = None,
+        after: ListingPosition | None = None,
+        filters: ProductFilter | None = None,
+    ) -> List[dict]:
+        self.logger.info("Getting all products in DB as dicts")
+        return self._get_all_products(
+            limit, after, filters, self.map_product_row_to_dict
+        )
+
+    def _get_all_products(
+        self,
+        limit: int | None,
+        after: ListingPosition | None,
+        filters: ProductFilter | None,
+        map_row: Callable,
+    ) -> list:
         try:
-            with self.db.cursor() as cursor:
-                sql_query = """
-                    SELECT id, name, description, price, quantity, active, created_at, updated_at
-                    FROM products
-                    WHERE active = True
-                """
-
-                cursor.execute(sql_query)
+            with self.read_pool.connection() as db, TimedCursor(
+                db.cursor(), "get_all_products"
+            ) as cursor:
+                sql_query, params = build_product_listing_query(
+                    limit, after, filters or ProductFilter()
+                )
+                self._execute(cursor, sql_query, params)
                 rows = cursor.fetchall()
-                product_list = []
-
-                for row in rows:
-                    product = self.map_product_row_to_model(row)
-                    product_list.append(product)
 
-                return product_list
+                with cursor.timer("map"):
+                    return [map_row(row) for row in rows]
         except DatabaseError as ex:
             self.logger.error(f"Failed to get all products in DB. DatabaseError: {ex}")
             raise
 
+    def stream_all_products(
+        self, after: str | None = None, batch_size: int = 500
+    ) -> Iterator[Product]:
+        self.logger.info("Streaming all products from DB")
+        for rows in self._stream_product_rows(after, batch_size):
+            for row in rows:
+                yield self.map_product_row_to_model(row)
+
+    def stream_all_product_dicts(
+        self, after: str | None = None, batch_size: int = 500
+    ) -> Iterator[List[dict]]:
+        self.logger.info("Streaming all products from DB as dicts")
+        for rows in self._stream_product_rows(after, batch_size):
+            yield [self.map_product_row_to_dict(row) for row in rows]
+
+    def _stream_product_rows(
+        self, after: str | None, batch_size: int
+    ) -> Iterator[List[tuple]]:
+        try:
+            with self.db_pool.connection() as db, TimedCursor(
+                db.cursor(name="products_stream"), "stream_all_products"
+            ) as cursor:
+                cursor.execute(STREAM_PRODUCTS, (after or "",))
+
+                while rows := cursor.fetchmany(batch_size):
+                    yield rows
+        except DatabaseError as ex:
+            self.logger.error(f"Failed to stream products from DB. DatabaseError: {ex}")
+            raise
+
     def get_product_by_id(self, id: str) -> Product:
         self.logger.info("Getting product in DB")
+        if self.id_loader is not None:
+            product = self.id_loader.load(id)
+            if product is None:
+                raise ValueError(f"Product not found with id {id}")
+            return product
+
         try:
-            with self.db.cursor() as cursor:
-                sql_query = """
-                    SELECT id, name, description, price, quantity, active, created_at, updated_at
-                    FROM products
-                    WHERE id = %s;
-                """
-                cursor.execute(sql_query, (id,))
+            with self.read_pool.connection() as db, TimedCursor(
+                db.cursor(), "get_product_by_id"
+            ) as cursor:
+                self._execute(cursor, SELECT_PRODUCT_BY_ID, (id,))
                 result = cursor.fetchone()
 
                 if result is None:
@@ -59,14 +454,17 @@ class ProductStorage:
 
     def get_product_by_name(self, name: str) -> Product:
         self.logger.info("Getting product by name in DB")
+        if self.name_loader is not None:
+            product = self.name_loader.load(name)
+            if product is None:
+                raise ValueError(f"Product not found with name {name}")
+            return product
+
         try:
-            with self.db.cursor() as cursor:
-                sql_query = """
-                    SELECT id, name, description, price, quantity, active, created_at, updated_at
-                    FROM products
-                    WHERE name = %s;
-                """
-                cursor.execute(sql_query, (name,))
+            with self.read_pool.connection() as db, TimedCursor(
+                db.cursor(), "get_product_by_name"
+            ) as cursor:
+                self._execute(cursor, SELECT_PRODUCT_BY_NAME, (name,))
                 result = cursor.fetchone()
 
                 if result is None:
@@ -79,101 +477,415 @@ class ProductStorage:
             )
             raise
 
-    def create_product(self, product: Product) -> Product:
-        self.logger.info("Inserting product in DB")
+    def get_product_version_by_id(self, id: str) -> datetime:
+        self.logger.info("Getting product version in DB")
         try:
-            with self.db.cursor() as cursor:
-                cursor.execute(
-                    """
-                    INSERT INTO products 
-                    (id, name, description, price, quantity, active, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s);
-                    """,
-                    (
-                        product.id,
-                        product.name,
-                        product.description,
-                        product.price,
-                        product.quantity,
-                        product.active,
-                        product.created_at,
-                    ),
-                )
-                self.db.commit()
-                return product
+            with self.read_pool.connection() as db, TimedCursor(
+                db.cursor(), "get_product_version_by_id"
+            ) as cursor:
+                self._execute(cursor, SELECT_PRODUCT_VERSION, (id,))
+                result = cursor.fetchone()
+
+                if result is None:
+                    raise ValueError(f"Product not found with id {id}")
+
+                return result[0]
         except DatabaseError as ex:
-            self.logger.error(f"Failed to insert product in DB. DatabaseError: {ex}")
-            self.db.rollback()
+            self.logger.error(
+                f"Failed to get product version by id={id} in DB. DatabaseError: {ex}"
+            )
             raise
 
-    def update_product(self, product: Product) -> Product:
-        self.logger.info(f"Updating product in DB with ID {product.id}")
+    def get_product_version_by_name(self, name: str) -> datetime:
+        self.logger.info("Getting product version by name in DB")
         try:
-            with self.db.cursor() as cursor:
-                cursor.execute(
-                    """
-                    UPDATE products
-                    SET 
-                        name = %s,
-                        description = %s,
-                        price = %s,
-                        quantity = %s,
-                        active = %s,
-                        updated_at = %s
-                    WHERE id = %s
-                    RETURNING id, name, description, price, quantity, active, created_at, updated_at
-                    """,
-                    (
-                        product.name,
-                        product.description,
-                        product.price,
-                        product.quantity,
-                        product.active,
-                        product.updated_at,
-                        product.id,
-                    ),
-                )
+            with self.read_pool.connection() as db, TimedCursor(
+                db.cursor(), "get_product_version_by_name"
+            ) as cursor:
+                self._execute(cursor, SELECT_PRODUCT_VERSION_BY_NAME, (name,))
                 result = cursor.fetchone()
 
                 if result is None:
-                    raise ValueError(f"Product with ID {product.id} not found.")
+                    raise ValueError(f"Product not found with name {name}")
 
-            self.db.commit()
-            return self.map_product_row_to_model(result)
+                return result[0]
         except DatabaseError as ex:
-            self.logger.error(f"Failed on update operation. Error: {ex}")
-            self.db.rollback()
+            self.logger.error(
+                f"Failed to get product version by name={name} in DB. "
+                f"DatabaseError: {ex}"
+            )
             raise
 
-    def delete_product_by_id(self, id: str) -> None:
-        self.logger.info("Deleting product in DB")
+    def _load_products_by_ids(self, ids: List[str]) -> Dict[str, Product]:
+        return {product.id: product for product in self.get_products_by_ids(ids)}
+
+    def _load_products_by_names(self, names: List[str]) -> Dict[str, Product]:
+        products = self.get_products_by_names(names)
+        return {product.name: product for product in products}
+
+    def get_products_by_ids(self, ids: List[str]) -> List[Product]:
+        self.logger.info(f"Getting {len(ids)} products by id in DB")
         try:
-            with self.db.cursor() as cursor:
-                sql_query = """
-                    DELETE FROM products
-                    WHERE id = %s;
-                """
-                cursor.execute(sql_query, (id,))
-
-                if cursor.rowcount == 0:
-                    raise ValueError(f"Product not found with id {id}")
+            with self.read_pool.connection() as db, TimedCursor(
+                db.cursor(), "get_products_by_ids"
+            ) as cursor:
+                cursor.execute(SELECT_PRODUCTS_BY_IDS, (ids,))
+                rows = cursor.fetchall()
+
+                with cursor.timer("map"):
+                    return [self.map_product_row_to_model(row) for row in rows]
+        except DatabaseError as ex:
+            self.logger.error(
+                f"Failed to get products by ids in DB. DatabaseError: {ex}"
+            )
+            raise
+
+    def get_products_by_names(self, names: List[str]) -> List[Product]:
+        self.logger.info(f"Getting {len(names)} products by name in DB")
+        try:
+            with self.read_pool.connection() as db, TimedCursor(
+                db.cursor(), "get_products_by_names"
+            ) as cursor:
+                cursor.execute(SELECT_PRODUCTS_BY_NAMES, (names,))
+                rows = cursor.fetchall()
+
+                with cursor.timer("map"):
+                    return [self.map_product_row_to_model(row) for row in rows]
+        except DatabaseError as ex:
+            self.logger.error(
+                f"Failed to get products by names in DB. DatabaseError: {ex}"
+            )
+            raise
+
+    def search_products(
+        self, query: str, limit: int, after: SearchPosition | None = None
+    ) -> List[Tuple[Product, float]]:
+        self.logger.info("Searching products in DB")
+        try:
+            with self.db_pool.connection() as db, TimedCursor(
+                db.cursor(), "search_products"
+            ) as cursor:
+                sql_query = SEARCH_PRODUCTS
+                tsquery = build_search_tsquery(query)
+                params: list = [
+                    tsquery,
+                    query,
+                    tsquery,
+                    query,
+                    escape_like(query) + "%",
+                ]
+
+                if after is not None:
+                    sql_query += (
+                        " WHERE score < %s::real OR (score = %s::real AND id > %s)"
+                    )
+                    params.extend([after[0], after[0], after[1]])
+
+                sql_query += " ORDER BY score DESC, id LIMIT %s"
+                params.append(limit)
+
+                cursor.execute(sql_query, params)
+                rows = cursor.fetchall()
+
+                with cursor.timer("map"):
+                    return [
+                        (self.map_product_row_to_model(row), row[8]) for row in rows
+                    ]
+        except DatabaseError as ex:
+            self.logger.error(f"Failed to search products in DB. DatabaseError: {ex}")
+            raise
 
-                self.db.commit()
+    def get_product_changes(
+        self, since: ChangePosition, limit: int
+    ) -> List[ProductChange]:
+        self.logger.info("Getting product changes in DB")
+        try:
+            with self.db_pool.connection() as db, TimedCursor(
+                db.cursor(), "get_product_changes"
+            ) as cursor:
+                cursor.execute(SELECT_PRODUCT_CHANGES, (str(since[0]), since[1], limit))
+                rows = cursor.fetchall()
+
+                with cursor.timer("map"):
+                    return [self.map_change_row_to_model(row) for row in rows]
         except DatabaseError as ex:
-            self.db.rollback()
             self.logger.error(
-                f"Failed to delete product by id={id} in DB. DatabaseError: {ex}"
+                f"Failed to get product changes in DB. DatabaseError: {ex}"
             )
             raise
 
-    def map_product_row_to_model(self, row: List) -> Product:
-        return Product(
-            id=row[0],
-            name=row[1],
-            description=row[2],
-            price=row[3],
-            quantity=row[4],
-            active=row[5],
-            created_at=row[6],
-            updated_at=row[7],
+    def create_product(self, product: Product) -> Product:
+        self.logger.info("Inserting product in DB")
+        with self.db_pool.connection() as db:
+            try:
+                with TimedCursor(db.cursor(), "create_product") as cursor:
+                    self._execute(
+                        cursor,
+                        INSERT_PRODUCT,
+                        (
+                            product.id,
+                            product.name,
+                            product.description,
+                            product.price,
+                            product.quantity,
+                            product.active,
+                            product.created_at,
+                        ),
+                    )
+                    self._commit(db)
+                    return product
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to insert product in DB. DatabaseError: {ex}"
+                )
+                db.rollback()
+                raise
+
+    def update_product(self, product: Product) -> Product:
+        self.logger.info(f"Updating product in DB with ID {product.id}")
+        with self.db_pool.connection() as db:
+            try:
+                with TimedCursor(db.cursor(), "update_product") as cursor:
+                    self._execute(
+                        cursor,
+                        UPDATE_PRODUCT,
+                        (
+                            product.name,
+                            product.description,
+                            product.price,
+                            product.quantity,
+                            product.active,
+                            product.updated_at,
+                            product.id,
+                        ),
+                    )
+                    result = cursor.fetchone()
+
+                    if result is None:
+                        raise ValueError(f"Product with ID {product.id} not found.")
+
+                self._commit(db)
+                return self.map_product_row_to_model(result)
+            except DatabaseError as ex:
+                self.logger.error(f"Failed on update operation. Error: {ex}")
+                db.rollback()
+                raise
+
+    def patch_product(
+        self, id: str, changes: dict, versions: List[datetime] | None = None
+    ) -> Product:
+        self.logger.info(f"Patching product in DB with ID {id}")
+        with self.db_pool.connection() as db:
+            try:
+                with TimedCursor(db.cursor(), "patch_product") as cursor:
+                    sql_query, params = build_product_patch_query(id, changes, versions)
+                    self._execute(cursor, sql_query, params)
+                    result = cursor.fetchone()
+
+                    if result is None:
+                        cursor.execute(SELECT_PRODUCT_VERSION, (id,))
+                        if cursor.fetchone() is None:
+                            raise ValueError(f"Product with ID {id} not found.")
+                        raise VersionMismatchError(id)
+
+                self._commit(db)
+                return self.map_product_row_to_model(result)
+            except DatabaseError as ex:
+                self.logger.error(f"Failed on patch operation. Error: {ex}")
+                db.rollback()
+                raise
+
+    def delete_product_by_id(self, id: str) -> None:
+        self.logger.info("Deleting product in DB")
+        with self.db_pool.connection() as db:
+            try:
+                with TimedCursor(db.cursor(), "delete_product_by_id") as cursor:
+                    self._execute(cursor, DELETE_PRODUCT_BY_ID, (id,))
+
+                    if cursor.rowcount == 0:
+                        raise ValueError(f"Product not found with id {id}")
+
+                    self._commit(db)
+            except DatabaseError as ex:
+                db.rollback()
+                self.logger.error(
+                    f"Failed to delete product by id={id} in DB. DatabaseError: {ex}"
+                )
+                raise
+
+    def adjust_product_stock(
+        self, id: str, delta: int, updated_at: datetime
+    ) -> Product:
+        self.logger.info(f"Adjusting stock in DB for product {id} by {delta}")
+        with self.db_pool.connection() as db:
+            try:
+                with TimedCursor(db.cursor(), "adjust_product_stock") as cursor:
+                    self._execute(
+                        cursor, ADJUST_PRODUCT_STOCK, (delta, updated_at, id, -delta)
+                    )
+                    result = cursor.fetchone()
+
+                    if result is None:
+                        cursor.execute(SELECT_PRODUCT_QUANTITY, (id,))
+                        current = cursor.fetchone()
+                        if current is None:
+                            raise ValueError(f"Product not found with id {id}")
+                        raise InsufficientStockError(id, current[0])
+
+                self._commit(db)
+                return self.map_product_row_to_model(result)
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to adjust stock in DB for product {id}. "
+                    f"DatabaseError: {ex}"
+                )
+                db.rollback()
+                raise
+
+    def adjust_products_stock(
+        self, lines: List[StockAdjustmentLine], updated_at: datetime
+    ) -> List[StockAdjustmentResult]:
+        self.logger.info(f"Adjusting stock in DB for {len(lines)} lines")
+        with self.db_pool.connection() as db:
+            try:
+                with TimedCursor(db.cursor(), "adjust_products_stock") as cursor:
+                    cursor.execute(
+                        ADJUST_PRODUCTS_STOCK,
+                        (
+                            [line.id for line in lines],
+                            [line.delta for line in lines],
+                            updated_at,
+                        ),
+                    )
+                    rows = cursor.fetchall()
+
+                self._commit(db)
+                return [
+                    self.map_stock_row_to_result(line.id, row)
+                    for line, row in zip(lines, rows)
+                ]
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to adjust stock batch in DB. DatabaseError: {ex}"
+                )
+                db.rollback()
+                raise
+
+    def create_products(self, products: List[Product]) -> List[str]:
+        self.logger.info(f"Inserting {len(products)} products in DB")
+        with self.db_pool.connection() as db:
+            try:
+                with TimedCursor(db.cursor(), "create_products") as cursor:
+                    cursor.execute(
+                        INSERT_PRODUCTS,
+                        (
+                            [product.id for product in products],
+                            [product.name for product in products],
+                            [product.description for product in products],
+                            [product.price for product in products],
+                            [product.quantity for product in products],
+                            [product.active for product in products],
+                            [product.created_at for product in products],
+                        ),
+                    )
+                    rows = cursor.fetchall()
+
+                self._commit(db)
+                return [row[0] for row in rows]
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to insert products batch in DB. DatabaseError: {ex}"
+                )
+                db.rollback()
+                raise
+
+    def update_products(self, products: List[Product]) -> List[Product]:
+        self.logger.info(f"Updating {len(products)} products in DB")
+        with self.db_pool.connection() as db:
+            try:
+                with TimedCursor(db.cursor(), "update_products") as cursor:
+                    cursor.execute(
+                        UPDATE_PRODUCTS,
+                        (
+                            [product.id for product in products],
+                            [product.name for product in products],
+                            [product.description for product in products],
+                            [product.price for product in products],
+                            [product.quantity for product in products],
+                            [product.active for product in products],
+                            [product.updated_at for product in products],
+                        ),
+                    )
+                    rows = cursor.fetchall()
+
+                self._commit(db)
+                return [self.map_product_row_to_model(row) for row in rows]
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to update products batch in DB. DatabaseError: {ex}"
+                )
+                db.rollback()
+                raise
+
+    def delete_products_by_ids(self, ids: List[str]) -> List[str]:
+        self.logger.info(f"Deleting {len(ids)} products in DB")
+        with self.db_pool.connection() as db:
+            try:
+                with TimedCursor(db.cursor(), "delete_products_by_ids") as cursor:
+                    cursor.execute(DELETE_PRODUCTS_BY_IDS, (ids,))
+                    rows = cursor.fetchall()
+
+                self._commit(db)
+                return [row[0] for row in rows]
+            except DatabaseError as ex:
+                self.logger.error(
+                    f"Failed to delete products batch in DB. DatabaseError: {ex}"
+                )
+                db.rollback()
+                raise
+
+    def map_stock_row_to_result(self, id: str, row: Sequence) -> StockAdjustmentResult:
+        adjusted, found, quantity = row
+        if adjusted:
+            status = "adjusted"
+        elif found:
+            status = "insufficient_stock"
+        else:
+            status = "not_found"
+        return StockAdjustmentResult(id=id, status=status, quantity=quantity)
+
+    def map_change_row_to_model(self, row: Sequence) -> ProductChange:
+        product = None
+        if row[3] != "delete" and row[4] is not None:
+            product = self.map_product_row_to_model(row[4:])
+
+        return ProductChange(
+            token=encode_change_token((int(row[0]), row[1])),
+            id=row[2],
+            operation=row[3],
+            product=product,
         )
+
+    # rows come from our own constrained table, so skip validation and the
+    # default factories. Product.model_construct() would do the same but is
+    # slower than a validated Product(...) on pydantic 2, so set the
+    # attributes it sets directly
+    def map_product_row_to_model(self, row: Sequence) -> Product:
+        product = object.__new__(Product)
+        object.__setattr__(product, "__dict__", self.map_product_row_to_dict(row))
+        object.__setattr__(product, "__pydantic_fields_set__", set(PRODUCT_FIELDS))
+        object.__setattr__(product, "__pydantic_extra__", None)
+        object.__setattr__(product, "__pydantic_private__", None)
+        return product
+
+    def map_product_row_to_dict(self, row: Sequence) -> dict:
+        return {
+            "id": row[0],
+            "name": row[1],
+            "description": row[2],
+            "price": float(row[3]),
+            "quantity": row[4],
+            "active": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+        }
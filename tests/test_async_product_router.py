@@ -0,0 +1,192 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pytest import fixture
+
+from models.batch import BatchItemResult
+from models.product_filter import ProductFilter
+from models.serializers import dump_json
+from routes.async_product_router import router
+from routes.product_router import get_product_service
+
+
+@fixture(name="service")
+def fixture_service():
+    """
+    Creates a mock async service object to simulate the product service layer.
+    Products are encoded for real so responses carry the product JSON.
+
+    Returns:
+        AsyncMock: A mock async service object.
+    """
+    service = AsyncMock()
+    service.encode_product = MagicMock(side_effect=dump_json)
+    return service
+
+
+@fixture(name="client")
+def fixture_client(service):
+    """
+    Creates a TestClient for an app serving the async product router
+    with a mock product service dependency.
+
+    Args:
+        service (AsyncMock): A mock async service object.
+
+    Returns:
+        TestClient: A TestClient instance for testing the async routes.
+    """
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_product_service] = lambda: service
+    return TestClient(app)
+
+
+@fixture(name="product_json")
+def fixture_product_json():
+    return {
+        "id": "01JFTE35ZRRZWCSKK6TBB1DZCT",
+        "name": "house",
+        "description": "bed for cats",
+        "price": 20.0,
+        "quantity": 100,
+        "active": True,
+        "created_at": "2024-12-23T15:57:25.496623",
+        "updated_at": None,
+    }
+
+
+def test_router_get_all_products(service, client, product, product_json):
+    """
+    Tests the async GET /products endpoint for retrieving all products.
+    """
+    service.get_all_product_dicts.return_value = [product.model_dump()]
+    response = client.get("/products")
+
+    assert response.status_code == 200
+    assert response.json() == [product_json]
+    service.get_all_product_dicts.assert_awaited_once()
+
+
+def test_router_get_product_by_id(service, client, product, product_json):
+    """
+    Tests the async GET /products/{id} endpoint for retrieving a product by ID.
+    """
+    service.get_product_by_id.return_value = product
+    response = client.get("/products/01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+    assert response.status_code == 200
+    assert response.json() == product_json
+    service.get_product_by_id.assert_awaited_once_with("01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+
+def test_router_get_product_by_name(service, client, product, product_json):
+    """
+    Tests the async GET /products/name/{name} endpoint.
+    """
+    service.get_product_by_name.return_value = product
+    response = client.get("/products/name/house")
+
+    assert response.status_code == 200
+    assert response.json() == product_json
+    service.get_product_by_name.assert_awaited_once_with("house")
+
+
+def test_router_create_product(service, client, product, product_json):
+    """
+    Tests the async POST /products endpoint for creating a new product.
+    """
+    service.create_product.return_value = product
+    response = client.post("/products", json=product_json)
+
+    assert response.status_code == 201
+    assert response.json() == product_json
+    service.create_product.assert_awaited_once_with(product)
+
+
+def test_router_update_product(service, client, product, product_json):
+    """
+    Tests the async PUT /products endpoint for updating an existing product.
+    """
+    service.update_product.return_value = product
+    response = client.put("/products", json=product_json)
+
+    assert response.status_code == 200
+    assert response.json() == product_json
+    service.update_product.assert_awaited_once_with(product)
+
+
+def test_router_delete_product_by_id(service, client):
+    """
+    Tests the async DELETE /products/{id} endpoint.
+    """
+    service.delete_product_by_id.return_value = None
+    response = client.delete("/products/01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+    assert response.status_code == 204
+    service.delete_product_by_id.assert_awaited_once_with("01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+
+def test_router_get_product_by_id_value_error(service, client):
+    """
+    Tests that the async GET /products/{id} endpoint maps `ValueError` to 404.
+    """
+    service.get_product_by_id.side_effect = ValueError()
+    response = client.get("/products/01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+    assert response.status_code == 404
+
+
+def test_router_delete_product_by_id_value_error(service, client):
+    """
+    Tests that the async DELETE /products/{id} endpoint maps `ValueError` to 404.
+    """
+    service.delete_product_by_id.side_effect = ValueError()
+    response = client.delete("/products/01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+    assert response.status_code == 404
+
+
+def test_router_stream_all_products_ndjson(service, client, product, product_json):
+    """
+    Tests the async GET /products/stream endpoint in NDJSON format.
+    """
+
+    async def batches():
+        yield [product.model_dump(), product.model_dump()]
+
+    service.stream_all_product_dicts = MagicMock(return_value=batches())
+    response = client.get("/products/stream")
+
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert [json.loads(line) for line in lines] == [product_json, product_json]
+
+
+def test_router_get_all_products_next_cursor(service, client, product):
+    """
+    Tests that the async GET /products returns a next-page cursor on a full page.
+    """
+    service.get_all_product_dicts.return_value = [product.model_dump()]
+    response = client.get("/products?limit=1")
+
+    assert response.headers["X-Next-Cursor"] == product.id
+    service.get_all_product_dicts.assert_awaited_once_with(
+        limit=1, after=None, filters=ProductFilter()
+    )
+
+
+def test_router_create_products(service, client, product, product_json):
+    """
+    Tests the async POST /products:batch endpoint for creating products in bulk.
+    """
+    service.create_products.return_value = [
+        BatchItemResult(id=product.id, status="created")
+    ]
+    response = client.post("/products:batch", json=[product_json])
+
+    assert response.status_code == 200
+    assert response.json() == {"results": [{"id": product.id, "status": "created"}]}
+    service.create_products.assert_awaited_once_with([product])
@@ -0,0 +1,176 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from psycopg import DatabaseError
+from pytest import fixture
+
+from caches.product_cache import MISSING, ProductCache
+from configs.replica_pool import CONSISTENCY_SESSION, ConsistencySession
+from services.async_product_service import AsyncProductService
+
+
+@fixture(name="storage")
+def fixture_storage():
+    """
+    Creates a mock async storage object to simulate data storage operations.
+
+    Returns:
+        AsyncMock: A mock async storage object.
+    """
+    return AsyncMock()
+
+
+@fixture(name="service")
+def fixture_service(storage):
+    """
+    Creates an instance of AsyncProductService with a mock storage.
+
+    Args:
+        storage (AsyncMock): A mock async storage object.
+
+    Returns:
+        AsyncProductService: A service instance using the mock storage.
+    """
+    return AsyncProductService(storage)
+
+
+def test_retrieve_all_products_successfully(product, storage, service):
+    """
+    Tests that the `get_all_products` method awaits the storage
+    and returns its list of products.
+    """
+    storage.get_all_products.return_value = [product]
+
+    result = asyncio.run(service.get_all_products())
+    assert result == [product]
+    storage.get_all_products.assert_awaited_once()
+
+
+def test_retrieve_product_by_id_successfully(product, storage, service):
+    """
+    Tests that the `get_product_by_id` method retrieves the correct product.
+    """
+    storage.get_product_by_id.return_value = product
+
+    result = asyncio.run(service.get_product_by_id("01JFTE35ZRRZWCSKK6TBB1DZCT"))
+    assert result == product
+    storage.get_product_by_id.assert_awaited_once_with("01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+
+def test_retrieve_product_by_name_successfully(product, storage, service):
+    """
+    Tests that the `get_product_by_name` method retrieves the correct product.
+    """
+    storage.get_product_by_name.return_value = product
+
+    result = asyncio.run(service.get_product_by_name("house"))
+    assert result == product
+    storage.get_product_by_name.assert_awaited_once_with("house")
+
+
+def test_create_product_successfully(product, storage, service):
+    """
+    Tests that the `create_product` method returns the created product.
+    """
+    storage.create_product.return_value = product
+
+    result = asyncio.run(service.create_product(product))
+    assert result == product
+    storage.create_product.assert_awaited_once_with(product)
+
+
+def test_update_product_successfully(product, storage, service):
+    """
+    Tests that the `update_product` method stamps `updated_at`
+    before handing the product to the storage.
+    """
+    storage.update_product.return_value = product
+
+    result = asyncio.run(service.update_product(product))
+    assert result.updated_at is not None
+    storage.update_product.assert_awaited_once_with(product)
+
+
+def test_delete_product_by_id_successfully(storage, service):
+    """
+    Tests that the `delete_product_by_id` method deletes the product.
+    """
+    result = asyncio.run(service.delete_product_by_id("01JFTE35ZRRZWCSKK6TBB1DZCT"))
+    assert result is None
+    storage.delete_product_by_id.assert_awaited_once_with("01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+
+def test_retrieve_all_products_handles_database_error(storage, service):
+    """
+    Tests that the `get_all_products` method propagates a `DatabaseError`.
+    """
+    storage.get_all_products.side_effect = DatabaseError()
+
+    with pytest.raises(DatabaseError):
+        asyncio.run(service.get_all_products())
+
+
+def test_retrieve_product_by_id_handles_value_error(storage, service):
+    """
+    Tests that the `get_product_by_id` method propagates a `ValueError`.
+    """
+    storage.get_product_by_id.side_effect = ValueError()
+
+    with pytest.raises(ValueError):
+        asyncio.run(service.get_product_by_id("01JFTE35"))
+
+
+def test_get_product_by_id_reads_through_cache(product, storage):
+    """
+    Tests that the async `get_product_by_id` serves repeated lookups from the cache.
+    """
+    service = AsyncProductService(storage, cache=ProductCache(max_size=100))
+    storage.get_product_by_id.return_value = product
+
+    asyncio.run(service.get_product_by_id(product.id))
+    result = asyncio.run(service.get_product_by_id(product.id))
+
+    assert result == product
+    storage.get_product_by_id.assert_awaited_once_with(product.id)
+
+
+def test_delete_during_load_is_not_undone(product, storage):
+    """
+    Tests that the async service does not cache a product deleted while its
+    lookup was loading.
+    """
+    service = AsyncProductService(storage, cache=ProductCache(max_size=100))
+
+    async def load_during_delete(id):
+        await service.delete_product_by_id(id)
+        return product
+
+    storage.get_product_by_id.side_effect = load_during_delete
+
+    assert asyncio.run(service.get_product_by_id(product.id)) == product
+    assert service.cache.get("id", product.id) is MISSING
+
+
+def test_consistency_token_bypasses_cache(product, storage):
+    """
+    Tests that the async service never serves a cached row to a read carrying
+    a consistency token.
+    """
+    service = AsyncProductService(storage, cache=ProductCache(max_size=100))
+    updated = product.model_copy(update={"quantity": 1})
+    service.cache.put(product)
+    storage.get_product_by_id.return_value = updated
+    storage.get_products_by_ids.return_value = [updated]
+
+    async def run():
+        CONSISTENCY_SESSION.set(ConsistencySession(required_lsn=100))
+        return (
+            await service.get_product_by_id(product.id),
+            await service.get_products_by_ids([product.id]),
+        )
+
+    found, result = asyncio.run(run())
+
+    assert found == updated
+    assert result.products == [updated]
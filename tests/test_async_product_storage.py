@@ -0,0 +1,366 @@
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from psycopg import DatabaseError
+from pytest import fixture
+
+from storages.async_product_storage import AsyncProductStorage
+
+
+@fixture(name="cursor")
+def fixture_cursor():
+    """
+    Creates a mock async cursor object to simulate database interactions.
+
+    Returns:
+        AsyncMock: A mock async cursor object.
+    """
+    return AsyncMock()
+
+
+@fixture(name="db_conn")
+def fixture_db_conn(cursor):
+    """
+    Creates a mock async database connection object with a mock cursor.
+
+    Args:
+        cursor (AsyncMock): A mock async cursor object.
+
+    Returns:
+        MagicMock: A mock async database connection object.
+    """
+    db_conn = MagicMock()
+    db_conn.cursor.return_value.__aenter__.return_value = cursor
+    db_conn.commit = AsyncMock()
+    db_conn.rollback = AsyncMock()
+    return db_conn
+
+
+@fixture(name="db_pool")
+def fixture_db_pool(db_conn):
+    """
+    Creates a mock async connection pool that lends out the mock connection.
+
+    Args:
+        db_conn (MagicMock): A mock async database connection object.
+
+    Returns:
+        MagicMock: A mock async connection pool object.
+    """
+    db_pool = MagicMock()
+    db_pool.connection.return_value.__aenter__.return_value = db_conn
+    return db_pool
+
+
+@fixture(name="storage")
+def fixture_storage(db_pool):
+    """
+    Creates an instance of AsyncProductStorage with a mock connection pool.
+
+    Args:
+        db_pool (MagicMock): A mock async connection pool object.
+
+    Returns:
+        AsyncProductStorage: A storage instance using the mock connection pool.
+    """
+    return AsyncProductStorage(db_pool)
+
+
+@fixture(name="product_row")
+def fixture_product_row():
+    """
+    Provides a sample product row for testing database operations.
+
+    Returns:
+        tuple: A tuple representing a product row.
+    """
+    return (
+        "01JFTE35ZRRZWCSKK6TBB1DZCT",
+        "house",
+        "bed for cats",
+        Decimal("20.0"),
+        100,
+        True,
+        datetime(2024, 12, 23, 15, 57, 25, 496623),
+        None,
+    )
+
+
+def test_get_all_products(cursor, storage, product, product_row):
+    """
+    Test that `get_all_products` awaits the query and maps every row
+    to the expected product model.
+    """
+    cursor.fetchall.return_value = [product_row]
+
+    result = asyncio.run(storage.get_all_products())
+    assert result == [product]
+
+    cursor.execute.assert_awaited_once()
+
+
+def test_get_product_by_id(cursor, storage, product, product_row):
+    """
+    Test that `get_product_by_id` retrieves a product by ID
+    and maps the result to the expected product model.
+    """
+    cursor.fetchone.return_value = product_row
+
+    result = asyncio.run(storage.get_product_by_id("01JFTE35ZRRZWCSKK6TBB1DZCT"))
+    assert result == product
+
+    assert cursor.execute.await_args.args[1] == ("01JFTE35ZRRZWCSKK6TBB1DZCT",)
+
+
+def test_get_product_by_name(cursor, storage, product, product_row):
+    """
+    Test that `get_product_by_name` retrieves a product by Name
+    and maps the result to the expected product model.
+    """
+    cursor.fetchone.return_value = product_row
+
+    result = asyncio.run(storage.get_product_by_name("house"))
+    assert result == product
+
+    assert cursor.execute.await_args.args[1] == ("house",)
+
+
+def test_create_product(cursor, db_conn, storage, product):
+    """
+    Test that `create_product` inserts a new product and commits the transaction.
+    """
+    result = asyncio.run(storage.create_product(product))
+
+    assert result == product
+    cursor.execute.assert_awaited_once()
+    db_conn.commit.assert_awaited_once()
+
+
+def test_update_product(cursor, db_conn, storage, product, product_row):
+    """
+    Test that `update_product` updates an existing product
+    and returns the row read back from the database.
+    """
+    cursor.fetchone.return_value = product_row
+
+    result = asyncio.run(storage.update_product(product))
+
+    assert result == product
+    db_conn.commit.assert_awaited_once()
+
+
+def test_delete_product_by_id(cursor, db_conn, storage):
+    """
+    Test that `delete_product_by_id` removes a product and commits the transaction.
+    """
+    cursor.rowcount = 1
+
+    result = asyncio.run(storage.delete_product_by_id("01JFTE35ZRRZWCSKK6TBB1DZCT"))
+
+    assert result is None
+    db_conn.commit.assert_awaited_once()
+
+
+def test_get_product_by_id_value_error(cursor, storage):
+    """
+    Test that `get_product_by_id` raises a `ValueError`
+    when the product with the given ID does not exist in the database.
+    """
+    cursor.fetchone.return_value = None
+
+    with pytest.raises(ValueError):
+        asyncio.run(storage.get_product_by_id("01JFTE35ZRRZWCSKK6TBB1DZCT"))
+
+
+def test_stream_all_product_dicts(cursor, storage, product, product_row):
+    """
+    Test that `stream_all_product_dicts` yields one list of dicts
+    per `fetchmany` batch.
+    """
+    cursor.fetchmany.side_effect = [[product_row, product_row], []]
+
+    async def collect():
+        return [batch async for batch in storage.stream_all_product_dicts()]
+
+    result = asyncio.run(collect())
+    assert result == [[product.model_dump(), product.model_dump()]]
+
+
+def test_get_all_products_database_error(cursor, storage):
+    """
+    Test that `get_all_products` raises a `DatabaseError`
+    when an error occurs during query execution.
+    """
+    cursor.execute.side_effect = DatabaseError()
+
+    with pytest.raises(DatabaseError):
+        asyncio.run(storage.get_all_products())
+
+    cursor.fetchall.assert_not_awaited()
+
+
+def test_create_product_database_error(cursor, db_conn, storage, product):
+    """
+    Test that `create_product` rolls back and re-raises a `DatabaseError`.
+    """
+    cursor.execute.side_effect = DatabaseError()
+
+    with pytest.raises(DatabaseError):
+        asyncio.run(storage.create_product(product))
+
+    db_conn.rollback.assert_awaited_once()
+
+
+def test_update_product_value_error(cursor, db_conn, storage, product):
+    """
+    Test that `update_product` raises a `ValueError` without committing
+    when the product with the given ID does not exist in the database.
+    """
+    cursor.fetchone.return_value = None
+
+    with pytest.raises(ValueError):
+        asyncio.run(storage.update_product(product))
+
+    db_conn.commit.assert_not_awaited()
+
+
+def test_delete_product_by_id_value_error(cursor, db_conn, storage):
+    """
+    Test that `delete_product_by_id` raises a `ValueError` without committing
+    when attempting to delete a product with a non-existing ID.
+    """
+    cursor.rowcount = 0
+
+    with pytest.raises(ValueError):
+        asyncio.run(storage.delete_product_by_id("01JFTE35"))
+
+    db_conn.commit.assert_not_awaited()
+
+
+def test_stream_all_products(cursor, db_conn, storage, product, product_row):
+    """
+    Test that `stream_all_products` reads through a server-side named cursor
+    in `fetchmany` batches and yields every mapped product.
+    """
+    cursor.fetchmany.side_effect = [[product_row], [product_row], []]
+
+    async def collect():
+        return [item async for item in storage.stream_all_products(batch_size=1)]
+
+    result = asyncio.run(collect())
+    assert result == [product, product]
+
+    db_conn.cursor.assert_called_once_with(name="products_stream")
+
+
+def test_create_products(cursor, db_conn, storage, product):
+    """
+    Test that `create_products` inserts the batch in one statement
+    and returns the inserted ids.
+    """
+    cursor.fetchall.return_value = [(product.id,)]
+
+    result = asyncio.run(storage.create_products([product]))
+
+    assert result == [product.id]
+    cursor.execute.assert_awaited_once()
+    db_conn.commit.assert_awaited_once()
+
+
+def test_delete_products_by_ids(cursor, db_conn, storage):
+    """
+    Test that `delete_products_by_ids` returns only the ids that were deleted.
+    """
+    cursor.fetchall.return_value = [("01JFTE35ZRRZWCSKK6TBB1DZCT",)]
+
+    result = asyncio.run(
+        storage.delete_products_by_ids(["01JFTE35ZRRZWCSKK6TBB1DZCT", "01JFTE35"])
+    )
+
+    assert result == ["01JFTE35ZRRZWCSKK6TBB1DZCT"]
+    db_conn.commit.assert_awaited_once()
+
+
+def test_get_products_by_ids(cursor, storage, product, product_row):
+    """
+    Test that `get_products_by_ids` fetches every requested id in one query.
+    """
+    cursor.fetchall.return_value = [product_row]
+
+    result = asyncio.run(storage.get_products_by_ids(["01JFTE35ZRRZWCSKK6TBB1DZCT"]))
+
+    assert result == [product]
+    cursor.execute.assert_awaited_once()
+
+
+def test_get_product_changes(cursor, storage, product, product_row):
+    """
+    Test that `get_product_changes` awaits the feed query and maps each change.
+    """
+    cursor.fetchall.return_value = [("750", 10, product.id, "insert", *product_row)]
+
+    result = asyncio.run(storage.get_product_changes((0, 0), limit=10))
+
+    assert result[0].token == "750-10"
+    assert result[0].product == product
+    cursor.execute.assert_awaited_once()
+
+
+def test_search_products(cursor, storage, product, product_row):
+    """
+    Test that `search_products` awaits the ranked query and returns each
+    product with its score.
+    """
+    cursor.fetchall.return_value = [(*product_row, 0.75)]
+
+    result = asyncio.run(storage.search_products("house", limit=10))
+
+    assert result == [(product, 0.75)]
+    cursor.execute.assert_awaited_once()
+
+
+def test_get_product_by_id_prepared(cursor, db_pool, product, product_row):
+    """
+    Test that with `prepare_statements` the lookup asks psycopg to prepare
+    the statement on the connection.
+    """
+    storage = AsyncProductStorage(db_pool, prepare_statements=True)
+    cursor.fetchone.return_value = product_row
+
+    result = asyncio.run(storage.get_product_by_id(product.id))
+
+    assert result == product
+    assert cursor.execute.await_args.kwargs == {"prepare": True}
+
+
+def test_adjust_product_stock(cursor, db_conn, storage, product, product_row):
+    """
+    Test that `adjust_product_stock` awaits the conditional UPDATE and commits.
+    """
+    cursor.fetchone.return_value = product_row
+    updated_at = datetime(2025, 1, 2, 3, 4, 5)
+
+    result = asyncio.run(storage.adjust_product_stock(product.id, -3, updated_at))
+
+    assert result == product
+    assert cursor.execute.await_args.args[1] == (-3, updated_at, product.id, 3)
+    db_conn.commit.assert_awaited_once()
+
+
+def test_patch_product(cursor, db_conn, storage, product, product_row):
+    """
+    Test that `patch_product` awaits the sparse UPDATE and commits.
+    """
+    cursor.fetchone.return_value = product_row
+    updated_at = datetime(2025, 1, 2, 3, 4, 5)
+
+    result = asyncio.run(
+        storage.patch_product(product.id, {"name": "box", "updated_at": updated_at})
+    )
+
+    assert result == product
+    assert cursor.execute.await_args.args[1] == ["box", updated_at, product.id]
+    db_conn.commit.assert_awaited_once()
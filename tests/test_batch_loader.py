@@ -0,0 +1,130 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+from psycopg2 import DatabaseError
+
+from storages.batch_loader import AsyncBatchLoader, BatchLoader
+
+
+def load_upper(keys):
+    return {key: key.upper() for key in keys if key != "missing"}
+
+
+def load_concurrently(loader: BatchLoader, keys: list) -> list:
+    with ThreadPoolExecutor(max_workers=len(keys)) as executor:
+        futures = [executor.submit(loader.load, key) for key in keys]
+    return futures
+
+
+def test_batch_loader_batches_concurrent_lookups():
+    """
+    Test that lookups arriving within the window run as one batch, repeated keys
+    are sent once and missing keys come back as None.
+    """
+    load_many = MagicMock(side_effect=load_upper)
+    loader = BatchLoader("test", load_many, window=0.2)
+
+    futures = load_concurrently(loader, ["a", "b", "a", "missing"])
+
+    assert [future.result() for future in futures] == ["A", "B", "A", None]
+    load_many.assert_called_once()
+    assert sorted(load_many.call_args.args[0]) == ["a", "b", "missing"]
+
+    assert loader.load("c") == "C"
+    assert load_many.call_count == 2
+
+
+def test_batch_loader_dispatches_full_batches_early():
+    """
+    Test that a batch reaching `max_batch_size` runs without waiting out the
+    window, and later keys start a new batch.
+    """
+    load_many = MagicMock(side_effect=load_upper)
+    loader = BatchLoader("test", load_many, window=5, max_batch_size=3)
+
+    start = time.monotonic()
+    futures = load_concurrently(loader, ["a", "b", "c"])
+
+    assert [future.result() for future in futures] == ["A", "B", "C"]
+    assert time.monotonic() - start < 2
+    load_many.assert_called_once()
+
+
+def test_batch_loader_propagates_errors():
+    """
+    Test that a failed batch query raises in every caller of the batch.
+    """
+    load_many = MagicMock(side_effect=DatabaseError("connection lost"))
+    loader = BatchLoader("test", load_many, window=0.2)
+
+    futures = load_concurrently(loader, ["a", "b"])
+
+    for future in futures:
+        with pytest.raises(DatabaseError):
+            future.result()
+    load_many.assert_called_once()
+
+
+def test_async_batch_loader():
+    """
+    Test that concurrent coroutines share one batch query, including its error.
+    """
+    batches = []
+
+    async def load_many(keys):
+        batches.append(sorted(keys))
+        if "broken" in keys:
+            raise DatabaseError("connection lost")
+        return load_upper(keys)
+
+    loader = AsyncBatchLoader("test", load_many, window=0.01, max_batch_size=10)
+
+    async def run():
+        results = await asyncio.gather(
+            *(loader.load(key) for key in ("a", "b", "missing", "a"))
+        )
+        errors = await asyncio.gather(
+            loader.load("broken"), loader.load("c"), return_exceptions=True
+        )
+        return results, errors
+
+    results, errors = asyncio.run(run())
+
+    assert results == ["A", "B", None, "A"]
+    assert all(isinstance(error, DatabaseError) for error in errors)
+    assert batches == [["a", "b", "missing"], ["broken", "c"]]
+
+
+def test_async_batch_loader_cancelled_dispatch():
+    """
+    Test that cancelling a batch query cancels its waiting callers instead of
+    leaving them hanging, and that later lookups start a new batch.
+    """
+    started = asyncio.Event()
+
+    async def load_many(keys):
+        if "stuck" in keys:
+            started.set()
+            await asyncio.Event().wait()
+        return load_upper(keys)
+
+    loader = AsyncBatchLoader("test", load_many, window=0.01)
+
+    async def run():
+        callers = [asyncio.create_task(loader.load(key)) for key in ("stuck", "a")]
+        await asyncio.sleep(0)
+        batch = loader._batches[0]
+        await started.wait()
+
+        batch.task.cancel()
+        _, pending = await asyncio.wait(callers, timeout=1)
+        return pending, callers, await loader.load("b")
+
+    pending, callers, result = asyncio.run(run())
+
+    assert not pending
+    assert all(caller.cancelled() for caller in callers)
+    assert result == "B"
@@ -0,0 +1,50 @@
+from benchmarks.fakes import FakeConnectionPool, make_product_rows
+from benchmarks.micro import measure, run_micro_benchmarks
+from benchmarks.run import compare
+from storages.product_storage import ProductStorage
+
+
+def test_measure_reports_timings():
+    """
+    Test that `measure` runs the benchmarked function and reports its timings.
+    """
+    calls = []
+
+    result = measure(lambda: calls.append(1), repeat=2, min_time=0.001)
+
+    assert 0 < result["iterations"] < len(calls)
+    assert result["min_us"] <= result["median_us"]
+    assert result["ops_per_sec"] > 0
+
+
+def test_run_micro_benchmarks_on_fake_pool():
+    """
+    Test that the micro benchmarks run end to end against the in-memory pool.
+    """
+    rows = make_product_rows(10)
+    storage = ProductStorage(FakeConnectionPool(rows))
+    products = [storage.map_product_row_to_model(row) for row in rows]
+
+    results = run_micro_benchmarks(storage, products, rows, repeat=1, min_time=0.0001)
+
+    assert "storage.get_product_by_id" in results
+    assert all(result["median_us"] > 0 for result in results.values())
+
+
+def test_compare_reports_regressions_above_threshold():
+    """
+    Test that `compare` only flags benchmarks slower than the threshold.
+    """
+    baseline = {
+        "micro": {"fast": {"median_us": 10.0}, "slow": {"median_us": 10.0}},
+        "macro": {"GET /products": {"p50_ms": 2.0, "p99_ms": 5.0}},
+    }
+    candidate = {
+        "micro": {"fast": {"median_us": 10.5}, "slow": {"median_us": 12.0}},
+        "macro": {"GET /products": {"p50_ms": 2.0, "p99_ms": 5.1}},
+    }
+
+    regressions = compare(baseline, candidate, threshold=0.10)
+
+    assert len(regressions) == 1
+    assert "slow" in regressions[0]
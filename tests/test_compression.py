@@ -0,0 +1,128 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from pytest import fixture
+
+from caches.compressed_cache import CompressedResponseCache
+from routes.compression import CompressionMiddleware, choose_encoding
+
+BODY = b'{"name": "house"}' * 100
+
+
+@fixture(name="cache")
+def fixture_cache():
+    """
+    Creates an empty precompressed response cache.
+
+    Returns:
+        CompressedResponseCache: A cache holding up to 8 responses.
+    """
+    return CompressedResponseCache(max_size=8)
+
+
+@fixture(name="client")
+def fixture_client(cache):
+    """
+    Creates a test client for a small app behind `CompressionMiddleware`.
+
+    Returns:
+        TestClient: A client whose GET /products body is tagged with `etag`.
+    """
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500, cache=cache)
+    app.state.etag = '"v1"'
+
+    @app.get("/products")
+    def get_products():
+        return PlainTextResponse(
+            BODY, media_type="application/json", headers={"ETag": app.state.etag}
+        )
+
+    @app.get("/products/small")
+    def get_small_product():
+        return PlainTextResponse(b"{}", media_type="application/json")
+
+    @app.get("/products/stream")
+    def stream_products():
+        return StreamingResponse(iter([BODY, BODY]), media_type="application/x-ndjson")
+
+    @app.post("/products")
+    def create_product():
+        return PlainTextResponse(b"{}", media_type="application/json")
+
+    return TestClient(app)
+
+
+def get_raw(client, path: str, accept_encoding: str):
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as r:
+        return r, b"".join(r.iter_raw())
+
+
+def test_choose_encoding():
+    """
+    Test that `choose_encoding` honors q-values and wildcards, and breaks ties
+    with the server preference order.
+    """
+    encodings = ("zstd", "br", "gzip")
+
+    assert choose_encoding("gzip, br", encodings) == "br"
+    assert choose_encoding("gzip;q=1, br;q=0.5", encodings) == "gzip"
+    assert choose_encoding("*", encodings) == "zstd"
+    assert choose_encoding("*, zstd;q=0", encodings) == "br"
+    assert choose_encoding("br", ("gzip",)) is None
+    assert choose_encoding("", encodings) is None
+
+
+def test_compresses_large_responses(client):
+    """
+    Test that responses over the minimum size are gzip encoded with a matching
+    Content-Length and Vary header, while small ones go out as they are.
+    """
+    response, body = get_raw(client, "/products", "gzip")
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Content-Length"] == str(len(body))
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(body) == BODY
+
+    response, body = get_raw(client, "/products/small", "gzip")
+    assert "Content-Encoding" not in response.headers
+    assert body == b"{}"
+
+    response, body = get_raw(client, "/products", "identity")
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert body == BODY
+
+
+def test_compresses_streamed_responses(client):
+    """
+    Test that streamed responses are compressed chunk by chunk without a
+    Content-Length.
+    """
+    response, body = get_raw(client, "/products/stream", "gzip")
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert gzip.decompress(body) == BODY * 2
+
+
+def test_reuses_precompressed_bodies(client, cache):
+    """
+    Test that GET responses with an ETag are compressed once, a new ETag is
+    compressed again and a successful write clears the cache.
+    """
+    _, first = get_raw(client, "/products", "gzip")
+    _, second = get_raw(client, "/products", "gzip")
+
+    assert second == first
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+    client.app.state.etag = '"v2"'
+    get_raw(client, "/products", "gzip")
+    assert cache.stats()["misses"] == 2
+
+    client.post("/products")
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,220 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from psycopg2 import OperationalError
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_INTRANS,
+    TRANSACTION_STATUS_UNKNOWN,
+)
+from psycopg2.pool import PoolError
+from pytest import fixture
+
+from configs.db_pool import ConnectionPool, PoolTimeoutError
+
+
+def make_connection():
+    """
+    Creates a mock psycopg2 connection that reports an idle, open session.
+
+    Returns:
+        MagicMock: A mock database connection object.
+    """
+    db_conn = MagicMock()
+    db_conn.closed = 0
+    db_conn.info.transaction_status = TRANSACTION_STATUS_IDLE
+    return db_conn
+
+
+@fixture(name="connection_factory")
+def fixture_connection_factory():
+    """
+    Creates a mock connection factory that returns a new mock connection per call.
+
+    Returns:
+        MagicMock: A mock connection factory.
+    """
+    return MagicMock(side_effect=lambda: make_connection())
+
+
+@fixture(name="pool")
+def fixture_pool(connection_factory):
+    """
+    Creates a small ConnectionPool backed by the mock connection factory.
+
+    Args:
+        connection_factory (MagicMock): A mock connection factory.
+
+    Returns:
+        ConnectionPool: A pool with min_size=1, max_size=2 and a short timeout.
+    """
+    return ConnectionPool(
+        connection_factory=connection_factory, min_size=1, max_size=2, timeout=0.05
+    )
+
+
+def test_pool_opens_min_size_connections(pool, connection_factory):
+    """
+    Test that the pool eagerly opens `min_size` connections on creation.
+    """
+    assert connection_factory.call_count == 1
+    assert pool.stats() == {"size": 1, "idle": 1, "in_use": 0, "waiting": 0}
+
+
+def test_pool_reuses_returned_connection(pool, connection_factory):
+    """
+    Test that a connection returned to the pool is lent out again
+    instead of opening a new one.
+    """
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert connection_factory.call_count == 1
+
+
+def test_pool_grows_up_to_max_size(pool, connection_factory):
+    """
+    Test that concurrent borrowers get distinct connections up to `max_size`.
+    """
+    first = pool.getconn()
+    second = pool.getconn()
+
+    assert first is not second
+    assert connection_factory.call_count == 2
+    assert pool.stats()["in_use"] == 2
+
+
+def test_pool_checkout_timeout(pool):
+    """
+    Test that borrowing from an exhausted pool raises `PoolTimeoutError`
+    once the checkout timeout elapses.
+    """
+    pool.getconn()
+    pool.getconn()
+
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+
+
+def test_pool_waiter_receives_released_connection(pool):
+    """
+    Test that a borrower waiting on an exhausted pool is woken up
+    when another thread returns a connection.
+    """
+    pool.timeout = 1
+    first = pool.getconn()
+    pool.getconn()
+
+    releaser = threading.Timer(0.05, pool.putconn, args=(first,))
+    releaser.start()
+
+    assert pool.getconn() is first
+    releaser.join()
+
+
+def test_pool_health_check_pings_on_borrow(pool):
+    """
+    Test that the pool runs a `SELECT 1` health check when lending a connection.
+    """
+    with pool.connection() as db_conn:
+        cursor = db_conn.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with("SELECT 1")
+
+
+def test_pool_reconnects_when_health_check_fails(pool, connection_factory):
+    """
+    Test that a connection failing the health check is closed and replaced
+    by a freshly opened one.
+    """
+    broken = pool.getconn()
+    pool.putconn(broken)
+    broken.cursor.return_value.__enter__.return_value.execute.side_effect = (
+        OperationalError()
+    )
+
+    with pool.connection() as db_conn:
+        assert db_conn is not broken
+
+    broken.close.assert_called_once()
+    assert connection_factory.call_count == 2
+    assert pool.stats()["size"] == 1
+
+
+def test_pool_discards_closed_connection_on_return(pool):
+    """
+    Test that a connection closed while borrowed is dropped from the pool
+    and frees its slot.
+    """
+    db_conn = pool.getconn()
+    db_conn.closed = 2
+
+    pool.putconn(db_conn)
+
+    assert pool.stats() == {"size": 0, "idle": 0, "in_use": 0, "waiting": 0}
+
+
+def test_pool_discards_connection_in_unknown_state(pool):
+    """
+    Test that a connection whose transaction status is unknown (lost session)
+    is dropped instead of being returned to the pool.
+    """
+    db_conn = pool.getconn()
+    db_conn.info.transaction_status = TRANSACTION_STATUS_UNKNOWN
+
+    pool.putconn(db_conn)
+
+    db_conn.close.assert_called_once()
+    assert pool.stats()["size"] == 0
+
+
+def test_pool_rolls_back_open_transaction_on_return(pool):
+    """
+    Test that a connection returned inside a transaction is rolled back
+    so the next borrower starts from a clean session.
+    """
+    db_conn = pool.getconn()
+    db_conn.info.transaction_status = TRANSACTION_STATUS_INTRANS
+
+    pool.putconn(db_conn)
+
+    db_conn.rollback.assert_called_once()
+    assert pool.stats()["idle"] == 1
+
+
+def test_pool_releases_slot_when_connect_fails(pool, connection_factory):
+    """
+    Test that a failed connection attempt does not leak a pool slot.
+    """
+    pool.getconn()
+    connection_factory.side_effect = OperationalError()
+
+    with pytest.raises(OperationalError):
+        pool.getconn()
+
+    assert pool.stats()["size"] == 1
+
+
+def test_pool_close(pool):
+    """
+    Test that closing the pool closes idle connections and rejects new borrowers.
+    """
+    db_conn = pool.getconn()
+    pool.putconn(db_conn)
+
+    pool.close()
+
+    db_conn.close.assert_called_once()
+    with pytest.raises(PoolError):
+        pool.getconn()
+
+
+def test_pool_invalid_size():
+    """
+    Test that a pool with `min_size` greater than `max_size` is rejected.
+    """
+    with pytest.raises(ValueError):
+        ConnectionPool(connection_factory=make_connection, min_size=3, max_size=2)
@@ -0,0 +1,107 @@
+import io
+import json
+import logging
+from unittest.mock import MagicMock
+
+from configs.log_conf import (
+    JsonFormatter,
+    LogPayload,
+    PayloadSamplingFilter,
+    QueueStreamHandler,
+)
+
+
+def make_record(msg: str, *args, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_log_payload_truncates_long_payloads(product):
+    """
+    Test that `LogPayload` renders the product as JSON and truncates it
+    past `max_length`.
+    """
+    payload = LogPayload(product)
+    full = product.model_dump_json()
+
+    assert str(payload) == full
+
+    payload.max_length = 10
+    assert str(payload) == f"{full[:10]}...({len(full) - 10} more chars)"
+
+
+def test_log_payload_is_not_rendered_when_level_disabled():
+    """
+    Test that payloads logged below the enabled level are never serialized.
+    """
+    value = MagicMock()
+    logger = logging.getLogger("test_log_payload_lazy")
+    logger.setLevel(logging.INFO)
+
+    logger.debug("payload=%s", LogPayload(value))
+
+    value.model_dump_json.assert_not_called()
+
+
+def test_payload_sampling_filter():
+    """
+    Test that the sampling filter only drops records carrying a payload.
+    """
+    sampling_filter = PayloadSamplingFilter(sample_rate=0.0)
+
+    assert sampling_filter.filter(make_record("plain %s", "id"))
+    assert not sampling_filter.filter(
+        make_record("payload %s", LogPayload(MagicMock()))
+    )
+    assert PayloadSamplingFilter(sample_rate=1.0).filter(
+        make_record("payload %s", LogPayload(MagicMock()))
+    )
+
+
+def test_json_formatter_includes_extra_fields():
+    """
+    Test that `JsonFormatter` emits one JSON object with the rendered message
+    and any `extra` fields.
+    """
+    record = make_record("Started GetProduct with id=%s", "abc", product_id="abc")
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "Started GetProduct with id=abc"
+    assert entry["level"] == "INFO"
+    assert entry["product_id"] == "abc"
+
+
+def test_queue_stream_handler_writes_from_listener():
+    """
+    Test that `QueueStreamHandler` hands records to a listener thread that
+    formats and writes them to the stream.
+    """
+    stream = io.StringIO()
+    handler = QueueStreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+
+    handler.handle(make_record("hello %s", "world"))
+    handler.close()
+
+    assert stream.getvalue() == "INFO hello world\n"
+
+
+def test_queue_stream_handler_restarts_listener():
+    """
+    Test that `restart_listener`, run in forked children, gives the handler a
+    fresh queue and listener that keep writing records.
+    """
+    stream = io.StringIO()
+    handler = QueueStreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = handler.listener
+
+    handler.restart_listener()
+    listener.stop()
+    handler.handle(make_record("after fork"))
+    handler.close()
+
+    assert handler.listener is not listener
+    assert stream.getvalue() == "after fork\n"
@@ -0,0 +1,92 @@
+from unittest.mock import MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry, REGISTRY
+
+from metrics.instruments import CacheCollector, PoolCollector, TimedCursor
+from metrics.middleware import MetricsMiddleware
+from routes.metrics_router import router as metrics_router
+
+
+def get_sample(name: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_timed_cursor_records_phases_and_rows():
+    """
+    Test that `TimedCursor` times execute and fetch calls on the wrapped cursor
+    and counts the rows returned under the query label.
+    """
+    cursor = MagicMock()
+    cursor.fetchall.return_value = [("a",), ("b",)]
+    cursor_context = MagicMock()
+    cursor_context.__enter__.return_value = cursor
+    labels = {"query": "test_timed_cursor"}
+    executes = get_sample(
+        "db_query_duration_seconds_count", {**labels, "phase": "execute"}
+    )
+    rows = get_sample("db_query_rows_total", labels)
+
+    with TimedCursor(cursor_context, "test_timed_cursor") as timed_cursor:
+        timed_cursor.execute("SELECT 1", ("x",))
+        assert timed_cursor.fetchall() == [("a",), ("b",)]
+
+    cursor.execute.assert_called_once_with("SELECT 1", ("x",))
+    cursor_context.__exit__.assert_called_once()
+    assert (
+        get_sample("db_query_duration_seconds_count", {**labels, "phase": "execute"})
+        == executes + 1
+    )
+    assert get_sample("db_query_rows_total", labels) == rows + 2
+
+
+def test_metrics_middleware_labels_route_template():
+    """
+    Test that request latency is recorded under the route template,
+    not the raw path, and that `/metrics` exposes it.
+    """
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        return {"id": item_id}
+
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = get_sample("http_request_duration_seconds_count", labels)
+
+    with TestClient(app) as client:
+        client.get("/items/1")
+        client.get("/items/2")
+        response = client.get("/metrics")
+
+    assert get_sample("http_request_duration_seconds_count", labels) == before + 2
+    assert 'route="/items/{item_id}"' in response.text
+
+
+def test_pool_and_cache_collectors():
+    """
+    Test that pool and cache stats are exported as gauges and counters.
+    """
+    registry = CollectorRegistry()
+    registry.register(
+        PoolCollector(lambda: {"size": 3, "idle": 1, "in_use": 2, "waiting": 4})
+    )
+    registry.register(
+        CacheCollector(
+            lambda: {
+                "size": 10,
+                "hits": 5,
+                "negative_hits": 1,
+                "misses": 2,
+                "evictions": 0,
+            }
+        )
+    )
+
+    assert registry.get_sample_value("db_pool_in_use") == 2
+    assert registry.get_sample_value("db_pool_waiting") == 4
+    assert registry.get_sample_value("product_cache_size") == 10
+    assert registry.get_sample_value("product_cache_hits_total") == 5
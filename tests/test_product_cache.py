@@ -0,0 +1,217 @@
+from pytest import fixture
+
+from caches.product_cache import MISSING, ProductCache
+from configs.cache_conf import get_product_cache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@fixture(name="clock")
+def fixture_clock():
+    """
+    Creates a manually advanced clock so TTL expiry can be tested deterministically.
+
+    Returns:
+        FakeClock: A callable returning the current fake time.
+    """
+    return FakeClock()
+
+
+@fixture(name="cache")
+def fixture_cache(clock):
+    """
+    Creates a small ProductCache driven by the fake clock.
+
+    Args:
+        clock (FakeClock): The fake clock.
+
+    Returns:
+        ProductCache: A cache holding at most 4 entries.
+    """
+    return ProductCache(max_size=4, ttl=10, negative_ttl=2, clock=clock)
+
+
+def test_cache_miss(cache):
+    """
+    Test that looking up an unknown key reports a miss.
+    """
+    assert cache.get("id", "01JFTE35ZRRZWCSKK6TBB1DZCT") is MISSING
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_put_indexes_by_id_and_name(cache, product):
+    """
+    Test that a cached product can be found both by its id and by its name.
+    """
+    cache.put(product)
+
+    assert cache.get("id", product.id) is product
+    assert cache.get("name", product.name) is product
+    assert cache.stats()["hits"] == 2
+
+
+def test_cache_entry_expires_after_ttl(cache, clock, product):
+    """
+    Test that an entry older than the TTL is treated as a miss.
+    """
+    cache.put(product)
+    clock.now = 10
+
+    assert cache.get("id", product.id) is MISSING
+
+
+def test_cache_negative_entry(cache, clock):
+    """
+    Test that a missing product is remembered for the negative TTL only.
+    """
+    cache.put_missing("id", "01JFTE35")
+
+    assert cache.get("id", "01JFTE35") is None
+    assert cache.stats()["negative_hits"] == 1
+
+    clock.now = 2
+    assert cache.get("id", "01JFTE35") is MISSING
+
+
+def test_cache_put_replaces_negative_entry(cache, product):
+    """
+    Test that caching a product overrides an earlier not-found entry.
+    """
+    cache.put_missing("name", product.name)
+    cache.put(product)
+
+    assert cache.get("name", product.name) is product
+
+
+def test_cache_invalidate_drops_both_keys(cache, product):
+    """
+    Test that invalidating an id also drops the entry cached under its name.
+    """
+    cache.put(product)
+    cache.invalidate(product.id)
+
+    assert cache.get("id", product.id) is MISSING
+    assert cache.get("name", product.name) is MISSING
+
+
+def test_cache_rename_drops_previous_name(cache, product):
+    """
+    Test that refreshing a renamed product stops serving it under its old name.
+    """
+    cache.put(product)
+    renamed = product.model_copy(update={"name": "bed"})
+    cache.put(renamed)
+
+    assert cache.get("name", "house") is MISSING
+    assert cache.get("name", "bed") is renamed
+
+
+def test_cache_evicts_least_recently_used(cache, product):
+    """
+    Test that the cache stays bounded by evicting the least recently used entries.
+    """
+    other = product.model_copy(
+        update={"id": "01JFTE35ZRRZWCSKK6TBB1DZCV", "name": "toy"}
+    )
+    cache.put(product)
+    cache.put(other)
+    cache.get("id", product.id)
+
+    cache.put_missing("id", "01JFTE35")
+
+    assert cache.get("name", product.name) is MISSING
+    assert cache.get("id", product.id) is product
+    assert cache.get("id", other.id) is other
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 4
+
+
+def test_cache_reuses_serialized_product(cache, product):
+    """
+    Test that the JSON bytes of a cached product are encoded once and reused
+    until the product is replaced in the cache.
+    """
+    cache.put(product)
+
+    encoded = cache.get_json(product)
+    assert encoded == product.model_dump_json().encode()
+    assert cache.get_json(product) is encoded
+
+    updated = product.model_copy(update={"quantity": 7})
+    cache.put(updated)
+
+    assert b'"quantity":7' in cache.get_json(updated)
+
+
+def test_cache_drops_serialized_product_on_invalidate(cache, product):
+    """
+    Test that invalidating a product also forgets its serialized bytes,
+    and that products outside the cache are encoded without being kept.
+    """
+    cache.put(product)
+    encoded = cache.get_json(product)
+
+    cache.invalidate(product.id)
+
+    assert cache.get_json(product) is not encoded
+    assert cache._json_by_id == {}
+
+
+def test_cache_drops_fills_older_than_a_write(cache, product):
+    """
+    Test that a fill loaded before the product was invalidated or written is
+    dropped, while one loaded afterwards is kept, and that a negative fill is
+    dropped after any write.
+    """
+    generation = cache.generation()
+    cache.invalidate(product.id)
+    cache.put(product, generation)
+    assert cache.get("id", product.id) is MISSING
+
+    cache.put_missing("name", "castle", generation)
+    assert cache.get("name", "castle") is MISSING
+
+    updated = product.model_copy(update={"quantity": 1})
+    cache.put(updated)
+    cache.put(product, generation)
+    assert cache.get("id", product.id) is updated
+
+    cache.put(product, cache.generation())
+    assert cache.get("id", product.id) is product
+
+
+def test_cache_drops_fills_older_than_forgotten_writes(cache, product):
+    """
+    Test that once the writes of a product are no longer remembered, fills
+    loaded before them are dropped rather than trusted.
+    """
+    generation = cache.generation()
+    cache.invalidate(product.id)
+    for index in range(4):
+        cache.invalidate(f"other-{index}")
+
+    cache.put(product, generation)
+    assert cache.get("id", product.id) is MISSING
+
+
+def test_local_cache_needs_shared_cache_with_several_workers(monkeypatch):
+    """
+    Test that the local cache is turned off when several workers run without a
+    shared cache to invalidate it across them, and kept otherwise.
+    """
+    monkeypatch.setenv("SERVER_WORKERS", "4")
+    monkeypatch.setenv("PRODUCT_SHARED_CACHE_URL", "")
+    assert get_product_cache() is None
+
+    monkeypatch.setenv("PRODUCT_SHARED_CACHE_URL", "redis://localhost:6379/0")
+    assert isinstance(get_product_cache(), ProductCache)
+
+    monkeypatch.setenv("SERVER_WORKERS", "1")
+    monkeypatch.setenv("PRODUCT_SHARED_CACHE_URL", "")
+    assert isinstance(get_product_cache(), ProductCache)
@@ -0,0 +1,205 @@
+import io
+from unittest.mock import MagicMock
+
+import pytest
+from psycopg2 import DatabaseError
+from pytest import fixture
+
+from storages.product_copy_storage import ProductCopyStorage
+
+CSV_HEADER = "id,name,description,price,quantity,active,created_at,updated_at\n"
+CSV_ROW = "01JFTE35ZRRZWCSKK6TBB1DZCT,house,bed for cats,20.00,100,t,2024-12-23 15:57:25.496623,\n"
+
+
+@fixture(name="copied")
+def fixture_copied():
+    """
+    Collects the payloads handed to `copy_expert`, read at call time.
+
+    Returns:
+        list: The SQL and data of every COPY statement.
+    """
+    return []
+
+
+@fixture(name="cursor")
+def fixture_cursor(copied):
+    """
+    Creates a mock cursor whose `copy_expert` records the streamed data.
+
+    Args:
+        copied (list): The list collecting COPY statements.
+
+    Returns:
+        MagicMock: A mock cursor object.
+    """
+    cursor = MagicMock()
+    cursor.copy_expert.side_effect = lambda sql, file: copied.append((sql, file.read()))
+    cursor.rowcount = 1
+    return cursor
+
+
+@fixture(name="db_conn")
+def fixture_db_conn(cursor):
+    """
+    Creates a mock database connection object with a mock cursor.
+
+    Args:
+        cursor (MagicMock): A mock cursor object.
+
+    Returns:
+        MagicMock: A mock database connection object.
+    """
+    db_conn = MagicMock()
+    db_conn.cursor.return_value.__enter__.return_value = cursor
+    return db_conn
+
+
+@fixture(name="storage")
+def fixture_storage(db_conn):
+    """
+    Creates an instance of ProductCopyStorage with a mock database connection.
+
+    Args:
+        db_conn (MagicMock): A mock database connection object.
+
+    Returns:
+        ProductCopyStorage: A copy storage using the mock database connection.
+    """
+    return ProductCopyStorage(db_conn)
+
+
+def test_export_products_csv(cursor, db_conn, storage):
+    """
+    Test that `export_products` streams the table with `COPY ... TO STDOUT`
+    as CSV with a header and returns the number of exported rows.
+    """
+    cursor.rowcount = 3
+    output = io.BytesIO()
+
+    result = storage.export_products(output, "csv")
+    assert result == 3
+
+    sql_query, file = cursor.copy_expert.call_args.args
+    assert "TO STDOUT WITH (FORMAT csv, HEADER)" in sql_query
+    assert file is output
+    db_conn.commit.assert_not_called()
+
+
+def test_export_products_binary(cursor, storage):
+    """
+    Test that `export_products` uses the binary COPY format when requested.
+    """
+    cursor.copy_expert.side_effect = None
+
+    storage.export_products(io.BytesIO(), "binary")
+
+    sql_query, _ = cursor.copy_expert.call_args.args
+    assert "FORMAT binary" in sql_query
+
+
+def test_import_products_csv_in_chunks(copied, cursor, db_conn, storage):
+    """
+    Test that `import_products` validates CSV rows and copies them
+    into the staging table one chunk at a time before committing once.
+    """
+    data = CSV_HEADER + CSV_ROW + CSV_ROW.replace("house", "bed").replace("CT,", "CV,")
+
+    result = storage.import_products(io.BytesIO(data.encode()), chunk_size=1)
+    assert result == 2
+
+    assert len(copied) == 2
+    assert all("COPY products_import" in sql_query for sql_query, _ in copied)
+    assert '"house","bed for cats","20.0","100","True"' in copied[0][1]
+    assert '"bed"' in copied[1][1]
+    db_conn.commit.assert_called_once()
+
+
+def test_import_products_generates_missing_ids(copied, storage):
+    """
+    Test that CSV rows without id or created_at get the Product defaults.
+    """
+    data = "name,description,price,quantity\nhouse,,20,1\n"
+
+    storage.import_products(io.BytesIO(data.encode()))
+
+    row = copied[0][1]
+    assert '"house",""' in row
+    assert len(row.split(",")[0].strip('"')) == 26
+
+
+def test_import_products_upsert_on_id(cursor, storage):
+    """
+    Test that `on_conflict="id"` merges the staging table with an upsert on id
+    that keeps only the last duplicate of each id.
+    """
+    storage.import_products(
+        io.BytesIO((CSV_HEADER + CSV_ROW).encode()), on_conflict="id"
+    )
+
+    merge_query = cursor.execute.call_args_list[1].args[0]
+    assert "DISTINCT ON (id)" in merge_query
+    assert "ON CONFLICT (id) DO UPDATE" in merge_query
+
+
+def test_import_products_upsert_on_name(cursor, storage):
+    """
+    Test that `on_conflict="name"` merges with an upsert on the unique name.
+    """
+    storage.import_products(
+        io.BytesIO((CSV_HEADER + CSV_ROW).encode()), on_conflict="name"
+    )
+
+    merge_query = cursor.execute.call_args_list[1].args[0]
+    assert "ON CONFLICT (name) DO UPDATE" in merge_query
+
+
+def test_import_products_invalid_row(cursor, db_conn, storage):
+    """
+    Test that an invalid CSV row aborts the import with a `ValueError`
+    naming the line, and rolls back everything copied so far.
+    """
+    data = CSV_HEADER + CSV_ROW.replace("20.00", "-1")
+
+    with pytest.raises(ValueError, match="line 2"):
+        storage.import_products(io.BytesIO(data.encode()))
+
+    cursor.copy_expert.assert_not_called()
+    db_conn.rollback.assert_called_once()
+    db_conn.commit.assert_not_called()
+
+
+def test_import_products_skip_invalid(copied, storage):
+    """
+    Test that `skip_invalid` drops invalid CSV rows and imports the rest.
+    """
+    data = CSV_HEADER + CSV_ROW.replace("20.00", "-1") + CSV_ROW
+
+    storage.import_products(io.BytesIO(data.encode()), skip_invalid=True)
+
+    assert len(copied) == 1
+    assert copied[0][1].count("\n") == 1
+
+
+def test_import_products_binary(copied, db_conn, storage):
+    """
+    Test that a binary import streams the input straight into the staging table.
+    """
+    storage.import_products(io.BytesIO(b"PGCOPY"), "binary")
+
+    sql_query, data = copied[0]
+    assert "FORMAT binary" in sql_query
+    assert data == b"PGCOPY"
+    db_conn.commit.assert_called_once()
+
+
+def test_import_products_database_error(cursor, db_conn, storage):
+    """
+    Test that a `DatabaseError` during the merge rolls back the import.
+    """
+    cursor.execute.side_effect = [None, DatabaseError()]
+
+    with pytest.raises(DatabaseError):
+        storage.import_products(io.BytesIO((CSV_HEADER + CSV_ROW).encode()))
+
+    db_conn.rollback.assert_called_once()
@@ -0,0 +1,157 @@
+from datetime import datetime
+from pathlib import Path
+
+import psycopg2
+import pytest
+from pytest import fixture
+
+from configs.db_conn import get_database_params
+from models.product_filter import ProductFilter
+from storages.product_storage import (
+    DELETE_PRODUCTS_BY_IDS,
+    SELECT_PRODUCTS_BY_IDS,
+    SELECT_PRODUCTS_BY_NAMES,
+    build_product_listing_query,
+)
+
+MIGRATIONS = Path(__file__).parent.parent / "configs" / "migrations"
+
+
+@fixture(name="cursor", scope="module")
+def fixture_cursor():
+    """
+    Creates the products table and listing indexes in a throwaway schema of the
+    configured database, seeded with enough rows for the planner to prefer
+    indexes. Everything is rolled back afterwards.
+
+    Returns:
+        cursor: A psycopg2 cursor with the throwaway schema on its search path.
+    """
+    try:
+        db = psycopg2.connect(**get_database_params(), connect_timeout=3)
+    except psycopg2.OperationalError as ex:
+        pytest.skip(f"Database not available for EXPLAIN tests: {ex}")
+
+    try:
+        with db.cursor() as cursor:
+            cursor.execute("CREATE SCHEMA listing_plans")
+            cursor.execute("SET LOCAL search_path TO listing_plans")
+            cursor.execute((MIGRATIONS / "v1_create_product_table.sql").read_text())
+            cursor.execute(
+                (MIGRATIONS / "v4_add_product_listing_indexes.sql").read_text()
+            )
+            cursor.execute(
+                """
+                INSERT INTO products
+                SELECT
+                    lpad(i::text, 26, '0'),
+                    'product ' || i,
+                    'description ' || i,
+                    i % 1000 + 1,
+                    i % 5,
+                    i % 10 <> 0,
+                    TIMESTAMP '2024-01-01' + i * INTERVAL '1 minute',
+                    CASE WHEN i % 3 = 0
+                        THEN TIMESTAMP '2024-06-01' + i * INTERVAL '1 minute'
+                    END
+                FROM generate_series(1, 20000) AS i
+                """
+            )
+            cursor.execute("ANALYZE products")
+            yield cursor
+    finally:
+        db.rollback()
+        db.close()
+
+
+def explain(cursor, filters: ProductFilter, after=None) -> dict:
+    """
+    Runs EXPLAIN on the GET /products query built for the given filters.
+
+    Returns:
+        dict: The root node of the JSON query plan.
+    """
+    sql_query, params = build_product_listing_query(100, after, filters)
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql_query}", params)
+    return cursor.fetchone()[0][0]["Plan"]
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+@pytest.mark.parametrize(
+    "filters, after, index",
+    [
+        (ProductFilter(), None, "products_active_id_idx"),
+        (
+            ProductFilter(in_stock=True),
+            "00000000000000000000010000",
+            "products_active_in_stock_id_idx",
+        ),
+        (
+            ProductFilter(min_price=100, max_price=200, sort="price"),
+            None,
+            "products_active_price_idx",
+        ),
+        (
+            ProductFilter(sort="-price"),
+            (500.0, "00000000000000000000010499"),
+            "products_active_price_idx",
+        ),
+        (
+            ProductFilter(created_after=datetime(2024, 1, 10), sort="-created_at"),
+            None,
+            "products_active_created_at_idx",
+        ),
+        (
+            ProductFilter(updated_after=datetime(2024, 6, 5), sort="updated_at"),
+            (datetime(2024, 6, 10), "00000000000000000000013000"),
+            "products_active_modified_idx",
+        ),
+    ],
+)
+def test_listing_query_uses_index(cursor, filters, after, index):
+    """
+    Test that each GET /products access path is served by its listing index
+    instead of a sequential scan of the products table.
+    """
+    nodes = list(plan_nodes(explain(cursor, filters, after)))
+
+    assert not any(node["Node Type"] == "Seq Scan" for node in nodes)
+    assert index in {node.get("Index Name") for node in nodes}
+
+
+@pytest.mark.parametrize(
+    "sql_query, keys, indexes",
+    [
+        (
+            SELECT_PRODUCTS_BY_IDS,
+            ["00000000000000000000000042", "00000000000000000000000043"],
+            {"products_pkey"},
+        ),
+        (
+            SELECT_PRODUCTS_BY_NAMES,
+            ["product 42", "product 43"],
+            {"products_name_key", "products_name_idx"},
+        ),
+        (
+            DELETE_PRODUCTS_BY_IDS,
+            ["00000000000000000000000042", "00000000000000000000000043"],
+            {"products_pkey"},
+        ),
+    ],
+    ids=["select_by_ids", "select_by_names", "delete_by_ids"],
+)
+def test_batch_query_uses_index(cursor, sql_query, keys, indexes):
+    """
+    Test that batch queries bind their keys as an array of the column type, so
+    the primary key and name indexes serve them instead of a sequential scan.
+    """
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql_query}", (keys,))
+    nodes = list(plan_nodes(cursor.fetchone()[0][0]["Plan"]))
+
+    assert not any(node["Node Type"] == "Seq Scan" for node in nodes)
+    assert indexes & {node.get("Index Name") for node in nodes}
@@ -1,9 +1,19 @@
+import json
 from unittest.mock import MagicMock
 
 from fastapi.testclient import TestClient
+from psycopg2 import IntegrityError
 from pytest import fixture
 
+from configs.db_pool import PoolTimeoutError
 from main import app
+from models.batch import BatchGetResult, BatchItemResult
+from models.product_change import ProductChange, ProductChangesPage
+from models.product_filter import ProductFilter
+from models.product_patch import VersionMismatchError
+from models.serializers import dump_json
+from models.stock import InsufficientStockError, StockAdjustmentResult
+from routes.etags import http_date
 from routes.product_router import get_product_service
 
 
@@ -11,11 +21,14 @@ from routes.product_router import get_product_service
 def fixture_service():
     """
     Creates a mock service object to simulate the product service layer.
+    Products are encoded for real so responses carry the product JSON.
 
     Returns:
         MagicMock: A mock service object.
     """
-    return MagicMock()
+    service = MagicMock()
+    service.encode_product.side_effect = dump_json
+    return service
 
 
 @fixture(name="client")
@@ -58,14 +71,14 @@ def test_router_get_all_products(service, client, product, product_json):
     Verifies:
     - Response status code is 200.
     - Response JSON matches the mocked product list.
-    - Service method `get_all_products` is called once.
+    - Service method `get_all_product_dicts` is called once.
     """
-    service.get_all_products.return_value = [product]
+    service.get_all_product_dicts.return_value = [product.model_dump()]
     response = client.get("/products")
 
     assert response.status_code == 200
     assert response.json() == [product_json]
-    service.get_all_products.assert_called_once()
+    service.get_all_product_dicts.assert_called_once()
 
 
 def test_router_get_product_by_id(service, client, product, product_json):
@@ -209,3 +222,492 @@ def test_router_delete_product_by_id_value_error(service, client):
 
     assert response.status_code == 404
     service.delete_product_by_id.assert_called_once_with("01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+
+def test_router_pool_timeout_returns_service_unavailable(service, client):
+    """
+    Tests that an exhausted database connection pool is reported to the client.
+
+    Verifies:
+    - Response status code is 503 when the service raises `PoolTimeoutError`.
+    """
+    service.get_all_product_dicts.side_effect = PoolTimeoutError()
+    response = client.get("/products")
+
+    assert response.status_code == 503
+
+
+def test_router_get_all_products_next_cursor(service, client, product):
+    """
+    Tests that GET /products returns a next-page cursor when the page is full.
+
+    Verifies:
+    - `X-Next-Cursor` and `Link` headers point after the last returned id.
+    - Service method `get_all_product_dicts` receives the `limit` and `after` params.
+    """
+    service.get_all_product_dicts.return_value = [product.model_dump()]
+    response = client.get("/products?limit=1&after=01JFTE35ZRRZWCSKK6TBB1DZCS")
+
+    assert response.status_code == 200
+    assert response.headers["X-Next-Cursor"] == product.id
+    assert f"after={product.id}" in response.headers["Link"]
+    service.get_all_product_dicts.assert_called_once_with(
+        limit=1, after="01JFTE35ZRRZWCSKK6TBB1DZCS", filters=ProductFilter()
+    )
+
+
+def test_router_get_all_products_filtered_and_sorted(service, client, product):
+    """
+    Tests that GET /products passes filters and sort order to the service.
+
+    Verifies:
+    - A non-id sort decodes `after` into a (sort value, id) position.
+    - The next-page cursor and `Link` keep the filters and sort order.
+    """
+    service.get_all_product_dicts.return_value = [product.model_dump()]
+    response = client.get(
+        "/products?limit=1&sort=-price&min_price=10&in_stock=true"
+        "&after=30.0_01JFTE35ZRRZWCSKK6TBB1DZCS"
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Next-Cursor"] == f"20.0_{product.id}"
+    assert response.headers["Link"] == (
+        "</products?limit=1&min_price=10.0&in_stock=True&sort=-price"
+        f'&after=20.0_{product.id}>; rel="next"'
+    )
+    service.get_all_product_dicts.assert_called_once_with(
+        limit=1,
+        after=(30.0, "01JFTE35ZRRZWCSKK6TBB1DZCS"),
+        filters=ProductFilter(min_price=10, in_stock=True, sort="-price"),
+    )
+
+
+def test_router_get_all_products_invalid_cursor(service, client):
+    """
+    Tests that GET /products rejects a cursor that does not match the sort order.
+    """
+    response = client.get("/products?sort=created_at&after=01JFTE35ZRRZWCSKK6TBB1DZCS")
+
+    assert response.status_code == 400
+    service.get_all_product_dicts.assert_not_called()
+
+
+def test_router_get_all_products_last_page(service, client, product):
+    """
+    Tests that GET /products omits the next-page cursor on a partial page.
+    """
+    service.get_all_product_dicts.return_value = [product.model_dump()]
+    response = client.get("/products?limit=2")
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_router_get_all_products_invalid_limit(service, client):
+    """
+    Tests that GET /products rejects a page size above the maximum.
+    """
+    response = client.get("/products?limit=100000")
+
+    assert response.status_code == 422
+    service.get_all_products.assert_not_called()
+
+
+def test_router_stream_all_products_ndjson(service, client, product, product_json):
+    """
+    Tests the GET /products/stream endpoint in its default NDJSON format.
+
+    Verifies:
+    - Response is served as `application/x-ndjson`.
+    - Each line is one serialized product.
+    """
+    service.stream_all_product_dicts.return_value = iter(
+        [[product.model_dump()], [product.model_dump()]]
+    )
+    response = client.get("/products/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [json.loads(line) for line in lines] == [product_json, product_json]
+
+
+def test_router_stream_all_products_json(service, client, product, product_json):
+    """
+    Tests the GET /products/stream endpoint streaming a chunked JSON array.
+    """
+    service.stream_all_product_dicts.return_value = iter(
+        [[product.model_dump()], [product.model_dump()]]
+    )
+    response = client.get("/products/stream?format=json")
+
+    assert response.status_code == 200
+    assert response.json() == [product_json, product_json]
+
+
+def test_router_stream_all_products_empty(service, client):
+    """
+    Tests that streaming an empty catalog as JSON yields an empty array.
+    """
+    service.stream_all_product_dicts.return_value = iter([])
+    response = client.get("/products/stream?format=json")
+
+    assert response.json() == []
+
+
+def test_router_create_products(service, client, product, product_json):
+    """
+    Tests the POST /products:batch endpoint for creating products in bulk.
+
+    Verifies:
+    - Response status code is 200.
+    - Response JSON lists the per-item results from the service.
+    """
+    service.create_products.return_value = [
+        BatchItemResult(id=product.id, status="created")
+    ]
+    response = client.post("/products:batch", json=[product_json])
+
+    assert response.status_code == 200
+    assert response.json() == {"results": [{"id": product.id, "status": "created"}]}
+    service.create_products.assert_called_once_with([product])
+
+
+def test_router_create_products_batch_too_large(service, client, product_json):
+    """
+    Tests that POST /products:batch rejects batches above the maximum size.
+    """
+    response = client.post("/products:batch", json=[product_json] * 1001)
+
+    assert response.status_code == 422
+    service.create_products.assert_not_called()
+
+
+def test_router_update_products(service, client, product, product_json):
+    """
+    Tests the PATCH /products:batch endpoint for updating products in bulk.
+    """
+    service.update_products.return_value = [
+        BatchItemResult(id=product.id, status="not_found")
+    ]
+    response = client.patch("/products:batch", json=[product_json])
+
+    assert response.status_code == 200
+    assert response.json() == {"results": [{"id": product.id, "status": "not_found"}]}
+
+
+def test_router_update_products_integrity_error(service, client, product_json):
+    """
+    Tests that PATCH /products:batch maps an `IntegrityError` to 409.
+    """
+    service.update_products.side_effect = IntegrityError()
+    response = client.patch("/products:batch", json=[product_json])
+
+    assert response.status_code == 409
+
+
+def test_router_delete_products(service, client):
+    """
+    Tests the DELETE /products:batch endpoint for deleting products in bulk.
+    """
+    service.delete_products_by_ids.return_value = [
+        BatchItemResult(id="01JFTE35ZRRZWCSKK6TBB1DZCT", status="deleted")
+    ]
+    response = client.request(
+        "DELETE", "/products:batch", json={"ids": ["01JFTE35ZRRZWCSKK6TBB1DZCT"]}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["results"][0]["status"] == "deleted"
+    service.delete_products_by_ids.assert_called_once_with(
+        ["01JFTE35ZRRZWCSKK6TBB1DZCT"]
+    )
+
+
+def test_router_get_products_batch_by_ids(service, client, product, product_json):
+    """
+    Tests the POST /products:batchGet endpoint when fetching by ids.
+
+    Verifies:
+    - Response JSON lists found products and missing ids.
+    - Service method `get_products_by_ids` is called with the requested ids.
+    """
+    service.get_products_by_ids.return_value = BatchGetResult(
+        products=[product], missing=["01JFTE35"]
+    )
+    response = client.post("/products:batchGet", json={"ids": [product.id, "01JFTE35"]})
+
+    assert response.status_code == 200
+    assert response.json() == {"products": [product_json], "missing": ["01JFTE35"]}
+    service.get_products_by_ids.assert_called_once_with([product.id, "01JFTE35"])
+
+
+def test_router_get_products_batch_by_names(service, client, product):
+    """
+    Tests the POST /products:batchGet endpoint when fetching by names.
+    """
+    service.get_products_by_names.return_value = BatchGetResult(
+        products=[product], missing=[]
+    )
+    response = client.post("/products:batchGet", json={"names": ["house"]})
+
+    assert response.status_code == 200
+    service.get_products_by_names.assert_called_once_with(["house"])
+    service.get_products_by_ids.assert_not_called()
+
+
+def test_router_get_products_batch_requires_one_key(service, client):
+    """
+    Tests that POST /products:batchGet rejects bodies with both or neither key.
+    """
+    assert client.post("/products:batchGet", json={}).status_code == 422
+    assert (
+        client.post(
+            "/products:batchGet", json={"ids": ["01JFTE35"], "names": ["house"]}
+        ).status_code
+        == 422
+    )
+
+
+def test_router_get_product_changes(service, client, product, product_json):
+    """
+    Tests the GET /products/changes feed.
+
+    Verifies:
+    - The `since` token is decoded into a feed position for the service.
+    - The page lists changes and the token to resume from.
+    """
+    service.get_product_changes.return_value = ProductChangesPage(
+        changes=[
+            ProductChange(
+                token="750-10", id=product.id, operation="update", product=product
+            )
+        ],
+        next_token="750-10",
+    )
+    response = client.get("/products/changes?since=749-3&limit=10")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "changes": [
+            {
+                "token": "750-10",
+                "id": product.id,
+                "operation": "update",
+                "product": product_json,
+            }
+        ],
+        "next_token": "750-10",
+    }
+    service.get_product_changes.assert_called_once_with((749, 3), 10)
+
+
+def test_router_get_product_changes_invalid_token(service, client):
+    """
+    Tests that GET /products/changes rejects a malformed `since` token.
+    """
+    response = client.get("/products/changes?since=yesterday")
+
+    assert response.status_code == 400
+    service.get_product_changes.assert_not_called()
+
+
+def test_router_search_products(service, client, product, product_json):
+    """
+    Tests the GET /products/search endpoint.
+
+    Verifies:
+    - The `after` cursor is decoded into a (score, id) position for the service.
+    - A full page links to the next one, resuming after its last match.
+    """
+    service.search_products.return_value = [(product, 0.5)]
+    response = client.get(
+        "/products/search?q=wooden house&limit=1&after=0.75_01JFTE35ZRRZWCSKK6TBB1DZCS"
+    )
+
+    assert response.status_code == 200
+    assert response.json() == [product_json]
+    assert response.headers["X-Next-Cursor"] == f"0.5_{product.id}"
+    assert response.headers["Link"] == (
+        f"</products/search?q=wooden%20house&limit=1&after=0.5_{product.id}>;"
+        ' rel="next"'
+    )
+    service.search_products.assert_called_once_with(
+        "wooden house", 1, (0.75, "01JFTE35ZRRZWCSKK6TBB1DZCS")
+    )
+
+
+def test_router_search_products_invalid_request(service, client):
+    """
+    Tests that GET /products/search rejects a missing query or a malformed cursor.
+    """
+    assert client.get("/products/search").status_code == 422
+    assert client.get("/products/search?q=house&after=house").status_code == 400
+    service.search_products.assert_not_called()
+
+
+def test_router_adjust_product_stock(service, client, product, product_json):
+    """
+    Tests the POST /products/{id}/stock:adjust endpoint.
+
+    Verifies:
+    - The adjusted product is returned.
+    - A rejected adjustment maps to 409 and an unknown product to 404.
+    """
+    service.adjust_product_stock.return_value = product
+    response = client.post(f"/products/{product.id}/stock:adjust", json={"delta": -3})
+
+    assert response.status_code == 200
+    assert response.json() == product_json
+    service.adjust_product_stock.assert_called_once_with(product.id, -3)
+
+    service.adjust_product_stock.side_effect = InsufficientStockError(product.id, 2)
+    response = client.post(f"/products/{product.id}/stock:adjust", json={"delta": -3})
+    assert response.status_code == 409
+
+    service.adjust_product_stock.side_effect = ValueError()
+    response = client.post(f"/products/{product.id}/stock:adjust", json={"delta": -3})
+    assert response.status_code == 404
+
+
+def test_router_adjust_products_stock(service, client, product):
+    """
+    Tests that POST /products:batchAdjustStock reports each line's outcome.
+    """
+    service.adjust_products_stock.return_value = [
+        StockAdjustmentResult(id=product.id, status="adjusted", quantity=97),
+        StockAdjustmentResult(id="01JFTE35", status="not_found", quantity=None),
+    ]
+    response = client.post(
+        "/products:batchAdjustStock",
+        json={
+            "lines": [{"id": product.id, "delta": -3}, {"id": "01JFTE35", "delta": -1}]
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [
+            {"id": product.id, "status": "adjusted", "quantity": 97},
+            {"id": "01JFTE35", "status": "not_found", "quantity": None},
+        ]
+    }
+    lines = service.adjust_products_stock.call_args.args[0]
+    assert [(line.id, line.delta) for line in lines] == [
+        (product.id, -3),
+        ("01JFTE35", -1),
+    ]
+
+
+def test_router_patch_product(service, client, product, product_json):
+    """
+    Tests the PATCH /products/{id} endpoint.
+
+    Verifies:
+    - Only the supplied fields reach the service, with the If-Match versions.
+    - The patched product is returned with its ETag.
+    - A stale version maps to 412 and an unknown product to 404.
+    """
+    service.patch_product.return_value = product
+    etag = f'"{product.created_at.isoformat()}"'
+    response = client.patch(
+        f"/products/{product.id}", json={"price": 25.0}, headers={"If-Match": etag}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == product_json
+    assert response.headers["ETag"] == etag
+    id, patch, versions = service.patch_product.call_args.args
+    assert id == product.id
+    assert patch.model_dump(exclude_unset=True) == {"price": 25.0}
+    assert versions == [product.created_at]
+
+    client.patch(f"/products/{product.id}", json={"price": 25.0})
+    assert service.patch_product.call_args.args[2] is None
+
+    service.patch_product.side_effect = VersionMismatchError(product.id)
+    response = client.patch(
+        f"/products/{product.id}", json={"price": 25.0}, headers={"If-Match": etag}
+    )
+    assert response.status_code == 412
+
+    service.patch_product.side_effect = ValueError()
+    response = client.patch(f"/products/{product.id}", json={"price": 25.0})
+    assert response.status_code == 404
+
+
+def test_router_patch_product_invalid_body(service, client, product):
+    """
+    Tests that PATCH /products/{id} rejects empty bodies, explicit nulls and
+    fields that cannot be patched.
+    """
+    for body in ({}, {"name": None}, {"id": "01JFTE35"}, {"price": 0}):
+        response = client.patch(f"/products/{product.id}", json=body)
+        assert response.status_code == 422
+    service.patch_product.assert_not_called()
+
+
+def test_router_get_product_not_modified(service, client, product, product_json):
+    """
+    Tests the conditional GET /products/{id} and /products/name/{name}.
+
+    Verifies:
+    - Full responses carry the product ETag and Last-Modified.
+    - A matching If-None-Match or If-Modified-Since is answered with 304 from
+      the product version alone, without loading the product.
+    - A stale validator gets the full product.
+    """
+    etag = f'"{product.created_at.isoformat()}"'
+    service.get_product_by_id.return_value = product
+    response = client.get(f"/products/{product.id}")
+
+    assert response.headers["ETag"] == etag
+    assert response.headers["Last-Modified"] == http_date(product.created_at)
+    service.get_product_by_id.reset_mock()
+
+    service.get_product_version_by_id.return_value = product.created_at
+    for headers in (
+        {"If-None-Match": etag},
+        {"If-None-Match": f'"other", W/{etag}'},
+        {"If-Modified-Since": http_date(product.created_at)},
+    ):
+        response = client.get(f"/products/{product.id}", headers=headers)
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+    service.get_product_by_id.assert_not_called()
+
+    service.get_product_version_by_name.return_value = product.created_at
+    response = client.get(
+        f"/products/name/{product.name}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    service.get_product_by_name.assert_not_called()
+
+    response = client.get(f"/products/{product.id}", headers={"If-None-Match": '"old"'})
+    assert response.status_code == 200
+    assert response.json() == product_json
+
+    service.get_product_version_by_id.side_effect = ValueError()
+    response = client.get(f"/products/{product.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 404
+
+
+def test_router_get_all_products_not_modified(service, client, product):
+    """
+    Tests that GET /products returns a body hash ETag and answers a matching
+    If-None-Match with 304 and no body.
+    """
+    service.get_all_product_dicts.return_value = [product.model_dump()]
+    etag = client.get("/products").headers["ETag"]
+
+    response = client.get("/products", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    service.get_all_product_dicts.return_value = []
+    response = client.get("/products", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
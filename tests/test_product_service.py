@@ -1,9 +1,15 @@
+from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
 from psycopg2 import DatabaseError
 from pytest import fixture
 
+from caches.product_cache import MISSING, ProductCache
+from configs.replica_pool import CONSISTENCY_SESSION, ConsistencySession
+from models.product_change import ProductChange
+from models.product_patch import ProductPatch, VersionMismatchError
+from models.stock import InsufficientStockError
 from services.product_service import ProductService
 
 
@@ -180,3 +186,377 @@ def test_delete_product_by_id_handles_value_error(storage, service):
         service.delete_product_by_id("01JFTE35")
 
     storage.delete_product_by_id.assert_called_once_with("01JFTE35")
+
+
+def test_retrieve_products_page_successfully(product, storage, service):
+    """
+    Tests that the `get_all_products` method forwards the keyset pagination
+    parameters to the storage.
+    """
+    storage.get_all_products.return_value = [product]
+
+    result = service.get_all_products(limit=1, after="01JFTE35ZRRZWCSKK6TBB1DZCS")
+    assert result == [product]
+    storage.get_all_products.assert_called_once_with(
+        limit=1, after="01JFTE35ZRRZWCSKK6TBB1DZCS", filters=None
+    )
+
+
+def test_stream_all_products_successfully(product, storage, service):
+    """
+    Tests that the `stream_all_products` method returns the storage iterator.
+    """
+    storage.stream_all_products.return_value = iter([product])
+
+    result = list(service.stream_all_products())
+    assert result == [product]
+    storage.stream_all_products.assert_called_once_with(after=None)
+
+
+@fixture(name="cached_service")
+def fixture_cached_service(storage):
+    """
+    Creates an instance of ProductService with a mock storage and a real cache.
+
+    Args:
+        storage (MagicMock): A mock storage object.
+
+    Returns:
+        ProductService: A service instance reading through a ProductCache.
+    """
+    return ProductService(storage, cache=ProductCache(max_size=100))
+
+
+def test_get_product_by_id_reads_through_cache(product, storage, cached_service):
+    """
+    Tests that repeated `get_product_by_id` calls hit the storage only once.
+    """
+    storage.get_product_by_id.return_value = product
+
+    assert cached_service.get_product_by_id(product.id) == product
+    assert cached_service.get_product_by_id(product.id) == product
+    assert cached_service.get_product_by_name(product.name) == product
+
+    storage.get_product_by_id.assert_called_once_with(product.id)
+    storage.get_product_by_name.assert_not_called()
+
+
+def test_get_product_by_name_caches_not_found(storage, cached_service):
+    """
+    Tests that a `ValueError` from the storage is cached so the next lookup
+    for the same name is answered without querying the storage.
+    """
+    storage.get_product_by_name.side_effect = ValueError()
+
+    with pytest.raises(ValueError):
+        cached_service.get_product_by_name("house")
+    with pytest.raises(ValueError):
+        cached_service.get_product_by_name("house")
+
+    storage.get_product_by_name.assert_called_once_with("house")
+
+
+def test_create_product_refreshes_cache(product, storage, cached_service):
+    """
+    Tests that a created product replaces a cached not-found entry.
+    """
+    storage.get_product_by_id.side_effect = ValueError()
+    with pytest.raises(ValueError):
+        cached_service.get_product_by_id(product.id)
+
+    storage.create_product.return_value = product
+    cached_service.create_product(product)
+
+    assert cached_service.get_product_by_id(product.id) == product
+    storage.get_product_by_id.assert_called_once()
+
+
+def test_update_product_refreshes_cache(product, storage, cached_service):
+    """
+    Tests that `update_product` stores the updated row in the cache.
+    """
+    storage.get_product_by_id.return_value = product
+    cached_service.get_product_by_id(product.id)
+
+    updated = product.model_copy(update={"price": 30.0})
+    storage.update_product.return_value = updated
+    cached_service.update_product(product)
+
+    assert cached_service.get_product_by_id(product.id).price == 30.0
+    storage.get_product_by_id.assert_called_once()
+
+
+def test_delete_product_invalidates_cache(product, storage, cached_service):
+    """
+    Tests that `delete_product_by_id` drops the cached product.
+    """
+    storage.get_product_by_id.return_value = product
+    cached_service.get_product_by_id(product.id)
+
+    cached_service.delete_product_by_id(product.id)
+    cached_service.get_product_by_id(product.id)
+
+    assert storage.get_product_by_id.call_count == 2
+
+
+def test_delete_during_load_is_not_undone(product, storage, cached_service):
+    """
+    Tests that a product deleted while its lookup was loading is not put back
+    in the cache by that lookup, and that an update during a load keeps the
+    updated version.
+    """
+
+    def load_during_delete(id):
+        cached_service.delete_product_by_id(id)
+        return product
+
+    storage.get_product_by_id.side_effect = load_during_delete
+    assert cached_service.get_product_by_id(product.id) == product
+    assert cached_service.cache.get("id", product.id) is MISSING
+    assert cached_service.cache.get("name", product.name) is MISSING
+
+    updated = product.model_copy(update={"quantity": 1})
+    storage.update_product.return_value = updated
+
+    def load_during_update(id):
+        cached_service.update_product(updated.model_copy())
+        return product
+
+    storage.get_product_by_id.side_effect = load_during_update
+    cached_service.get_product_by_id(product.id)
+    assert cached_service.cache.get("id", product.id) == updated
+
+
+def test_create_products_reports_conflicts(product, storage, service):
+    """
+    Tests that `create_products` reports ids skipped by the storage,
+    including repeated ids within the batch, as conflicts.
+    """
+    other = product.model_copy(update={"id": "01JFTE35ZRRZWCSKK6TBB1DZCV"})
+    storage.create_products.return_value = [product.id]
+
+    result = service.create_products([product, other, product])
+
+    assert [item.status for item in result] == ["created", "conflict", "conflict"]
+    storage.create_products.assert_called_once_with([product, other, product])
+
+
+def test_update_products_reports_not_found(product, storage, service):
+    """
+    Tests that `update_products` stamps `updated_at` on every product and
+    reports products missing from the storage result as not found.
+    """
+    other = product.model_copy(update={"id": "01JFTE35ZRRZWCSKK6TBB1DZCV"})
+    storage.update_products.return_value = [product]
+
+    result = service.update_products([product, other])
+
+    assert [item.status for item in result] == ["updated", "not_found"]
+    assert product.updated_at is not None
+    assert other.updated_at == product.updated_at
+
+
+def test_update_products_last_duplicate_wins(product, storage, service):
+    """
+    Tests that only the last occurrence of a repeated id is sent to the storage
+    and the earlier occurrences are reported as conflicts.
+    """
+    latest = product.model_copy(update={"price": 30.0})
+    storage.update_products.return_value = [latest]
+
+    result = service.update_products([product, latest])
+
+    assert [item.status for item in result] == ["conflict", "updated"]
+    storage.update_products.assert_called_once_with([latest])
+
+
+def test_delete_products_by_ids_invalidates_cache(product, storage, cached_service):
+    """
+    Tests that `delete_products_by_ids` reports per-id results
+    and drops the deleted products from the cache.
+    """
+    storage.get_product_by_id.return_value = product
+    cached_service.get_product_by_id(product.id)
+    storage.delete_products_by_ids.return_value = [product.id]
+
+    result = cached_service.delete_products_by_ids([product.id, "01JFTE35"])
+    cached_service.get_product_by_id(product.id)
+
+    assert [item.status for item in result] == ["deleted", "not_found"]
+    assert storage.get_product_by_id.call_count == 2
+
+
+def test_get_products_by_ids_keeps_request_order(product, storage, service):
+    """
+    Tests that `get_products_by_ids` returns products in the requested order,
+    drops repeated ids and reports the ids that were not found.
+    """
+    other = product.model_copy(update={"id": "01JFTE35ZRRZWCSKK6TBB1DZCV"})
+    storage.get_products_by_ids.return_value = [product, other]
+
+    result = service.get_products_by_ids([other.id, "01JFTE35", product.id, other.id])
+
+    assert result.products == [other, product]
+    assert result.missing == ["01JFTE35"]
+    storage.get_products_by_ids.assert_called_once_with(
+        [other.id, "01JFTE35", product.id]
+    )
+
+
+def test_get_products_by_names_uses_cache(product, storage, cached_service):
+    """
+    Tests that `get_products_by_names` only queries the names the cache
+    cannot answer, and remembers names that were not found.
+    """
+    storage.get_product_by_name.return_value = product
+    cached_service.get_product_by_name(product.name)
+    storage.get_products_by_names.return_value = []
+
+    first = cached_service.get_products_by_names([product.name, "bed"])
+    second = cached_service.get_products_by_names([product.name, "bed"])
+
+    assert first.products == second.products == [product]
+    assert first.missing == second.missing == ["bed"]
+    storage.get_products_by_names.assert_called_once_with(["bed"])
+
+
+def test_encode_product_uses_cached_bytes(product, cached_service):
+    """
+    Test that `encode_product` serializes through the cache when one is set,
+    so repeated reads of the same cached product reuse the same bytes.
+    """
+    cached_service.cache.put(product)
+
+    encoded = cached_service.encode_product(product)
+
+    assert encoded == product.model_dump_json().encode()
+    assert cached_service.encode_product(product) is encoded
+
+
+def test_encode_product_without_cache(product, service):
+    """
+    Test that `encode_product` serializes the product when caching is disabled.
+    """
+    assert service.encode_product(product) == product.model_dump_json().encode()
+
+
+def test_get_product_changes_next_token(product, storage, service):
+    """
+    Test that the changes page resumes after its last change, and that an empty
+    page hands back the position it was asked for.
+    """
+    storage.get_product_changes.return_value = [
+        ProductChange(
+            token="750-10", id=product.id, operation="insert", product=product
+        )
+    ]
+
+    page = service.get_product_changes((749, 3), limit=10)
+    assert page.next_token == "750-10"
+    storage.get_product_changes.assert_called_once_with((749, 3), 10)
+
+    storage.get_product_changes.return_value = []
+    assert service.get_product_changes((749, 3), limit=10).next_token == "749-3"
+
+
+def test_search_products(product, storage, service):
+    """
+    Test that `search_products` passes the query and keyset position to storage.
+    """
+    storage.search_products.return_value = [(product, 0.75)]
+
+    result = service.search_products("house", 10, (0.9, product.id))
+
+    assert result == [(product, 0.75)]
+    storage.search_products.assert_called_once_with("house", 10, (0.9, product.id))
+
+
+def test_adjust_product_stock_refreshes_cache(product, storage, cached_service):
+    """
+    Tests that `adjust_product_stock` stores the adjusted row in the cache and
+    drops the cached product when the adjustment is rejected.
+    """
+    storage.get_product_by_id.return_value = product
+    cached_service.get_product_by_id(product.id)
+
+    adjusted = product.model_copy(update={"quantity": 97})
+    storage.adjust_product_stock.return_value = adjusted
+    cached_service.adjust_product_stock(product.id, -3)
+    assert cached_service.get_product_by_id(product.id).quantity == 97
+    assert isinstance(storage.adjust_product_stock.call_args.args[2], datetime)
+
+    storage.adjust_product_stock.side_effect = InsufficientStockError(product.id, 0)
+    with pytest.raises(InsufficientStockError):
+        cached_service.adjust_product_stock(product.id, -100)
+
+    cached_service.get_product_by_id(product.id)
+    assert storage.get_product_by_id.call_count == 2
+
+
+def test_patch_product_refreshes_cache(product, storage, cached_service):
+    """
+    Tests that `patch_product` only forwards the supplied fields with a new
+    `updated_at`, caches the patched row and drops the cached product when the
+    version check fails.
+    """
+    storage.get_product_by_id.return_value = product
+    cached_service.get_product_by_id(product.id)
+
+    patched = product.model_copy(update={"quantity": 3})
+    storage.patch_product.return_value = patched
+    versions = [product.created_at]
+    cached_service.patch_product(product.id, ProductPatch(quantity=3), versions)
+
+    id, changes, passed_versions = storage.patch_product.call_args.args
+    assert id == product.id
+    assert changes.keys() == {"quantity", "updated_at"}
+    assert changes["quantity"] == 3
+    assert passed_versions == versions
+    assert cached_service.get_product_by_id(product.id).quantity == 3
+
+    storage.patch_product.side_effect = VersionMismatchError(product.id)
+    with pytest.raises(VersionMismatchError):
+        cached_service.patch_product(product.id, ProductPatch(quantity=1), versions)
+
+    cached_service.get_product_by_id(product.id)
+    assert storage.get_product_by_id.call_count == 2
+
+
+def test_get_product_version_from_cache(product, storage, cached_service):
+    """
+    Tests that `get_product_version_by_id` answers from a cached product and
+    only queries the version when the product is not cached.
+    """
+    storage.get_product_version_by_id.return_value = product.created_at
+    assert cached_service.get_product_version_by_id(product.id) == product.created_at
+    storage.get_product_version_by_id.assert_called_once_with(product.id)
+
+    storage.get_product_by_id.return_value = product
+    cached_service.get_product_by_id(product.id)
+    assert cached_service.get_product_version_by_id(product.id) == product.created_at
+    storage.get_product_version_by_id.assert_called_once()
+
+
+def test_consistency_token_bypasses_cache(product, storage, cached_service):
+    """
+    Tests that a read carrying a consistency token is never served a cached
+    row, which may predate the write the token stands for.
+    """
+    updated_at = datetime(2025, 1, 2, 3, 4, 5)
+    updated = product.model_copy(update={"quantity": 1, "updated_at": updated_at})
+    cached_service.cache.put(product)
+    storage.get_product_by_id.return_value = updated
+    storage.get_product_version_by_id.return_value = updated_at
+    storage.get_products_by_ids.return_value = [updated]
+
+    token = CONSISTENCY_SESSION.set(ConsistencySession(required_lsn=100))
+    try:
+        assert cached_service.get_product_by_id(product.id) == updated
+        assert cached_service.get_product_version_by_id(product.id) == updated_at
+        result = cached_service.get_products_by_ids([product.id])
+        assert result.products == [updated]
+    finally:
+        CONSISTENCY_SESSION.reset(token)
+
+    assert cached_service.get_product_by_id(product.id) == updated
+    storage.get_product_by_id.assert_called_once()
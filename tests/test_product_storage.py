@@ -6,7 +6,17 @@ import pytest
 from psycopg2 import DatabaseError
 from pytest import fixture
 
-from storages.product_storage import ProductStorage
+from models.product import Product
+from models.product_filter import ProductFilter
+from models.product_patch import VersionMismatchError
+from models.stock import InsufficientStockError, StockAdjustmentLine
+from storages.prepared_statements import to_positional
+from storages.product_storage import (
+    SELECT_PRODUCTS_BY_IDS,
+    ProductStorage,
+    build_search_tsquery,
+    escape_like,
+)
 
 
 @fixture(name="cursor")
@@ -36,18 +46,34 @@ def fixture_db_conn(cursor):
     return db_conn
 
 
-@fixture(name="storage")
-def fixture_storage(db_conn):
+@fixture(name="db_pool")
+def fixture_db_pool(db_conn):
     """
-    Creates an instance of ProductStorage with a mock database connection.
+    Creates a mock connection pool that lends out the mock database connection.
 
     Args:
         db_conn (MagicMock): A mock database connection object.
 
     Returns:
-        ProductStorage: A storage instance using the mock database connection.
+        MagicMock: A mock connection pool object.
     """
-    return ProductStorage(db_conn)
+    db_pool = MagicMock()
+    db_pool.connection.return_value.__enter__.return_value = db_conn
+    return db_pool
+
+
+@fixture(name="storage")
+def fixture_storage(db_pool):
+    """
+    Creates an instance of ProductStorage with a mock connection pool.
+
+    Args:
+        db_pool (MagicMock): A mock connection pool object.
+
+    Returns:
+        ProductStorage: A storage instance using the mock connection pool.
+    """
+    return ProductStorage(db_pool)
 
 
 @fixture(name="product_row")
@@ -243,6 +269,42 @@ def test_delete_product_by_id(cursor, storage, db_conn):
     )
 
 
+def test_get_all_product_dicts(cursor, storage, product, product_row):
+    """
+    Test that `get_all_product_dicts` maps rows to plain dicts that serialize
+    exactly like the product model.
+    """
+    cursor.fetchall.return_value = [product_row]
+
+    result = storage.get_all_product_dicts(limit=10)
+    assert result == [product.model_dump()]
+    assert isinstance(result[0]["price"], float)
+
+
+def test_stream_all_product_dicts(cursor, storage, product, product_row):
+    """
+    Test that `stream_all_product_dicts` yields one list of dicts
+    per `fetchmany` batch.
+    """
+    cursor.fetchmany.side_effect = [[product_row, product_row], [product_row], []]
+
+    result = list(storage.stream_all_product_dicts(batch_size=2))
+    assert result == [[product.model_dump()] * 2, [product.model_dump()]]
+
+
+def test_map_product_row_to_model_skips_validation(storage, product, product_row):
+    """
+    Test that rows are mapped to a usable product without running validation,
+    converting the numeric price to the model's float.
+    """
+    result = storage.map_product_row_to_model(product_row)
+
+    assert result == product
+    assert result.model_dump_json() == product.model_dump_json()
+    assert result.model_fields_set == set(Product.model_fields)
+    assert result.model_copy(update={"name": "bed"}).name == "bed"
+
+
 def test_get_all_products_database_error(cursor, storage):
     """
     Test that `get_all_products` raises a `DatabaseError`
@@ -395,3 +457,433 @@ def test_delete_product_by_id_database_error(cursor, storage, db_conn):
     cursor.execute.assert_called_once()
 
     db_conn.rollback.assert_called_once()
+
+
+def test_storage_borrows_connection_per_operation(
+    cursor, storage, db_pool, product_row
+):
+    """
+    Test that each storage operation borrows its own connection from the pool
+    instead of sharing a single long-lived connection.
+    """
+    cursor.fetchone.return_value = product_row
+    cursor.rowcount = 1
+
+    storage.get_product_by_id("01JFTE35ZRRZWCSKK6TBB1DZCT")
+    storage.delete_product_by_id("01JFTE35ZRRZWCSKK6TBB1DZCT")
+
+    assert db_pool.connection.call_count == 2
+    assert db_pool.connection.return_value.__exit__.call_count == 2
+
+
+def test_get_all_products_keyset_page(cursor, storage, product, product_row):
+    """
+    Test that `get_all_products` with `limit` and `after` runs a keyset query
+    ordered by id, starting after the given cursor.
+    """
+    cursor.fetchall.return_value = [product_row]
+
+    result = storage.get_all_products(limit=10, after="01JFTE35ZRRZWCSKK6TBB1DZCS")
+    assert result == [product]
+
+    sql_query, params = cursor.execute.call_args.args
+    assert "id > %s" in sql_query
+    assert "ORDER BY id" in sql_query
+    assert "LIMIT %s" in sql_query
+    assert params == ["01JFTE35ZRRZWCSKK6TBB1DZCS", 10]
+
+
+def test_stream_all_products(cursor, db_conn, storage, product, product_row):
+    """
+    Test that `stream_all_products` reads through a server-side named cursor
+    in `fetchmany` batches and yields every mapped product.
+    """
+    cursor.fetchmany.side_effect = [[product_row, product_row], [product_row], []]
+
+    result = list(storage.stream_all_products(batch_size=2))
+    assert result == [product, product, product]
+
+    db_conn.cursor.assert_called_once_with(name="products_stream")
+    cursor.fetchmany.assert_called_with(2)
+    assert cursor.fetchmany.call_count == 3
+
+
+def test_create_products(cursor, db_conn, storage, product):
+    """
+    Test that `create_products` inserts the whole batch with a single
+    multi-row statement in one transaction and returns the inserted ids.
+    """
+    cursor.fetchall.return_value = [(product.id,)]
+
+    result = storage.create_products([product])
+    assert result == [product.id]
+
+    cursor.execute.assert_called_once()
+    sql_query, params = cursor.execute.call_args.args
+    assert "unnest" in sql_query
+    assert "ON CONFLICT DO NOTHING" in sql_query
+    assert params[0] == [product.id]
+    db_conn.commit.assert_called_once()
+
+
+def test_update_products(cursor, db_conn, storage, product, updated_product_row):
+    """
+    Test that `update_products` updates the batch with a single statement
+    and maps the returned rows to product models.
+    """
+    product.updated_at = datetime(2025, 12, 23, 15, 57, 25, 496623)
+    cursor.fetchall.return_value = [updated_product_row]
+
+    result = storage.update_products([product])
+    assert result == [product]
+
+    cursor.execute.assert_called_once()
+    db_conn.commit.assert_called_once()
+
+
+def test_delete_products_by_ids(cursor, db_conn, storage):
+    """
+    Test that `delete_products_by_ids` deletes the batch with
+    `id = ANY(%s::char(26)[])` and returns the deleted ids.
+    """
+    cursor.fetchall.return_value = [("01JFTE35ZRRZWCSKK6TBB1DZCT",)]
+
+    result = storage.delete_products_by_ids(["01JFTE35ZRRZWCSKK6TBB1DZCT", "01JFTE35"])
+    assert result == ["01JFTE35ZRRZWCSKK6TBB1DZCT"]
+
+    sql_query, params = cursor.execute.call_args.args
+    assert "id = ANY(%s::char(26)[])" in sql_query
+    assert params == (["01JFTE35ZRRZWCSKK6TBB1DZCT", "01JFTE35"],)
+    db_conn.commit.assert_called_once()
+
+
+def test_update_products_database_error(cursor, db_conn, storage, product):
+    """
+    Test that `update_products` rolls back the whole batch on a `DatabaseError`.
+    """
+    cursor.execute.side_effect = DatabaseError()
+
+    with pytest.raises(DatabaseError):
+        storage.update_products([product])
+
+    db_conn.rollback.assert_called_once()
+    db_conn.commit.assert_not_called()
+
+
+def test_get_products_by_ids(cursor, storage, product, product_row):
+    """
+    Test that `get_products_by_ids` fetches every requested id with a single
+    `id = ANY(%s::char(26)[])` query.
+    """
+    cursor.fetchall.return_value = [product_row]
+
+    result = storage.get_products_by_ids(["01JFTE35ZRRZWCSKK6TBB1DZCT", "01JFTE35"])
+    assert result == [product]
+
+    cursor.execute.assert_called_once()
+    sql_query, params = cursor.execute.call_args.args
+    assert "id = ANY(%s::char(26)[])" in sql_query
+    assert params == (["01JFTE35ZRRZWCSKK6TBB1DZCT", "01JFTE35"],)
+
+
+def test_get_products_by_names(cursor, storage, product, product_row):
+    """
+    Test that `get_products_by_names` fetches every requested name with a single
+    `name = ANY(%s::varchar[])` query.
+    """
+    cursor.fetchall.return_value = [product_row]
+
+    result = storage.get_products_by_names(["house"])
+    assert result == [product]
+
+    sql_query, params = cursor.execute.call_args.args
+    assert "name = ANY(%s::varchar[])" in sql_query
+    assert params == (["house"],)
+
+
+def test_get_product_changes(cursor, storage, product, product_row):
+    """
+    Test that `get_product_changes` pages after the given position and maps
+    changes to the current product state, or a tombstone for deletes.
+    """
+    cursor.fetchall.return_value = [
+        ("750", 10, product.id, "update", *product_row),
+        ("751", 11, "01JFTE35ZRRZWCSKK6TBB1DZCS", "delete", *([None] * 8)),
+    ]
+
+    result = storage.get_product_changes((749, 3), limit=2)
+
+    assert [change.token for change in result] == ["750-10", "751-11"]
+    assert result[0].operation == "update"
+    assert result[0].product == product
+    assert result[1].operation == "delete"
+    assert result[1].product is None
+
+    sql_query, params = cursor.execute.call_args.args
+    assert "pg_snapshot_xmin(pg_current_snapshot())" in sql_query
+    assert params == ("749", 3, 2)
+
+
+def test_search_products(cursor, storage, product, product_row):
+    """
+    Test that `search_products` ranks matches with the prefix tsquery built
+    from the search text and resumes after the given (score, id) position.
+    """
+    cursor.fetchall.return_value = [(*product_row, 0.75)]
+
+    result = storage.search_products(
+        "wooden hou", limit=10, after=(0.9, "01JFTE35ZRRZWCSKK6TBB1DZCS")
+    )
+    assert result == [(product, 0.75)]
+
+    sql_query, params = cursor.execute.call_args.args
+    assert "ORDER BY score DESC, id" in sql_query
+    assert params == [
+        "wooden & hou:*",
+        "wooden hou",
+        "wooden & hou:*",
+        "wooden hou",
+        "wooden hou%",
+        0.9,
+        0.9,
+        "01JFTE35ZRRZWCSKK6TBB1DZCS",
+        10,
+    ]
+
+
+def test_build_search_tsquery():
+    """
+    Test that `build_search_tsquery` keeps only words, matches the last one as a
+    prefix, and that `escape_like` escapes LIKE wildcards.
+    """
+    assert build_search_tsquery("cat's  bed & ho") == "cat & s & bed & ho:*"
+    assert build_search_tsquery("!? &") is None
+    assert escape_like("50%_off") == "50\\%\\_off"
+
+
+def test_get_all_products_filtered_and_sorted(cursor, storage, product, product_row):
+    """
+    Test that `get_all_products` applies the listing filters and pages a
+    descending sort by its (sort key, id) keyset.
+    """
+    cursor.fetchall.return_value = [product_row]
+    filters = ProductFilter(
+        min_price=10,
+        max_price=50,
+        in_stock=True,
+        updated_after=datetime(2024, 12, 1),
+        sort="-price",
+    )
+
+    result = storage.get_all_products(
+        limit=10, after=(30.0, "01JFTE35ZRRZWCSKK6TBB1DZCS"), filters=filters
+    )
+    assert result == [product]
+
+    sql_query, params = cursor.execute.call_args.args
+    assert "price >= %s::numeric AND price <= %s::numeric" in sql_query
+    assert "quantity > 0" in sql_query
+    assert "coalesce(updated_at, created_at) >= %s" in sql_query
+    assert "(price, id) < (%s::numeric, %s)" in sql_query
+    assert "ORDER BY price DESC, id DESC" in sql_query
+    assert params == [
+        10,
+        50,
+        datetime(2024, 12, 1),
+        30.0,
+        "01JFTE35ZRRZWCSKK6TBB1DZCS",
+        10,
+    ]
+
+
+def test_get_product_by_id_prepared(cursor, db_pool, product, product_row):
+    """
+    Test that with `prepare_statements` the lookup is prepared once per
+    connection and later calls only EXECUTE the prepared statement.
+    """
+    storage = ProductStorage(db_pool, prepare_statements=True)
+    cursor.fetchone.return_value = product_row
+
+    assert storage.get_product_by_id(product.id) == product
+    assert storage.get_product_by_id(product.id) == product
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert len(statements) == 3
+    assert statements[0].startswith("PREPARE get_product_by_id_")
+    assert "WHERE id = $1" in statements[0]
+    name = statements[0].split()[1]
+    assert statements[1:] == [f"EXECUTE {name} (%s)"] * 2
+    assert cursor.execute.call_args.args[1] == (product.id,)
+
+
+def test_to_positional():
+    """
+    Test that `to_positional` numbers `%s` placeholders and unescapes `%%`.
+    """
+    assert (
+        to_positional("name %% %s AND (price, id) > (%s::numeric, %s)")
+        == "name % $1 AND (price, id) > ($2::numeric, $3)"
+    )
+
+
+def test_adjust_product_stock(cursor, db_conn, storage, product, product_row):
+    """
+    Test that `adjust_product_stock` runs a single conditional UPDATE that
+    only applies when enough stock is left, and commits it.
+    """
+    cursor.fetchone.return_value = product_row
+    updated_at = datetime(2025, 1, 2, 3, 4, 5)
+
+    result = storage.adjust_product_stock(product.id, -3, updated_at)
+    assert result == product
+
+    sql_query, params = cursor.execute.call_args.args
+    assert "SET quantity = quantity + %s, updated_at = %s" in sql_query
+    assert "WHERE id = %s AND quantity >= %s" in sql_query
+    assert params == (-3, updated_at, product.id, 3)
+    db_conn.commit.assert_called_once()
+
+
+def test_adjust_product_stock_rejected(cursor, storage, product):
+    """
+    Test that `adjust_product_stock` raises `InsufficientStockError` with the
+    stock left when the UPDATE matches no row but the product exists, and
+    `ValueError` when it does not exist.
+    """
+    cursor.fetchone.side_effect = [None, (2,)]
+    with pytest.raises(InsufficientStockError) as error:
+        storage.adjust_product_stock(product.id, -3, datetime.now())
+    assert error.value.available == 2
+
+    cursor.fetchone.side_effect = [None, None]
+    with pytest.raises(ValueError):
+        storage.adjust_product_stock(product.id, -3, datetime.now())
+
+
+def test_adjust_products_stock(cursor, db_conn, storage, product):
+    """
+    Test that `adjust_products_stock` sends every line in one statement and
+    reports each line as adjusted, short of stock or not found.
+    """
+    cursor.fetchall.return_value = [
+        (True, True, 97),
+        (False, True, 1),
+        (False, False, None),
+    ]
+    lines = [
+        StockAdjustmentLine(id=product.id, delta=-3),
+        StockAdjustmentLine(id="01JFTE35ZRRZWCSKK6TBB1DZCS", delta=-2),
+        StockAdjustmentLine(id="01JFTE35ZRRZWCSKK6TBB1DZCR", delta=-1),
+    ]
+
+    updated_at = datetime(2025, 1, 2, 3, 4, 5)
+
+    result = storage.adjust_products_stock(lines, updated_at)
+
+    assert [(item.id, item.status, item.quantity) for item in result] == [
+        (product.id, "adjusted", 97),
+        ("01JFTE35ZRRZWCSKK6TBB1DZCS", "insufficient_stock", 1),
+        ("01JFTE35ZRRZWCSKK6TBB1DZCR", "not_found", None),
+    ]
+    sql_query, params = cursor.execute.call_args.args
+    assert "FOR UPDATE" in sql_query
+    assert params == ([line.id for line in lines], [-3, -2, -1], updated_at)
+    db_conn.commit.assert_called_once()
+
+
+def test_patch_product(cursor, db_conn, storage, product, product_row):
+    """
+    Test that `patch_product` only sets the supplied columns and checks the
+    version when one is given.
+    """
+    cursor.fetchone.return_value = product_row
+    updated_at = datetime(2025, 1, 2, 3, 4, 5)
+
+    result = storage.patch_product(
+        product.id,
+        {"price": 25.0, "updated_at": updated_at},
+        [product.created_at],
+    )
+    assert result == product
+
+    sql_query, params = cursor.execute.call_args.args
+    assert "SET price = %s, updated_at = %s" in sql_query
+    assert "name = %s" not in sql_query
+    assert "coalesce(updated_at, created_at) = ANY(%s::timestamp[])" in sql_query
+    assert params == [25.0, updated_at, product.id, [product.created_at]]
+    db_conn.commit.assert_called_once()
+
+    storage.patch_product(product.id, {"quantity": 3, "updated_at": updated_at})
+    sql_query, params = cursor.execute.call_args.args
+    assert "ANY(" not in sql_query
+    assert params == [3, updated_at, product.id]
+
+
+def test_patch_product_rejected(cursor, storage, product):
+    """
+    Test that `patch_product` raises `VersionMismatchError` when the product
+    exists with another version, and `ValueError` when it does not exist.
+    """
+    changes = {"quantity": 3, "updated_at": datetime(2025, 1, 2)}
+
+    cursor.fetchone.side_effect = [None, (product.created_at,)]
+    with pytest.raises(VersionMismatchError):
+        storage.patch_product(product.id, changes, [datetime(2024, 1, 1)])
+
+    cursor.fetchone.side_effect = [None, None]
+    with pytest.raises(ValueError):
+        storage.patch_product(product.id, changes, [datetime(2024, 1, 1)])
+
+
+def test_get_product_version_by_id(cursor, storage, product):
+    """
+    Test that `get_product_version_by_id` only selects the product version and
+    raises `ValueError` for an unknown product.
+    """
+    cursor.fetchone.return_value = (product.created_at,)
+    assert storage.get_product_version_by_id(product.id) == product.created_at
+
+    sql_query, params = cursor.execute.call_args.args
+    assert "SELECT coalesce(updated_at, created_at)" in sql_query
+    assert params == (product.id,)
+
+    cursor.fetchone.return_value = None
+    with pytest.raises(ValueError):
+        storage.get_product_version_by_id(product.id)
+
+
+def test_storage_reads_from_replica_pool(
+    cursor, db_pool, db_conn, product, product_row
+):
+    """
+    Test that with a replica pool point reads borrow from it, while writes go
+    to the primary and record their WAL position after the commit.
+    """
+    replica_pool = MagicMock()
+    replica_pool.connection.return_value.__enter__.return_value = db_conn
+    storage = ProductStorage(db_pool, replica_pool=replica_pool)
+    cursor.fetchone.return_value = product_row
+
+    assert storage.get_product_by_id(product.id) == product
+    replica_pool.connection.assert_called_once()
+    db_pool.connection.assert_not_called()
+
+    storage.create_product(product)
+    db_pool.connection.assert_called_once()
+    replica_pool.record_write.assert_called_once_with(db_conn)
+
+
+def test_get_product_by_id_batched(cursor, db_pool, product, product_row):
+    """
+    Test that with a batch window point lookups are answered by the ANY() batch
+    query, and a key missing from its rows raises `ValueError`.
+    """
+    storage = ProductStorage(db_pool, batch_window=0.001)
+    cursor.fetchall.return_value = [product_row]
+
+    assert storage.get_product_by_id(product.id) == product
+    cursor.execute.assert_called_once_with(SELECT_PRODUCTS_BY_IDS, ([product.id],))
+
+    cursor.fetchall.return_value = []
+    with pytest.raises(ValueError):
+        storage.get_product_by_name("unknown")
@@ -0,0 +1,228 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from psycopg2 import OperationalError
+from pytest import fixture
+
+from configs.replica_pool import (
+    CONSISTENCY_SESSION,
+    AsyncReplicaPool,
+    ConsistencySession,
+    ReplicaPool,
+    format_lsn,
+    parse_lsn,
+    record_written_lsn,
+)
+from routes.consistency import CONSISTENCY_HEADER, ConsistencyMiddleware
+
+
+def make_pool(lsn: int | None):
+    """
+    Creates a mock connection pool whose connections report a WAL position.
+
+    Args:
+        lsn (int | None): The position returned by any LSN query.
+
+    Returns:
+        MagicMock: A mock connection pool object.
+    """
+    db_pool = MagicMock()
+    db_conn = db_pool.connection.return_value.__enter__.return_value
+    db_conn.cursor.return_value.__enter__.return_value.fetchone.return_value = (lsn,)
+    return db_pool
+
+
+@fixture(name="primary")
+def fixture_primary():
+    """
+    Creates a mock primary pool at WAL position 1000.
+
+    Returns:
+        MagicMock: A mock connection pool object.
+    """
+    return make_pool(1000)
+
+
+@fixture(name="session")
+def fixture_session():
+    """
+    Sets a consistency session for the test, as the middleware does per request.
+
+    Yields:
+        ConsistencySession: The session of the current context.
+    """
+    session = ConsistencySession()
+    token = CONSISTENCY_SESSION.set(session)
+    yield session
+    CONSISTENCY_SESSION.reset(token)
+
+
+def make_replica_pool(primary, **replicas) -> ReplicaPool:
+    """
+    Creates a ReplicaPool with a frozen clock and runs its first check.
+
+    Returns:
+        ReplicaPool: A pool that will not check again on its own.
+    """
+    replica_pool = ReplicaPool(
+        primary, replicas, max_lag_bytes=100, check_interval=5, clock=lambda: 0.0
+    )
+    replica_pool.check_replicas()
+    return replica_pool
+
+
+def borrow(replica_pool: ReplicaPool):
+    with replica_pool.connection() as db_conn:
+        return db_conn
+
+
+def test_parse_and_format_lsn():
+    """
+    Test that consistency tokens round trip through `parse_lsn` and `format_lsn`
+    in the `X/Y` notation Postgres uses.
+    """
+    assert parse_lsn("0/B002828") == 0xB002828
+    assert parse_lsn("1/0") == 1 << 32
+    assert format_lsn(parse_lsn("16/B374D848")) == "16/B374D848"
+
+    with pytest.raises(ValueError):
+        parse_lsn("B002828")
+    with pytest.raises(ValueError):
+        parse_lsn("0/xyz")
+
+
+def test_round_robin_over_healthy_replicas(primary):
+    """
+    Test that reads rotate over replicas within the lag limit and skip a
+    lagging one.
+    """
+    first, second, lagging = make_pool(990), make_pool(1000), make_pool(500)
+    replica_pool = make_replica_pool(
+        primary, first=first, second=second, lagging=lagging
+    )
+
+    assert [replica.healthy for replica in replica_pool.replicas] == [
+        True,
+        True,
+        False,
+    ]
+    connections = [borrow(replica_pool) for _ in range(4)]
+    first_conn = first.connection.return_value.__enter__.return_value
+    second_conn = second.connection.return_value.__enter__.return_value
+    assert connections == [first_conn, second_conn, first_conn, second_conn]
+    lagging.connection.assert_called_once()
+    primary.connection.assert_called_once()
+
+
+def test_reads_fall_back_to_primary(primary):
+    """
+    Test that a replica that stopped replaying or refuses connections is
+    ejected and the read goes to the primary.
+    """
+    primary_conn = primary.connection.return_value.__enter__.return_value
+    assert borrow(make_replica_pool(primary, stopped=make_pool(None))) == primary_conn
+
+    broken = make_pool(1000)
+    replica_pool = make_replica_pool(primary, broken=broken)
+    broken.connection.side_effect = OperationalError("connection refused")
+
+    assert borrow(replica_pool) == primary_conn
+    assert replica_pool.replicas[0].healthy is False
+
+
+def test_consistency_token_skips_stale_replicas(primary, session):
+    """
+    Test that a read carrying a token ahead of a replica's replay position goes
+    to the primary, and to the replica once it has caught up.
+    """
+    replica = make_pool(990)
+    replica_pool = make_replica_pool(primary, replica=replica)
+    session.required_lsn = 995
+
+    assert (
+        borrow(replica_pool) == primary.connection.return_value.__enter__.return_value
+    )
+
+    replica_pool.replicas[0].replay_lsn = 995
+    assert (
+        borrow(replica_pool) == replica.connection.return_value.__enter__.return_value
+    )
+
+
+def test_record_write(primary, session):
+    """
+    Test that `record_write` stores the primary position after a commit in the
+    session, keeping the highest one of the request.
+    """
+    replica_pool = make_replica_pool(primary)
+    db_conn = primary.connection.return_value.__enter__.return_value
+
+    replica_pool.record_write(db_conn)
+    record_written_lsn(10)
+
+    assert session.written_lsn == 1000
+    db_conn.rollback.assert_called()
+
+
+def test_async_replica_pool(session):
+    """
+    Test that the async pool checks replicas, routes reads to them and falls
+    back to the primary for a token the replica has not replayed yet.
+    """
+
+    def make_async_pool(lsn: int):
+        db_pool = MagicMock()
+        db_conn = AsyncMock()
+        db_conn.execute.return_value.fetchone.return_value = (lsn,)
+        db_pool.connection.return_value.__aenter__.return_value = db_conn
+        return db_pool, db_conn
+
+    primary, primary_conn = make_async_pool(1000)
+    replica, replica_conn = make_async_pool(990)
+    replica_pool = AsyncReplicaPool(
+        primary, {"replica": replica}, max_lag_bytes=100, clock=lambda: 0.0
+    )
+
+    async def run():
+        await replica_pool.check_replicas()
+        async with replica_pool.connection() as first:
+            pass
+        session.required_lsn = 995
+        async with replica_pool.connection() as second:
+            pass
+        return first, second
+
+    assert asyncio.run(run()) == (replica_conn, primary_conn)
+
+
+def test_consistency_middleware():
+    """
+    Test that the middleware echoes the written position as a token, applies an
+    incoming token to the request and rejects malformed tokens.
+    """
+    app = FastAPI()
+    app.add_middleware(ConsistencyMiddleware)
+
+    @app.get("/products")
+    def get_products():
+        return {"required": format_lsn(CONSISTENCY_SESSION.get().required_lsn)}
+
+    @app.post("/products")
+    def create_product():
+        record_written_lsn(0xB002828)
+        return {}
+
+    client = TestClient(app)
+
+    response = client.post("/products")
+    assert response.headers[CONSISTENCY_HEADER] == "0/B002828"
+
+    response = client.get("/products", headers={CONSISTENCY_HEADER: "0/B002828"})
+    assert response.json() == {"required": "0/B002828"}
+    assert CONSISTENCY_HEADER not in response.headers
+
+    response = client.get("/products", headers={CONSISTENCY_HEADER: "nope"})
+    assert response.status_code == 400
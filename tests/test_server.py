@@ -0,0 +1,30 @@
+from configs.server_conf import POOL_CLOSE_TIMEOUT, get_server_options
+
+
+def test_server_options_from_env(monkeypatch):
+    """
+    Test that `get_server_options` preloads the app, reads the worker count and
+    drain deadline from the environment and leaves time to close the pools.
+    """
+    monkeypatch.setenv("SERVER_WORKERS", "3")
+    monkeypatch.setenv("SERVER_DRAIN_TIMEOUT", "12")
+    monkeypatch.setenv("SERVER_PORT", "9000")
+
+    options = get_server_options()
+
+    assert options["workers"] == 3
+    assert options["bind"] == "0.0.0.0:9000"
+    assert options["preload_app"] is True
+    assert options["worker_class"] == "server.ProductServiceWorker"
+    assert options["graceful_timeout"] == 12 + POOL_CLOSE_TIMEOUT
+    assert "gunicorn.error" in options["logconfig_dict"]["loggers"]
+
+
+def test_server_workers_default_to_cores(monkeypatch):
+    """
+    Test that the worker count defaults to the cores available to the process.
+    """
+    monkeypatch.delenv("SERVER_WORKERS", raising=False)
+    monkeypatch.setattr("os.sched_getaffinity", lambda pid: {0, 1, 2, 3, 4})
+
+    assert get_server_options()["workers"] == 5
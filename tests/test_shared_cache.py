@@ -0,0 +1,351 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis
+from pytest import fixture
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from caches.product_cache import MISSING, ProductCache
+from caches.shared_cache import AsyncSharedProductCache, SharedProductCache
+from services.product_service import ProductService
+
+
+class FakeClock:
+    def __init__(self):
+        # after the fixture product was created, misses and invalidations are
+        # versioned by this clock
+        self.now = datetime(2025, 1, 1).timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+@fixture(name="clock")
+def fixture_clock():
+    """
+    Creates a manually advanced wall clock for the shared cache freshness stamps.
+
+    Returns:
+        FakeClock: A callable returning the current fake time.
+    """
+    return FakeClock()
+
+
+@fixture(name="server")
+def fixture_server():
+    """
+    Creates an in-process Redis server shared by every client of a test, like
+    the workers of one deployment.
+
+    Returns:
+        fakeredis.FakeServer: The fake server.
+    """
+    return fakeredis.FakeServer()
+
+
+def make_cache(server, clock) -> SharedProductCache:
+    """
+    Creates a SharedProductCache on the fake server with a 10 second TTL, a 5
+    second stale window and refreshes in the last 2 seconds of freshness.
+
+    Returns:
+        SharedProductCache: A cache acting as one worker.
+    """
+    return SharedProductCache(
+        fakeredis.FakeRedis(server=server),
+        ttl=10,
+        stale_ttl=5,
+        refresh_ahead=2,
+        negative_ttl=1,
+        clock=clock,
+    )
+
+
+def wait_until(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_shared_cache_get_and_put(server, clock, product):
+    """
+    Test that a product put by one worker is found by id and name by another,
+    and that a renamed product's old name no longer resolves to it.
+    """
+    first, second = make_cache(server, clock), make_cache(server, clock)
+    loader = MagicMock()
+
+    assert second.get("id", product.id, loader) is MISSING
+    first.put(product)
+
+    assert second.get("id", product.id, loader) == product
+    assert second.get("name", product.name, loader) == product
+
+    first.put(product.model_copy(update={"name": "castle"}), broadcast=True)
+    assert second.get("name", "house", loader) is MISSING
+    assert second.get("name", "castle", loader).id == product.id
+
+    first.put_missing("id", "unknown")
+    assert second.get("id", "unknown", loader) is None
+    loader.assert_not_called()
+
+
+def test_shared_cache_serves_stale_while_one_worker_refreshes(server, clock, product):
+    """
+    Test that a stale entry is still served, and that a single worker reloads
+    it in the background however many workers read it.
+    """
+    first, second = make_cache(server, clock), make_cache(server, clock)
+    refreshed = product.model_copy(update={"quantity": 5})
+    release = threading.Event()
+    loader = MagicMock(side_effect=lambda id: release.wait() and refreshed)
+    first.put(product)
+
+    clock.now += 12
+    assert first.get("id", product.id, loader) == product
+    assert second.get("id", product.id, loader) == product
+
+    release.set()
+    assert wait_until(lambda: second.get("id", product.id, loader) == refreshed)
+    loader.assert_called_once_with(product.id)
+
+
+def test_shared_cache_refreshes_hot_keys_ahead_of_expiry(server, clock, product):
+    """
+    Test that reads in the refresh-ahead window reload the entry before it
+    expires, while reads earlier on do not.
+    """
+    cache = make_cache(server, clock)
+    loader = MagicMock(return_value=product)
+    cache.put(product)
+
+    clock.now += 7
+    cache.get("id", product.id, loader)
+    cache.executor.shutdown(wait=True)
+    loader.assert_not_called()
+
+    cache = make_cache(server, clock)
+    clock.now += 2
+    assert cache.get("id", product.id, loader) == product
+    cache.executor.shutdown(wait=True)
+    loader.assert_called_once_with(product.id)
+
+
+def test_shared_cache_fills_never_replace_newer_writes(server, clock, product):
+    """
+    Test that a reload that read the row before a write landed leaves the
+    written entry in place, under its id and its old name, while a newer row
+    still replaces an older entry.
+    """
+    first, second = make_cache(server, clock), make_cache(server, clock)
+    renamed = product.model_copy(
+        update={"name": "castle", "updated_at": datetime(2025, 1, 2, 3, 4, 5)}
+    )
+
+    def load_before_write(id):
+        second.put(renamed, broadcast=True)
+        return product
+
+    first.put(product)
+    first.refresh("id", product.id, load_before_write)
+
+    loader = MagicMock()
+    assert first.get("id", product.id, loader) == renamed
+    assert first.get("name", "house", loader) is MISSING
+    assert first.get("name", "castle", loader) == renamed
+
+    restocked = renamed.model_copy(
+        update={"quantity": 5, "updated_at": datetime(2025, 1, 2, 3, 4, 6)}
+    )
+    first.put(restocked)
+    assert second.get("id", product.id, loader) == restocked
+    loader.assert_not_called()
+
+
+def test_shared_cache_fills_never_resurrect_invalidated_products(
+    server, clock, product
+):
+    """
+    Test that a reload that read the row before an invalidation, or a miss
+    recorded after it, does not bring the product back, while a row written
+    after the invalidation still fills the key.
+    """
+    first, second = make_cache(server, clock), make_cache(server, clock)
+    loader = MagicMock()
+
+    def load_before_delete(id):
+        second.invalidate(id)
+        return product
+
+    first.put(product)
+    first.refresh("id", product.id, load_before_delete)
+    assert first.get("id", product.id, loader) is MISSING
+    assert first.get("name", product.name, loader) is MISSING
+
+    clock.now += 1
+    first.put_missing("id", product.id)
+    first.put(product)
+    assert first.get("id", product.id, loader) is None
+
+    restocked = product.model_copy(
+        update={"quantity": 5, "updated_at": datetime.fromtimestamp(clock.now + 1)}
+    )
+    first.put(restocked)
+    assert second.get("id", product.id, loader) == restocked
+    loader.assert_not_called()
+
+
+def test_shared_cache_broadcasts_invalidations(server, clock, product):
+    """
+    Test that an invalidation deletes the shared entries and reaches the other
+    workers' listeners, but not the worker that sent it.
+    """
+    first, second = make_cache(server, clock), make_cache(server, clock)
+    first_invalidated, second_invalidated = [], []
+    first.subscribe(first_invalidated.append)
+    second.subscribe(second_invalidated.append)
+    first.put(product)
+
+    try:
+        first.invalidate(product.id)
+
+        assert wait_until(lambda: second_invalidated == [product.id])
+        assert first_invalidated == []
+        assert second.get("id", product.id, MagicMock()) is MISSING
+        assert second.get("name", product.name, MagicMock()) is MISSING
+    finally:
+        first.close()
+        second.close()
+
+
+def test_shared_cache_failures_fall_through(clock, product):
+    """
+    Test that an unreachable cache behaves as a miss instead of failing the
+    request.
+    """
+    client = MagicMock()
+    client.get.side_effect = RedisConnectionError("connection refused")
+    client.pipeline.side_effect = RedisConnectionError("connection refused")
+    cache = SharedProductCache(client, clock=clock)
+
+    assert cache.get("id", product.id, MagicMock()) is MISSING
+    cache.put(product, broadcast=True)
+    cache.invalidate(product.id)
+
+
+def test_services_share_misses_across_workers(server, clock, product):
+    """
+    Test that only the first of two workers loads a product from storage, and
+    that a write on one worker evicts the other's local copy.
+    """
+    storage = MagicMock()
+    storage.get_product_by_id.return_value = product
+    workers = []
+    for _ in range(2):
+        local_cache = ProductCache(clock=clock)
+        shared_cache = make_cache(server, clock)
+        shared_cache.subscribe(local_cache.invalidate)
+        workers.append(ProductService(storage, local_cache, shared_cache))
+    first, second = workers
+
+    try:
+        assert first.get_product_by_id(product.id) == product
+        assert second.get_product_by_id(product.id) == product
+        storage.get_product_by_id.assert_called_once()
+
+        storage.update_product.return_value = product.model_copy(update={"quantity": 1})
+        first.update_product(product.model_copy())
+
+        assert wait_until(lambda: second.cache.get("id", product.id) is MISSING)
+        assert second.get_product_by_id(product.id).quantity == 1
+        storage.get_product_by_id.assert_called_once()
+    finally:
+        for worker in workers:
+            worker.shared_cache.close()
+
+
+def test_async_shared_cache_refreshes_in_background(server, clock, product):
+    """
+    Test that the async cache serves a stale entry and reloads it with a
+    background task.
+    """
+    refreshed = product.model_copy(update={"quantity": 5})
+    loader = AsyncMock(return_value=refreshed)
+
+    async def run():
+        cache = AsyncSharedProductCache(
+            fakeredis.FakeAsyncRedis(server=server),
+            ttl=10,
+            refresh_ahead=2,
+            clock=clock,
+        )
+        await cache.put(product)
+        clock.now += 11
+
+        stale = await cache.get("id", product.id, loader)
+        await asyncio.gather(*cache._refreshes)
+        fresh = await cache.get("id", product.id, loader)
+        await cache.close()
+        return stale, fresh
+
+    assert asyncio.run(run()) == (product, refreshed)
+    loader.assert_awaited_once_with(product.id)
+
+
+def test_async_shared_cache_fills_never_replace_newer_writes(server, clock, product):
+    """
+    Test that an async reload that read the row before a write landed leaves
+    the written entry in place.
+    """
+    updated = product.model_copy(
+        update={"quantity": 5, "updated_at": datetime(2025, 1, 2, 3, 4, 5)}
+    )
+
+    async def run():
+        cache = AsyncSharedProductCache(
+            fakeredis.FakeAsyncRedis(server=server), refresh_ahead=2, clock=clock
+        )
+
+        async def load_before_write(id):
+            await cache.put(updated, broadcast=True)
+            return product
+
+        await cache.put(product)
+        await cache.refresh("id", product.id, load_before_write)
+        cached = await cache.get("id", product.id, AsyncMock())
+        await cache.close()
+        return cached
+
+    assert asyncio.run(run()) == updated
+
+
+def test_async_shared_cache_fills_never_resurrect_invalidated_products(
+    server, clock, product
+):
+    """
+    Test that an async reload that read the row before an invalidation does not
+    bring the product back.
+    """
+
+    async def run():
+        cache = AsyncSharedProductCache(
+            fakeredis.FakeAsyncRedis(server=server), refresh_ahead=2, clock=clock
+        )
+
+        async def load_before_delete(id):
+            await cache.invalidate(id)
+            return product
+
+        await cache.put(product)
+        await cache.refresh("id", product.id, load_before_delete)
+        cached = await cache.get("id", product.id, AsyncMock())
+        await cache.close()
+        return cached
+
+    assert asyncio.run(run()) is MISSING
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from caches.single_flight import AsyncSingleFlight, SingleFlight, flight_key
+from configs.replica_pool import CONSISTENCY_SESSION, ConsistencySession
+from services.product_service import ProductService
+
+
+def coalesced_calls(operation: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "product_single_flight_calls_total",
+            {"operation": operation, "result": "coalesced"},
+        )
+        or 0.0
+    )
+
+
+def wait_until(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def run_concurrently(calls: int, fn):
+    """
+    Runs `fn` from several threads at once.
+
+    Returns:
+        list: The futures of every call, in submission order.
+    """
+    executor = ThreadPoolExecutor(max_workers=calls)
+    futures = [executor.submit(fn) for _ in range(calls)]
+    executor.shutdown(wait=False)
+    return futures
+
+
+def test_single_flight_shares_one_call():
+    """
+    Test that concurrent calls with the same key run the function once, all
+    get its result and are counted as coalesced.
+    """
+    single_flight = SingleFlight()
+    release = threading.Event()
+    fn = MagicMock(side_effect=lambda key: release.wait() and key.upper())
+    before = coalesced_calls("test_shared")
+
+    futures = run_concurrently(
+        5, lambda: single_flight.do("test_shared", "house", fn, "house")
+    )
+    assert wait_until(lambda: coalesced_calls("test_shared") - before == 4)
+    release.set()
+
+    assert [future.result(timeout=2) for future in futures] == ["HOUSE"] * 5
+    fn.assert_called_once_with("house")
+    assert single_flight.in_flight() == 0
+
+    single_flight.do("test_shared", "house", fn, "house")
+    assert fn.call_count == 2
+
+
+def test_single_flight_propagates_errors():
+    """
+    Test that an error raised by the shared call reaches every caller, and that
+    different keys never share a call.
+    """
+    single_flight = SingleFlight()
+    release = threading.Event()
+
+    def not_found(key):
+        release.wait()
+        raise ValueError(f"Product not found with id {key}")
+
+    before = coalesced_calls("test_error")
+    futures = run_concurrently(
+        3, lambda: single_flight.do("test_error", "missing", not_found, "missing")
+    )
+    assert wait_until(lambda: coalesced_calls("test_error") - before == 2)
+    release.set()
+
+    for future in futures:
+        with pytest.raises(ValueError, match="missing"):
+            future.result(timeout=2)
+
+    assert single_flight.do("test_error", "a", str.upper, "a") == "A"
+    assert single_flight.do("test_error", "b", str.upper, "b") == "B"
+
+
+def test_flight_key_includes_consistency_token():
+    """
+    Test that reads needing different WAL positions are kept apart.
+    """
+    plain = flight_key("get_product_by_id", "1")
+
+    token = CONSISTENCY_SESSION.set(ConsistencySession(required_lsn=100))
+    try:
+        assert flight_key("get_product_by_id", "1") != plain
+    finally:
+        CONSISTENCY_SESSION.reset(token)
+
+
+def test_async_single_flight():
+    """
+    Test that concurrent coroutines share one call and its error, and that a
+    cancelled caller does not cancel the call for the others.
+    """
+    single_flight = AsyncSingleFlight()
+    calls = []
+
+    async def load(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        if key == "missing":
+            raise ValueError(f"Product not found with id {key}")
+        return key.upper()
+
+    async def run():
+        results = await asyncio.gather(
+            *(single_flight.do("test_async", "house", load, "house") for _ in range(5))
+        )
+        errors = await asyncio.gather(
+            *(
+                single_flight.do("test_async", "missing", load, "missing")
+                for _ in range(3)
+            ),
+            return_exceptions=True,
+        )
+
+        leader = asyncio.create_task(single_flight.do("test_async", "cat", load, "cat"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(
+            single_flight.do("test_async", "cat", load, "cat")
+        )
+        await asyncio.sleep(0)
+        leader.cancel()
+        return results, errors, await follower
+
+    results, errors, follower = asyncio.run(run())
+
+    assert results == ["HOUSE"] * 5
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert follower == "CAT"
+    assert calls == ["house", "missing", "cat"]
+    assert single_flight.in_flight() == 0
+
+
+def test_service_coalesces_product_lookups(product):
+    """
+    Test that concurrent lookups of one product run a single storage query.
+    """
+    release = threading.Event()
+    storage = MagicMock()
+    storage.get_product_by_id.side_effect = lambda id: release.wait() and product
+    service = ProductService(storage)
+    before = coalesced_calls("get_product_by_id")
+
+    futures = run_concurrently(4, lambda: service.get_product_by_id(product.id))
+    assert wait_until(lambda: coalesced_calls("get_product_by_id") - before == 3)
+    release.set()
+
+    assert [future.result(timeout=2) for future in futures] == [product] * 4
+    storage.get_product_by_id.assert_called_once_with(product.id)